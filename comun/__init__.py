@@ -0,0 +1,6 @@
+"""
+Código común a las aplicaciones del repositorio (tablero y overlay-congregacion).
+
+Cada aplicación lo importa a través de su propio state_backend.py, que añade
+la raíz del repositorio a sys.path; la implementación solo existe aquí.
+"""
@@ -0,0 +1,161 @@
+"""
+Backends de estado compartido.
+
+El estado se guarda como un documento versionado. Las mutaciones son
+compare-and-set sobre la versión, de modo que siguen siendo atómicas aunque
+varios workers (procesos) modifiquen el mismo documento.
+
+- memory://            un solo proceso (por defecto)
+- redis://host:6379/0  varios workers; también unix:///ruta/redis.sock
+
+Los documentos devueltos por get() son de solo lectura: el backend en memoria
+guarda instantáneas inmutables que los lectores comparten sin bloqueo ni copia.
+
+Para pruebas sin servidor Redis puede pasarse cualquier cliente compatible,
+por ejemplo RedisStateBackend(client=fakeredis.FakeRedis(server=servidor_compartido)).
+"""
+
+import json
+import threading
+
+class FrozenDict(dict):
+    """dict de solo lectura; sigue siendo serializable a JSON"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Instantánea de estado de solo lectura")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+def freeze(value):
+    """Copia inmutable (dict -> FrozenDict, list -> tuple)"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def thaw(value):
+    """Copia modificable de una instantánea"""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+class MemoryStateBackend:
+    """Documentos versionados en la memoria del proceso"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def load(self, key):
+        """Devolver (versión, documento); (0, None) si no existe. No bloquea."""
+        return self._data.get(key, (0, None))
+
+    def compare_and_set(self, key, expected_version, value):
+        """Guardar value con versión + 1 solo si la versión actual es expected_version"""
+        with self._lock:
+            if self._data.get(key, (0, None))[0] != expected_version:
+                return False
+            # Se publica una tupla nueva: los lectores ven la anterior o esta, nunca una mezcla
+            self._data[key] = (expected_version + 1, freeze(value))
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+class RedisStateBackend:
+    """Documentos versionados en Redis, compartidos entre workers"""
+
+    def __init__(self, url=None, client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.redis = client
+
+    def load(self, key):
+        raw = self.redis.get(key)
+        if raw is None:
+            return 0, None
+        entry = json.loads(raw)
+        return entry['version'], entry['data']
+
+    def compare_and_set(self, key, expected_version, value):
+        from redis.exceptions import WatchError
+
+        with self.redis.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                raw = pipe.get(key)
+                current = json.loads(raw)['version'] if raw is not None else 0
+                if current != expected_version:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.set(key, json.dumps({'version': expected_version + 1, 'data': value}))
+                pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    def delete(self, key):
+        self.redis.delete(key)
+
+def create_state_backend(url):
+    """Crear el backend a partir de STATE_BACKEND_URL"""
+    if not url or url.startswith('memory://'):
+        return MemoryStateBackend()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisStateBackend(url)
+    raise ValueError(f"STATE_BACKEND_URL no soportado: {url}")
+
+class SharedState:
+    """Documento versionado con mutaciones atómicas (compare-and-set con reintento)
+
+    Dentro de un proceso las mutaciones pasan por un único escritor, así que
+    solo compiten (y reintentan) escritores de workers distintos.
+    """
+
+    def __init__(self, backend, key, initial=None):
+        self.backend = backend
+        self.key = key
+        self._writer = threading.Lock()
+        # Sin initial solo se enlaza a un documento que ya creó otro proceso
+        if initial is not None and backend.load(key)[1] is None:
+            # Si otro worker lo inicializó antes, el compare-and-set simplemente falla
+            backend.compare_and_set(key, 0, initial)
+
+    def get(self):
+        """(versión, documento). El documento no debe modificarse en sitio."""
+        return self.backend.load(self.key)
+
+    def mutate(self, fn):
+        """Aplicar fn(borrador) y confirmar; fn devuelve los cambios o None si no hay nada que guardar
+
+        Devuelve (versión nueva, cambios). Si otro worker confirmó antes se
+        vuelve a leer y se reintenta sobre el estado actualizado.
+        """
+        with self._writer:
+            while True:
+                version, data = self.backend.load(self.key)
+                if data is None:
+                    # Documento eliminado (p. ej. partida terminada en otro worker)
+                    return version, None
+                draft = thaw(data)
+                changes = fn(draft)
+                if changes is None:
+                    return version, None
+                if self.backend.compare_and_set(self.key, version, draft):
+                    return version + 1, changes
+
+    def delete(self):
+        self.backend.delete(self.key)
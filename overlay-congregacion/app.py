@@ -1,7 +1,11 @@
-from flask import Flask, render_template, request, jsonify
-from flask_socketio import SocketIO, emit
+from flask import Flask, render_template, request, jsonify, abort
+from flask_socketio import SocketIO, emit, join_room
 import json
 import logging
+import os
+import re
+import threading
+from state_backend import SharedState, create_state_backend
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -10,11 +14,29 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'overlay-congregacion-secret-key'
 
+# Varios workers: estado en un backend compartido (memory:// = un solo proceso)
+# y cola de mensajes para que los emits lleguen a los clientes de todos ellos
+STATE_BACKEND_URL = os.getenv('STATE_BACKEND_URL', 'memory://')
+SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE') or None
+
 # Configurar SocketIO con CORS habilitado
-socketio = SocketIO(app, cors_allowed_origins="*", logger=True, engineio_logger=True)
+socketio = SocketIO(app, cors_allowed_origins="*", logger=True, engineio_logger=True,
+                    message_queue=SOCKETIO_MESSAGE_QUEUE)
+
+# Canales independientes (varias instancias de OBS, varias sedes...): cada uno
+# con su propio estado. Se elige con ?channel=<nombre> en páginas y API.
+DEFAULT_CHANNEL = os.getenv('DEFAULT_CHANNEL', 'principal').lower()
+CHANNEL_PATTERN = re.compile(r'^[a-z0-9_-]{1,32}$')
+
+# Salas de cada canal ('<canal>:marquee', ...): cada página entra en la de su
+# tipo y solo recibe lo suyo; el panel de control recibe todo
+OVERLAY_ROOMS = ('marquee', 'transition', 'control')
+PART_ROOMS = {
+    'marquee': ('marquee', 'control'),
+    'transition': ('transition', 'control')
+}
 
-# Estado global de los overlays
-overlay_state = {
+INITIAL_STATE = {
     'marquee': {
         'text': 'Bienvenidos a Iglesia Agua Viva ✝ Servicio Dominical - 10:00 AM 🙏 Unidos en fe y oración',
         'visible': True
@@ -27,33 +49,164 @@ overlay_state = {
     }
 }
 
+# Escenas: conjuntos de cambios con nombre que se aplican de una vez. Campos
+# que puede tocar una escena en cada parte del estado y su tipo.
+SCENE_FIELDS = {
+    'marquee': {'text': str, 'visible': bool},
+    'transition': {'visible': bool, 'message': str, 'church_name': str, 'service_info': str}
+}
+DEFAULT_SCENES = {
+    'inicio': {'marquee': {'visible': True}, 'transition': {'visible': False}},
+    'pausa': {'marquee': {'visible': False}, 'transition': {'visible': True}}
+}
+
+state_backend = create_state_backend(STATE_BACKEND_URL)
+channel_states = {}
+channel_scenes = {}
+channel_states_lock = threading.Lock()
+# Canal y tipo de overlay de cada cliente (sid) de este worker
+client_rooms = {}
+
+def state_key(channel):
+    # El canal por defecto conserva la clave de siempre (estado ya guardado en Redis)
+    return 'overlay:state' if channel == DEFAULT_CHANNEL else f'overlay:state:{channel}'
+
+def channel_state(channel):
+    """Estado compartido de un canal (se crea con los valores iniciales la primera vez)"""
+    with channel_states_lock:
+        state = channel_states.get(channel)
+        if state is None:
+            # Las mutaciones son atómicas entre workers
+            state = channel_states[channel] = SharedState(state_backend, state_key(channel), INITIAL_STATE)
+        return state
+
+def scene_registry(channel):
+    """Escenas registradas de un canal (compartidas entre workers como el estado)"""
+    with channel_states_lock:
+        scenes = channel_scenes.get(channel)
+        if scenes is None:
+            scenes = channel_scenes[channel] = SharedState(state_backend, f'{state_key(channel)}:scenes',
+                                                           DEFAULT_SCENES)
+        return scenes
+
+def request_channel():
+    """Canal de la petición (?channel=), 400 si el nombre no es válido"""
+    channel = (request.args.get('channel') or DEFAULT_CHANNEL).lower()
+    if not CHANNEL_PATTERN.match(channel):
+        abort(400, 'Canal no válido: usar letras minúsculas, números, - o _ (máximo 32)')
+    return channel
+
+def current_state(channel=None):
+    """Obtener el estado actual de los overlays de un canal"""
+    return channel_state(channel or request_channel()).get()[1]
+
+def overlay_room(channel, kind):
+    return f'{channel}:{kind}'
+
+def room_snapshot(channel, kind):
+    """Estado inicial de una sala: solo su parte (el panel de control, todo)"""
+    state = current_state(channel)
+    return state if kind == 'control' else {kind: state[kind]}
+
+def emit_part(channel, part, value):
+    """Enviar '<parte>_update' solo a las salas del canal que muestran esa parte"""
+    socketio.emit(f'{part}_update', value, to=[overlay_room(channel, kind) for kind in PART_ROOMS[part]])
+
 @app.route('/')
 def index():
     """Página principal con URLs para OBS"""
-    return render_template('index.html')
+    channel = request_channel()
+    channel_query = '' if channel == DEFAULT_CHANNEL else f'?channel={channel}'
+    return render_template('index.html', channel=channel, channel_query=channel_query)
 
 @app.route('/overlay/marquee')
 def marquee_overlay():
     """Overlay de marquesina para OBS"""
+    channel = request_channel()
+    marquee = current_state(channel)['marquee']
     return render_template('marquee.html', 
-                         initial_text=overlay_state['marquee']['text'],
-                         visible=overlay_state['marquee']['visible'])
+                         initial_text=marquee['text'],
+                         visible=marquee['visible'],
+                         channel=channel)
 
 @app.route('/overlay/transition')
 def transition_overlay():
     """Overlay de transición para OBS"""
+    channel = request_channel()
     return render_template('transition.html',
-                         initial_state=overlay_state['transition'])
+                         initial_state=current_state(channel)['transition'],
+                         channel=channel)
 
 @app.route('/control')
 def control_panel():
     """Panel de control administrativo"""
-    return render_template('control.html', state=overlay_state)
+    channel = request_channel()
+    return render_template('control.html', state=current_state(channel), channel=channel,
+                           scenes=scene_registry(channel).get()[1])
+
+def set_transition(channel, **fields):
+    """Actualizar campos de la transición de forma atómica y devolver la transición resultante"""
+    def apply(state):
+        state['transition'].update(fields)
+        return state['transition']
+    return channel_state(channel).mutate(apply)[1]
+
+def validate_scene(changes):
+    """Cambios de una escena ({parte: {campo: valor}}) limpios; ValueError si no son válidos"""
+    if not isinstance(changes, dict) or not changes:
+        raise ValueError('La escena no tiene cambios')
+    clean = {}
+    for part, fields in changes.items():
+        allowed = SCENE_FIELDS.get(part)
+        if allowed is None or not isinstance(fields, dict) or not fields:
+            raise ValueError(f"Parte no válida en la escena: {part}")
+        clean[part] = {}
+        for field, value in fields.items():
+            if field not in allowed or not isinstance(value, allowed[field]):
+                raise ValueError(f"Campo no válido en la escena: {part}.{field}")
+            if isinstance(value, str):
+                value = value.strip()
+                if not value:
+                    raise ValueError(f"{part}.{field} no puede estar vacío")
+            clean[part][field] = value
+    return clean
+
+def apply_scene_changes(channel, changes, scene=None):
+    """Aplicar los cambios de todas las partes en una sola mutación atómica
+
+    Envía un único 'scene_update' a cada sala del canal con solo las partes
+    que esa sala muestra y que han cambiado (el panel de control lo recibe
+    siempre). Devuelve las partes que cambiaron.
+    """
+    def apply(state):
+        changed = {}
+        for part, fields in changes.items():
+            if any(state[part].get(field) != value for field, value in fields.items()):
+                state[part].update(fields)
+                changed[part] = state[part]
+        return changed or None
+    changed = channel_state(channel).mutate(apply)[1] or {}
+
+    for kind in OVERLAY_ROOMS:
+        parts = {part: value for part, value in changed.items() if kind in PART_ROOMS[part]}
+        if parts or kind == 'control':
+            socketio.emit('scene_update', dict(parts, scene=scene), to=overlay_room(channel, kind))
+    return changed
+
+def apply_named_scene(channel, name):
+    """Aplicar una escena registrada; KeyError si no existe"""
+    changes = scene_registry(channel).get()[1].get(name)
+    if changes is None:
+        raise KeyError(name)
+    changed = apply_scene_changes(channel, changes, scene=name)
+    logger.info(f"Escena '{name}' aplicada en '{channel}': {', '.join(changed) or 'sin cambios'}")
+    return changed
 
 # API Endpoints
 @app.route('/api/update_marquee', methods=['POST'])
 def update_marquee():
     """Actualizar texto de marquesina"""
+    channel = request_channel()
     try:
         data = request.get_json()
         new_text = data.get('text', '').strip()
@@ -61,13 +214,13 @@ def update_marquee():
         if not new_text:
             return jsonify({'success': False, 'error': 'Texto no puede estar vacío'}), 400
         
-        overlay_state['marquee']['text'] = new_text
+        def apply(state):
+            state['marquee']['text'] = new_text
+            return state['marquee']
+        _, marquee = channel_state(channel).mutate(apply)
         
-        # Emitir actualización via WebSocket
-        socketio.emit('marquee_update', {
-            'text': new_text,
-            'visible': overlay_state['marquee']['visible']
-        })
+        # Emitir actualización via WebSocket (marquesinas y paneles del canal)
+        emit_part(channel, 'marquee', marquee)
         
         logger.info(f"Marquesina actualizada: {new_text}")
         return jsonify({'success': True, 'message': 'Marquesina actualizada correctamente'})
@@ -79,17 +232,18 @@ def update_marquee():
 @app.route('/api/toggle_marquee', methods=['POST'])
 def toggle_marquee():
     """Mostrar/ocultar marquesina"""
+    channel = request_channel()
     try:
-        overlay_state['marquee']['visible'] = not overlay_state['marquee']['visible']
+        def apply(state):
+            state['marquee']['visible'] = not state['marquee']['visible']
+            return state['marquee']
+        _, marquee = channel_state(channel).mutate(apply)
         
-        socketio.emit('marquee_update', {
-            'text': overlay_state['marquee']['text'],
-            'visible': overlay_state['marquee']['visible']
-        })
+        emit_part(channel, 'marquee', marquee)
         
-        status = 'mostrada' if overlay_state['marquee']['visible'] else 'ocultada'
+        status = 'mostrada' if marquee['visible'] else 'ocultada'
         logger.info(f"Marquesina {status}")
-        return jsonify({'success': True, 'message': f'Marquesina {status}', 'visible': overlay_state['marquee']['visible']})
+        return jsonify({'success': True, 'message': f'Marquesina {status}', 'visible': marquee['visible']})
         
     except Exception as e:
         logger.error(f"Error toggling marquesina: {str(e)}")
@@ -98,10 +252,11 @@ def toggle_marquee():
 @app.route('/api/show_transition', methods=['POST'])
 def show_transition():
     """Mostrar pantalla de transición"""
+    channel = request_channel()
     try:
-        overlay_state['transition']['visible'] = True
+        transition = set_transition(channel, visible=True)
         
-        socketio.emit('transition_update', overlay_state['transition'])
+        emit_part(channel, 'transition', transition)
         
         logger.info("Transición mostrada")
         return jsonify({'success': True, 'message': 'Pantalla de transición mostrada'})
@@ -113,10 +268,11 @@ def show_transition():
 @app.route('/api/hide_transition', methods=['POST'])
 def hide_transition():
     """Ocultar pantalla de transición"""
+    channel = request_channel()
     try:
-        overlay_state['transition']['visible'] = False
+        transition = set_transition(channel, visible=False)
         
-        socketio.emit('transition_update', overlay_state['transition'])
+        emit_part(channel, 'transition', transition)
         
         logger.info("Transición ocultada")
         return jsonify({'success': True, 'message': 'Pantalla de transición ocultada'})
@@ -128,20 +284,17 @@ def hide_transition():
 @app.route('/api/update_transition', methods=['POST'])
 def update_transition():
     """Actualizar mensaje de transición"""
+    channel = request_channel()
     try:
         data = request.get_json()
         message = data.get('message', '').strip()
         church_name = data.get('church_name', '').strip()
         service_info = data.get('service_info', '').strip()
         
-        if message:
-            overlay_state['transition']['message'] = message
-        if church_name:
-            overlay_state['transition']['church_name'] = church_name
-        if service_info:
-            overlay_state['transition']['service_info'] = service_info
+        fields = {'message': message, 'church_name': church_name, 'service_info': service_info}
+        transition = set_transition(channel, **{key: value for key, value in fields.items() if value})
         
-        socketio.emit('transition_update', overlay_state['transition'])
+        emit_part(channel, 'transition', transition)
         
         logger.info(f"Transición actualizada: {message}")
         return jsonify({'success': True, 'message': 'Transición actualizada correctamente'})
@@ -153,25 +306,126 @@ def update_transition():
 @app.route('/api/get_state', methods=['GET'])
 def get_state():
     """Obtener estado actual de los overlays"""
-    return jsonify(overlay_state)
+    return jsonify(current_state())
+
+@app.route('/api/scenes', methods=['GET'])
+def list_scenes():
+    """Escenas registradas del canal"""
+    return jsonify({'scenes': scene_registry(request_channel()).get()[1]})
+
+@app.route('/api/scenes/<name>', methods=['POST'])
+def register_scene(name):
+    """Registrar (o sustituir) una escena: {"marquee": {...}, "transition": {...}}"""
+    channel = request_channel()
+    if not CHANNEL_PATTERN.match(name):
+        return jsonify({'success': False, 'error': 'Nombre de escena no válido'}), 400
+    try:
+        changes = validate_scene(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    try:
+        def apply(scenes):
+            scenes[name] = changes
+            return changes
+        scene_registry(channel).mutate(apply)
+        
+        logger.info(f"Escena '{name}' registrada en '{channel}'")
+        return jsonify({'success': True, 'message': f"Escena '{name}' guardada", 'scene': changes})
+        
+    except Exception as e:
+        logger.error(f"Error registrando escena: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/scenes/<name>', methods=['DELETE'])
+def delete_scene(name):
+    """Eliminar una escena registrada"""
+    channel = request_channel()
+    try:
+        def apply(scenes):
+            return scenes.pop(name, None)
+        _, removed = scene_registry(channel).mutate(apply)
+        if removed is None:
+            return jsonify({'success': False, 'error': f"Escena '{name}' no encontrada"}), 404
+        
+        logger.info(f"Escena '{name}' eliminada de '{channel}'")
+        return jsonify({'success': True, 'message': f"Escena '{name}' eliminada"})
+        
+    except Exception as e:
+        logger.error(f"Error eliminando escena: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/scenes/<name>/apply', methods=['POST'])
+def apply_scene(name):
+    """Aplicar una escena registrada en una sola actualización"""
+    channel = request_channel()
+    try:
+        changed = apply_named_scene(channel, name)
+        return jsonify({'success': True, 'message': f"Escena '{name}' aplicada", 'changed': list(changed)})
+        
+    except KeyError:
+        return jsonify({'success': False, 'error': f"Escena '{name}' no encontrada"}), 404
+    except Exception as e:
+        logger.error(f"Error aplicando escena: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/apply_changes', methods=['POST'])
+def apply_changes():
+    """Aplicar varios cambios sin registrar escena: {"marquee": {...}, "transition": {...}}"""
+    channel = request_channel()
+    try:
+        changes = validate_scene(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    try:
+        changed = apply_scene_changes(channel, changes)
+        return jsonify({'success': True, 'message': 'Cambios aplicados', 'changed': list(changed)})
+        
+    except Exception as e:
+        logger.error(f"Error aplicando cambios: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
 
 # WebSocket Events
 @socketio.on('connect')
 def handle_connect():
-    """Cliente conectado"""
-    logger.info(f"Cliente conectado: {request.sid}")
-    # Enviar estado actual al cliente recién conectado
-    emit('initial_state', overlay_state)
+    """Cliente conectado: entra en la sala de su canal y tipo (io({query: {channel, overlay}}))"""
+    channel = (request.args.get('channel') or DEFAULT_CHANNEL).lower()
+    # Sin overlay (páginas antiguas) se trata como panel de control y recibe todo
+    kind = request.args.get('overlay') or 'control'
+    if not CHANNEL_PATTERN.match(channel) or kind not in OVERLAY_ROOMS:
+        logger.warning(f"Conexión rechazada: canal '{channel}', overlay '{kind}'")
+        return False
+    join_room(overlay_room(channel, kind))
+    client_rooms[request.sid] = (channel, kind)
+    logger.info(f"Cliente conectado: {request.sid} ({overlay_room(channel, kind)})")
+    # Enviar al cliente recién conectado solo el estado de su sala
+    emit('initial_state', room_snapshot(channel, kind))
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Cliente desconectado"""
+    client_rooms.pop(request.sid, None)
     logger.info(f"Cliente desconectado: {request.sid}")
 
 @socketio.on('request_state')
 def handle_request_state():
     """Cliente solicita estado actual"""
-    emit('initial_state', overlay_state)
+    channel, kind = client_rooms.get(request.sid, (DEFAULT_CHANNEL, 'control'))
+    emit('initial_state', room_snapshot(channel, kind))
+
+@socketio.on('apply_scene')
+def handle_apply_scene(data):
+    """Aplicar una escena registrada desde el panel de control: {"name"} (un solo mensaje)"""
+    channel, kind = client_rooms.get(request.sid, (DEFAULT_CHANNEL, 'control'))
+    if kind != 'control':
+        return {'success': False, 'error': 'Solo el panel de control puede cambiar de escena'}
+    name = (data or {}).get('name')
+    try:
+        return {'success': True, 'changed': list(apply_named_scene(channel, name))}
+    except KeyError:
+        return {'success': False, 'error': f"Escena '{name}' no encontrada"}
+    except Exception as e:
+        logger.error(f"Error aplicando escena: {str(e)}")
+        return {'success': False, 'error': str(e)}
 
 if __name__ == '__main__':
     print("="*50)
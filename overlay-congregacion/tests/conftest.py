@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Las pruebas usan el estado en memoria, sin Redis (antes de importar app.py)
+os.environ['STATE_BACKEND_URL'] = 'memory://'
+os.environ['SOCKETIO_MESSAGE_QUEUE'] = ''
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
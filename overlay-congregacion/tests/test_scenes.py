@@ -0,0 +1,53 @@
+import pytest
+from app import app, socketio
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+def overlay(channel, kind):
+    socket = socketio.test_client(app, query_string=f'channel={channel}&overlay={kind}')
+    socket.get_received()  # initial_state
+    return socket
+
+def scene_updates(socket):
+    return [message['args'][0] for message in socket.get_received() if message['name'] == 'scene_update']
+
+def test_scene_applies_every_part_in_one_update_per_room(client):
+    marquee, transition, control = (overlay('escena', kind) for kind in ('marquee', 'transition', 'control'))
+    response = client.post('/api/scenes/pausa/apply?channel=escena')
+    assert response.get_json()['changed'] == ['marquee', 'transition']
+
+    state = client.get('/api/get_state?channel=escena').get_json()
+    assert (state['marquee']['visible'], state['transition']['visible']) == (False, True)
+    # Cada sala recibe un solo mensaje con solo las partes que muestra
+    assert scene_updates(marquee) == [{'scene': 'pausa', 'marquee': state['marquee']}]
+    assert scene_updates(transition) == [{'scene': 'pausa', 'transition': state['transition']}]
+    assert scene_updates(control) == [dict(state, scene='pausa')]
+
+def test_reapplying_a_scene_changes_nothing(client):
+    marquee, control = overlay('repetida', 'marquee'), overlay('repetida', 'control')
+    client.post('/api/scenes/pausa/apply?channel=repetida')
+    marquee.get_received()
+    control.get_received()
+
+    response = client.post('/api/scenes/pausa/apply?channel=repetida')
+    assert response.get_json()['changed'] == []
+    assert scene_updates(marquee) == []
+    assert scene_updates(control) == [{'scene': 'pausa'}]
+
+def test_registered_scene_is_validated_and_applied(client):
+    bad = client.post('/api/scenes/aviso?channel=registro', json={'marquee': {'visible': 'sí'}})
+    assert bad.status_code == 400
+    assert 'aviso' not in client.get('/api/scenes?channel=registro').get_json()['scenes']
+
+    client.post('/api/scenes/aviso?channel=registro', json={'marquee': {'text': '  Oración  '}})
+    client.post('/api/scenes/aviso/apply?channel=registro')
+    assert client.get('/api/get_state?channel=registro').get_json()['marquee']['text'] == 'Oración'
+    assert client.post('/api/scenes/nada/apply?channel=registro').status_code == 404
+
+def test_only_the_control_panel_applies_scenes_over_the_socket():
+    marquee, control = overlay('socket', 'marquee'), overlay('socket', 'control')
+    assert not marquee.emit('apply_scene', {'name': 'pausa'}, callback=True)['success']
+    assert control.emit('apply_scene', {'name': 'pausa'}, callback=True) == {
+        'success': True, 'changed': ['marquee', 'transition']}
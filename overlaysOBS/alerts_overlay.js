@@ -2,10 +2,9 @@
 class AlertsOverlay {
     constructor() {
         this.socket = null;
-        this.serverUrl = 'ws://localhost:5000';
+        this.serverUrl = 'ws://localhost:5000/ws/overlays';
         this.currentAlert = null;
-        this.alertQueue = [];
-        this.isShowingAlert = false;
+        this.hideTimer = null;
         
         this.init();
     }
@@ -54,7 +53,8 @@ class AlertsOverlay {
     handleAlert(data) {
         switch (data.type) {
             case 'alert':
-                this.queueAlert(data);
+                // El servidor ordena, agrupa y espacia las alertas: solo llega la que toca mostrar
+                this.showAlert(data);
                 break;
             case 'clear_alerts':
                 this.clearAllAlerts();
@@ -62,27 +62,12 @@ class AlertsOverlay {
         }
     }
     
-    queueAlert(alertData) {
-        this.alertQueue.push(alertData);
-        
-        if (!this.isShowingAlert) {
-            this.showNextAlert();
-        }
-    }
-    
-    showNextAlert() {
-        if (this.alertQueue.length === 0) {
-            this.isShowingAlert = false;
-            return;
-        }
-        
-        this.isShowingAlert = true;
-        const alert = this.alertQueue.shift();
+    showAlert(alert) {
+        // Sustituye a la que hubiera en pantalla
+        clearTimeout(this.hideTimer);
+        this.resetCustomStyle();
+        this.currentAlert = alert;
         
-        this.displayAlert(alert);
-    }
-    
-    displayAlert(alert) {
         // Configurar contenido de la alerta
         this.alertTitle.textContent = alert.title || 'ALERTA';
         this.alertMessage.textContent = alert.message || '';
@@ -104,22 +89,19 @@ class AlertsOverlay {
         
         // Ocultar después del tiempo especificado
         const duration = alert.duration || 5000;
-        setTimeout(() => {
+        this.hideTimer = setTimeout(() => {
             this.hideAlert();
         }, duration);
     }
     
     hideAlert() {
+        clearTimeout(this.hideTimer);
+        this.currentAlert = null;
         this.alertBox.classList.remove('fade-in');
         this.alertBox.style.display = 'none';
         
         // Resetear estilos personalizados
         this.resetCustomStyle();
-        
-        // Mostrar siguiente alerta si existe
-        setTimeout(() => {
-            this.showNextAlert();
-        }, 500);
     }
     
     applyCustomStyle(style) {
@@ -151,13 +133,12 @@ class AlertsOverlay {
     }
     
     clearAllAlerts() {
-        this.alertQueue = [];
         this.hideAlert();
     }
     
     // Métodos para tipos específicos de alertas
     showScoreAlert(team, score) {
-        this.queueAlert({
+        this.showAlert({
             title: '¡GOL!',
             message: `${team} marca - ${score}`,
             icon: '⚽',
@@ -170,7 +151,7 @@ class AlertsOverlay {
     }
     
     showRoundAlert(round) {
-        this.queueAlert({
+        this.showAlert({
             title: 'NUEVA RONDA',
             message: `Comienza ${round}`,
             icon: '🎯',
@@ -183,7 +164,7 @@ class AlertsOverlay {
     }
     
     showGameOverAlert(winner) {
-        this.queueAlert({
+        this.showAlert({
             title: '¡JUEGO TERMINADO!',
             message: `Ganador: ${winner}`,
             icon: '🏆',
@@ -2,7 +2,7 @@
 class ChatOverlay {
     constructor() {
         this.socket = null;
-        this.serverUrl = 'ws://localhost:5000';
+        this.serverUrl = 'ws://localhost:5000/ws/overlays';
         this.maxMessages = 10;
         this.messages = [];
         
@@ -53,6 +53,10 @@ class ChatOverlay {
             case 'new_message':
                 this.addMessage(data.message);
                 break;
+            case 'new_messages':
+                // Mensajes de un ciclo del servidor: se pintan de una vez
+                this.addMessages(data.messages);
+                break;
             case 'chat_history':
                 this.loadMessages(data.messages);
                 break;
@@ -60,13 +64,15 @@ class ChatOverlay {
     }
     
     addMessage(message) {
-        // Agregar nuevo mensaje
-        this.messages.push(message);
+        this.addMessages([message]);
+    }
+    
+    addMessages(messages) {
+        // Agregar nuevos mensajes
+        this.messages.push(...messages);
         
         // Mantener solo los últimos N mensajes
-        if (this.messages.length > this.maxMessages) {
-            this.messages.shift();
-        }
+        this.messages = this.messages.slice(-this.maxMessages);
         
         // Actualizar la interfaz
         this.renderMessages();
@@ -125,7 +131,7 @@ class ChatOverlay {
     
     loadRecentMessages() {
         // Cargar mensajes recientes del servidor
-        fetch('http://localhost:5000/api/overlay/chat')
+        fetch(`http://localhost:5000/api/overlay/chat?limit=${this.maxMessages}`)
             .then(response => response.json())
             .then(data => {
                 if (data.messages) {
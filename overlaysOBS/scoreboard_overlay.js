@@ -2,7 +2,7 @@
 class ScoreboardOverlay {
     constructor() {
         this.socket = null;
-        this.serverUrl = 'ws://localhost:5000';
+        this.serverUrl = 'ws://localhost:5000/ws/overlays';
         this.reconnectAttempts = 0;
         this.maxReconnectAttempts = 5;
         this.reconnectDelay = 3000;
@@ -34,6 +34,11 @@ class ScoreboardOverlay {
             this.socket.onopen = () => {
                 console.log('Conectado al servidor WebSocket');
                 this.reconnectAttempts = 0;
+                // Suscribirse al marcador (envía el estado completo al suscribirse)
+                this.socket.send(JSON.stringify({
+                    type: 'subscribe',
+                    channel: 'scoreboard'
+                }));
             };
             
             this.socket.onmessage = (event) => {
@@ -0,0 +1,229 @@
+import atexit
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Tipos de alerta conocidos: prioridad, icono por defecto y textos (una sola
+# alerta, varias fundidas) para cuando la alerta no trae los suyos o se funde.
+# Cualquier otro tipo (o ninguno) no se funde y usa la prioridad que traiga o
+# DEFAULT_PRIORITY.
+ALERT_KINDS = {
+    'raid': {'priority': 40, 'icon': '🚀', 'titles': ('¡Raid!', '¡{count} raids!'),
+             'messages': ('{users}', '{users}')},
+    'donation': {'priority': 30, 'icon': '💰', 'titles': ('¡Donación!', '¡{count} donaciones!'),
+                 'messages': ('{users} · {amount}', '{users} · {amount} en total')},
+    'subscription': {'priority': 20, 'icon': '⭐',
+                     'titles': ('¡Nueva suscripción!', '¡{count} nuevas suscripciones!'),
+                     'messages': ('{users}', '{users}')},
+    'follow': {'priority': 10, 'icon': '💙', 'titles': ('¡Nuevo seguidor!', '¡{count} nuevos seguidores!'),
+               'messages': ('{users}', '{users}')}
+}
+DEFAULT_PRIORITY = 25
+# Nombres que se muestran en una alerta fundida ("ana, bo, carla y 9 más")
+MERGED_USERS_SHOWN = 3
+
+def format_amount(amount):
+    return str(int(amount)) if float(amount).is_integer() else f"{amount:.2f}"
+
+class AlertQueue:
+    """Cola de alertas del overlay de OBS, con la prioridad y el ritmo en el servidor
+
+    El overlay solo recibe la alerta que toca mostrar, con su duración, y la
+    siguiente no sale hasta que termina (más gap). Mientras esperan, las
+    alertas de un mismo tipo conocido se funden en una ("12 nuevos
+    seguidores"). Como mucho quedan max_pending alertas y budget segundos de
+    alertas a su duración mínima: si se supera se descartan las de menor
+    prioridad. Si la cola acumulada pasa de budget, cada alerta se acorta en
+    proporción (hasta min_duration), y las que esperan más de max_age se
+    descartan al llegar su turno.
+    """
+
+    def __init__(self, publish, default_duration=5000, min_duration=2000, max_duration=10000,
+                 gap=500, budget=60, max_age=120, max_pending=50):
+        self.publish = publish
+        self.default_duration = default_duration
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.gap = gap
+        self.budget = budget
+        self.max_age = max_age
+        self.max_pending = max_pending
+        self._pending = []
+        self._seq = 0
+        self._current = None
+        self._current_until = 0.0
+        self._next_slot = 0.0
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread = None
+        self.stats = {
+            'received': 0,
+            'merged': 0,
+            'shown': 0,
+            'dropped_budget': 0,
+            'dropped_expired': 0,
+            'cleared': 0
+        }
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='alert-queue', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        logger.info("Cola de alertas de los overlays iniciada")
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _duration(self, alert):
+        try:
+            duration = int(alert.get('duration') or self.default_duration)
+        except (TypeError, ValueError):
+            duration = self.default_duration
+        return min(max(duration, self.min_duration), self.max_duration)
+
+    def submit(self, alert):
+        """Encolar una alerta ({"kind"?, "title", "message", "user"?, "amount"?, ...})"""
+        kind = alert.get('kind')
+        spec = ALERT_KINDS.get(kind)
+        now = time.monotonic()
+        with self._cond:
+            self.stats['received'] += 1
+            if spec is not None:
+                entry = next((entry for entry in self._pending if entry['kind'] == kind), None)
+                if entry is not None:
+                    self._merge(entry, alert)
+                    self.stats['merged'] += 1
+                    return
+            try:
+                priority = spec['priority'] if spec else int(alert.get('priority', DEFAULT_PRIORITY))
+            except (TypeError, ValueError):
+                priority = DEFAULT_PRIORITY
+            self._seq += 1
+            entry = {
+                'kind': kind if spec else None,
+                'priority': priority,
+                'seq': self._seq,
+                'queued_at': now,
+                'alert': alert,
+                'count': 0,
+                'users': [],
+                'amount': 0.0,
+                'duration': 0
+            }
+            self._merge(entry, alert)
+            self._pending.append(entry)
+            self._enforce_budget()
+            self._cond.notify()
+
+    def _merge(self, entry, alert):
+        entry['count'] += 1
+        entry['duration'] = max(entry['duration'], self._duration(alert))
+        user = alert.get('user')
+        if user and user not in entry['users'] and len(entry['users']) < MERGED_USERS_SHOWN:
+            entry['users'].append(str(user))
+        try:
+            entry['amount'] += float(alert.get('amount') or 0)
+        except (TypeError, ValueError):
+            pass
+
+    def _enforce_budget(self):
+        """Descartar las de menor prioridad (las más nuevas primero) si la cola se pasa"""
+        while (len(self._pending) > self.max_pending
+               or len(self._pending) * self.min_duration / 1000 > self.budget):
+            victim = min(self._pending, key=lambda entry: (entry['priority'], -entry['seq']))
+            self._pending.remove(victim)
+            self.stats['dropped_budget'] += victim['count']
+
+    def _render(self, entry, duration):
+        """Mensaje 'alert' de alerts_overlay.js para una entrada (fundida o no)"""
+        alert = entry['alert']
+        spec = ALERT_KINDS.get(entry['kind'])
+        message = {key: alert[key] for key in ('title', 'message', 'icon', 'sound', 'style') if key in alert}
+        if spec is not None:
+            message.setdefault('icon', spec['icon'])
+            merged = entry['count'] > 1
+            users = ', '.join(entry['users'])
+            if users and entry['count'] > len(entry['users']):
+                users += f" y {entry['count'] - len(entry['users'])} más"
+            if merged or 'title' not in message:
+                message['title'] = spec['titles'][merged].format(count=entry['count'])
+            if merged or 'message' not in message:
+                message['message'] = spec['messages'][merged].format(
+                    users=users, amount=format_amount(entry['amount']))
+        message.update(type='alert', kind=entry['kind'], count=entry['count'], duration=duration)
+        return message
+
+    def _next(self, now):
+        """Sacar la alerta de más prioridad que no haya caducado (None si no queda ninguna)"""
+        while self._pending:
+            entry = max(self._pending, key=lambda entry: (entry['priority'], -entry['seq']))
+            self._pending.remove(entry)
+            if now - entry['queued_at'] > self.max_age:
+                self.stats['dropped_expired'] += entry['count']
+                continue
+            backlog = sum(pending['duration'] for pending in self._pending) / 1000
+            duration = entry['duration']
+            if backlog > self.budget:
+                # Cola larga: acortar en proporción para ponerse al día
+                duration = max(self.min_duration, int(duration * self.budget / backlog))
+            return self._render(entry, duration)
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stop:
+                    return
+                now = time.monotonic()
+                if not self._pending or now < self._next_slot:
+                    # Despierta al llegar una alerta, al terminar la actual o al parar
+                    self._cond.wait(self._next_slot - now if self._pending else None)
+                    continue
+                alert = self._next(now)
+                if alert is None:
+                    continue
+                self._current = alert
+                self._current_until = now + alert['duration'] / 1000
+                self._next_slot = self._current_until + self.gap / 1000
+                self.stats['shown'] += 1
+            try:
+                self.publish(alert)
+            except Exception as e:
+                logger.error(f"Error publicando alerta: {e}")
+
+    def current(self):
+        """Alerta en pantalla con el tiempo que le queda (para quien se suscribe a mitad)"""
+        with self._cond:
+            remaining = int((self._current_until - time.monotonic()) * 1000)
+            if self._current is None or remaining <= 0:
+                return None
+            # Sin sonido: ya sonó cuando empezó
+            alert = {key: value for key, value in self._current.items() if key != 'sound'}
+            return dict(alert, duration=remaining)
+
+    def clear(self):
+        """Vaciar la cola y quitar la alerta actual"""
+        with self._cond:
+            self.stats['cleared'] += sum(entry['count'] for entry in self._pending)
+            self._pending.clear()
+            self._current = None
+            self._current_until = self._next_slot = 0.0
+            self._cond.notify()
+        self.publish({'type': 'clear_alerts'})
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats['pending'] = len(self._pending)
+            stats['pending_alerts'] = sum(entry['count'] for entry in self._pending)
+            stats['showing'] = self._current is not None and self._current_until > time.monotonic()
+        return stats
@@ -1,16 +1,85 @@
+from config import Config
+
+# Los modos de alta concurrencia deben parchear la librería estándar (sockets,
+# hilos) y psycopg2 antes de importar cualquier otro módulo
+if Config.SOCKETIO_ASYNC_MODE == 'eventlet':
+    try:
+        import eventlet
+        eventlet.monkey_patch()
+        if Config.USE_DATABASE:
+            from psycogreen.eventlet import patch_psycopg
+            patch_psycopg()
+    except ImportError as e:
+        raise RuntimeError("SOCKETIO_ASYNC_MODE=eventlet requiere: pip install eventlet psycogreen") from e
+elif Config.SOCKETIO_ASYNC_MODE == 'gevent':
+    try:
+        from gevent import monkey
+        monkey.patch_all()
+        if Config.USE_DATABASE:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+    except ImportError as e:
+        raise RuntimeError("SOCKETIO_ASYNC_MODE=gevent requiere: pip install gevent gevent-websocket psycogreen") from e
+elif Config.SOCKETIO_ASYNC_MODE != 'threading':
+    raise RuntimeError(f"SOCKETIO_ASYNC_MODE no soportado: {Config.SOCKETIO_ASYNC_MODE}")
+
+import logging
 from flask import Flask
 from flask_socketio import SocketIO
+from http_cache import register_http_cache
+from overlays import (overlay_bp, sock, overlay_hub, chat_pipeline, chat_relay, alert_queue,
+                      alert_relay)
+from models import question_store, game_registry, DEFAULT_GAME
 from routes import main_bp
 from websocket_events import register_websocket_events
+from write_behind import answer_writer
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'game_system_secret_key_2024'
 
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# Con SOCKETIO_MESSAGE_QUEUE los emits se publican en la cola y cada worker
+# los entrega a sus propios clientes, así las salas abarcan todos los procesos
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=Config.SOCKETIO_ASYNC_MODE,
+                    message_queue=Config.SOCKETIO_MESSAGE_QUEUE)
 
 app.register_blueprint(main_bp)
+# WebSocket simple de los overlays de OBS (/ws/overlays) y sus instantáneas REST
+sock.init_app(app)
+app.register_blueprint(overlay_bp)
+overlay_hub.start()
+chat_pipeline.start()
+if chat_relay is not None:
+    chat_relay.start()
+alert_queue.start()
+if alert_relay is not None:
+    alert_relay.start()
+register_http_cache(app)
 
 register_websocket_events(socketio)
 
+def refresh_question_store():
+    """Sincronizar periódicamente el banco en memoria con PostgreSQL"""
+    while True:
+        socketio.sleep(Config.QUESTION_STORE_REFRESH_INTERVAL)
+        try:
+            question_store.refresh_from_database()
+        except Exception as e:
+            logger.error(f"Error refrescando banco de preguntas: {e}")
+
+if Config.USE_DATABASE:
+    # Precargar el banco activo una sola vez; las lecturas no vuelven a consultar
+    question_store.load_from_database()
+    socketio.start_background_task(refresh_question_store)
+
+    game_registry.get(DEFAULT_GAME).start_database_session(game_registry.info(DEFAULT_GAME)['name'])
+    answer_writer.start()
+
 if __name__ == '__main__':
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    if Config.SOCKETIO_ASYNC_MODE == 'threading':
+        socketio.run(app, debug=Config.DEBUG, host='0.0.0.0', port=Config.PORT,
+                     allow_unsafe_werkzeug=True)
+    else:
+        # eventlet/gevent sirven con su propio servidor WSGI; el recargador no es compatible
+        socketio.run(app, debug=Config.DEBUG, use_reloader=False, host='0.0.0.0', port=Config.PORT)
\ No newline at end of file
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Benchmark de una partida completa contra el servidor de tablero.
+
+Arranca app.py en un subproceso, conecta clientes simulados de
+respuestas/team1, respuestas/team2, tablero y marcador, y juega rondas de
+send_question → team_answer (un dispositivo de cada equipo) → show_answer →
+update_score. Mide la latencia de difusión de cada parche hasta todos los
+clientes, los eventos perdidos o duplicados y la CPU y memoria del servidor.
+
+Termina con código 1 si se superan los umbrales o si empeora respecto a una
+línea base guardada, para usarlo como control de regresión de los cambios en
+websocket_events.py.
+
+Requiere: pip install "python-socketio[asyncio_client]" psutil
+
+Uso:
+    python benchmark.py --teams 100 --tableros 20 --marcadores 20 --rounds 10
+    python benchmark.py --save-baseline benchmark_base.json
+    python benchmark.py --baseline benchmark_base.json --tolerance 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import psutil
+import socketio
+from loadtest import percentile
+
+# Salas a las que se une cada tipo de pantalla (igual que su JavaScript)
+CLIENT_ROOMS = {
+    'team1': ['display'],
+    'team2': ['display'],
+    'tablero': ['display'],
+    'marcador': ['display', 'scoreboard']
+}
+
+BROADCAST_EVENTS = ('new_question', 'team_answered', 'show_correct_answer', 'score_updated', 'game_reset')
+
+class SimulatedClient:
+    """Pantalla simulada que registra cuándo recibe cada versión del estado"""
+
+    def __init__(self, url, kind):
+        self.url = url
+        self.kind = kind
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.received = {}
+        self.duplicates = 0
+        self._answer = None
+        for event in BROADCAST_EVENTS:
+            self.sio.on(event, self._on_patch)
+        self.sio.on('batch', self._on_batch)
+        self.sio.on('answer_result', self._on_answer_result)
+        self.sio.on('clock_ping', self._on_clock_ping)
+
+    async def _on_patch(self, data):
+        version = data.get('version')
+        if version in self.received:
+            self.duplicates += 1
+        else:
+            self.received[version] = time.perf_counter()
+
+    async def _on_batch(self, data):
+        # Trama agrupada por el servidor (BROADCAST_FRAME_MS): se confirma como el navegador
+        for event, payload in data['events']:
+            if event in BROADCAST_EVENTS:
+                await self._on_patch(payload)
+        await self.sio.emit('batch_ack', {'origin': data['origin']})
+
+    async def _on_answer_result(self, data):
+        if self._answer is not None and not self._answer.done():
+            self._answer.set_result(data)
+
+    async def _on_clock_ping(self, data=None):
+        await self.sio.emit('clock_pong', {'client_ts': time.time()})
+
+    async def connect(self):
+        await self.sio.connect(self.url, transports=['websocket'])
+        for room in CLIENT_ROOMS[self.kind]:
+            await self.sio.emit('join', {'room': room})
+        if self.kind in ('team1', 'team2'):
+            await self.sio.emit('clock_sync')
+
+    async def answer(self, answer, timeout):
+        """Responder como lo hace respuestas.js y esperar 'answer_result'"""
+        self._answer = asyncio.get_running_loop().create_future()
+        await self.sio.emit('team_answer', {'team_id': self.kind, 'answer': answer, 'client_ts': time.time()})
+        return await asyncio.wait_for(self._answer, timeout)
+
+    async def disconnect(self):
+        await self.sio.disconnect()
+
+class Moderator:
+    """Panel del moderador: cada acción espera su confirmación"""
+
+    REPLIES = ('question_sent', 'answer_shown', 'score_update_confirmed', 'reset_confirmed')
+
+    def __init__(self, url):
+        self.url = url
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self._waiting = {}
+        for reply in self.REPLIES:
+            self.sio.on(reply, self._reply_handler(reply))
+
+    def _reply_handler(self, reply):
+        async def handler(data):
+            future = self._waiting.pop(reply, None)
+            if future is not None and not future.done():
+                future.set_result(data)
+        return handler
+
+    async def connect(self):
+        await self.sio.connect(self.url, transports=['websocket'])
+        await self.sio.emit('join', {'room': 'moderator'})
+
+    async def call(self, event, reply, data=None, timeout=5.0):
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[reply] = future
+        await self.sio.emit(event, data)
+        return await asyncio.wait_for(future, timeout)
+
+    async def disconnect(self):
+        await self.sio.disconnect()
+
+class ResourceSampler:
+    """Muestreo periódico de CPU y memoria del proceso servidor"""
+
+    def __init__(self, pid, interval=0.25):
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.cpu_samples = []
+        self.rss_samples = []
+        self._cpu_start = None
+
+    def rss_mb(self):
+        return self.process.memory_info().rss / 1024 / 1024
+
+    def _cpu_seconds(self):
+        times = self.process.cpu_times()
+        return times.user + times.system
+
+    async def run(self):
+        self._cpu_start = self._cpu_seconds()
+        self.process.cpu_percent(None)
+        while True:
+            await asyncio.sleep(self.interval)
+            self.cpu_samples.append(self.process.cpu_percent(None))
+            self.rss_samples.append(self.rss_mb())
+
+    def summary(self):
+        return {
+            'cpu_seconds': round(self._cpu_seconds() - self._cpu_start, 3),
+            'cpu_avg_percent': round(sum(self.cpu_samples) / len(self.cpu_samples), 1) if self.cpu_samples else 0.0,
+            'cpu_max_percent': round(max(self.cpu_samples, default=0.0), 1),
+            'rss_max_mb': round(max(self.rss_samples, default=self.rss_mb()), 1),
+            'rss_end_mb': round(self.rss_mb(), 1)
+        }
+
+def latency_summary(values_ms):
+    return {
+        'count': len(values_ms),
+        'p50_ms': round(percentile(values_ms, 0.50), 3),
+        'p95_ms': round(percentile(values_ms, 0.95), 3),
+        'p99_ms': round(percentile(values_ms, 0.99), 3),
+        'max_ms': round(max(values_ms, default=0.0), 3)
+    }
+
+def fetch_json(url):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return json.load(response)
+
+def start_server(args, log):
+    """Arrancar app.py con datos mock y esperar a que responda"""
+    env = dict(os.environ,
+               PORT=str(args.port),
+               DEBUG='False',
+               SOCKETIO_ASYNC_MODE=args.async_mode,
+               USE_DATABASE='True' if args.use_database else 'False')
+    server = subprocess.Popen([sys.executable, 'app.py'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            break
+        try:
+            fetch_json(f"{args.url}/api/game_state")
+            return server
+        except OSError:
+            time.sleep(0.2)
+
+    server.kill()
+    log.seek(0)
+    tail = log.read().decode(errors='replace')[-2000:]
+    raise RuntimeError(f"El servidor no arrancó en {args.url}:\n{tail}")
+
+async def connect_all(clients, batch_size):
+    """Conectar por lotes; devuelve cuántos fallaron"""
+    failed = 0
+    for i in range(0, len(clients), batch_size):
+        batch = clients[i:i + batch_size]
+        results = await asyncio.gather(*(c.connect() for c in batch), return_exceptions=True)
+        failed += sum(1 for r in results if isinstance(r, Exception))
+    return failed
+
+async def broadcast_step(action, clients, version, timeout):
+    """Ejecutar una acción y esperar a que la versión resultante llegue a todos los clientes
+
+    Devuelve las latencias (ms) de los clientes que la recibieron a tiempo.
+    """
+    start = time.perf_counter()
+    await action()
+    deadline = start + timeout
+    while time.perf_counter() < deadline and not all(version in c.received for c in clients):
+        await asyncio.sleep(0.005)
+    return [(c.received[version] - start) * 1000 for c in clients if version in c.received]
+
+async def play(args, clients, moderator, rng):
+    """Jugar las rondas del guion; devuelve latencias por evento y versiones esperadas"""
+    latencies = {event: [] for event in BROADCAST_EVENTS if event != 'game_reset'}
+    answer_rtt = []
+    expected = []
+    teams = {team: [c for c in clients if c.kind == team] for team in ('team1', 'team2')}
+    version = fetch_json(f"{args.url}/api/game_state")['version']
+
+    for round_number in range(args.rounds):
+        question_id = args.questions[round_number % len(args.questions)]
+        sent = {}
+
+        async def send_question():
+            sent.update(await moderator.call('send_question', 'question_sent',
+                                             {'question_id': question_id, 'target_team': 'both'},
+                                             args.timeout))
+
+        version += 1
+        expected.append(version)
+        latencies['new_question'] += await broadcast_step(send_question, clients, version, args.timeout)
+        if sent.get('status') != 'success':
+            raise RuntimeError(f"send_question {question_id} rechazado: {sent}")
+
+        for team, devices in teams.items():
+            if not devices:
+                continue
+            device = devices[round_number % len(devices)]
+            answer = rng.choice(sent['question']['options'])
+
+            async def team_answer():
+                start = time.perf_counter()
+                result = await device.answer(answer, args.timeout)
+                answer_rtt.append((time.perf_counter() - start) * 1000)
+                if result.get('status') != 'success':
+                    raise RuntimeError(f"team_answer de {team} rechazado: {result}")
+
+            version += 1
+            expected.append(version)
+            latencies['team_answered'] += await broadcast_step(team_answer, clients, version, args.timeout)
+
+        version += 1
+        expected.append(version)
+        latencies['show_correct_answer'] += await broadcast_step(
+            lambda: moderator.call('show_answer', 'answer_shown', timeout=args.timeout),
+            clients, version, args.timeout)
+
+        version += 1
+        expected.append(version)
+        latencies['score_updated'] += await broadcast_step(
+            lambda: moderator.call('update_score', 'score_update_confirmed',
+                                   {'team_id': 'team1', 'points': 5}, args.timeout),
+            clients, version, args.timeout)
+
+    return latencies, answer_rtt, expected
+
+async def run(args):
+    rng = random.Random(args.seed)
+    server = None
+    log = tempfile.TemporaryFile()
+    if args.server_pid is None:
+        server = start_server(args, log)
+        args.server_pid = server.pid
+
+    sampler = ResourceSampler(args.server_pid)
+    rss_idle = sampler.rss_mb()
+
+    kinds = (['team1'] * args.teams + ['team2'] * args.teams +
+             ['tablero'] * args.tableros + ['marcador'] * args.marcadores)
+    clients = [SimulatedClient(args.url, kind) for kind in kinds]
+    moderator = Moderator(args.url)
+    sampling = None
+
+    try:
+        await moderator.connect()
+        failed = await connect_all(clients, args.connect_batch)
+        clients = [c for c in clients if c.sio.connected]
+        await moderator.call('reset_game', 'reset_confirmed', timeout=args.timeout)
+        await asyncio.sleep(args.settle)
+        rss_connected = sampler.rss_mb()
+
+        sampling = asyncio.create_task(sampler.run())
+        started = time.perf_counter()
+        latencies, answer_rtt, expected = await play(args, clients, moderator, rng)
+        elapsed = time.perf_counter() - started
+        # Margen para entregas tardías antes de contar pérdidas
+        await asyncio.sleep(args.settle)
+        sampling.cancel()
+        server_stats = sampler.summary()
+    finally:
+        if sampling is not None:
+            sampling.cancel()
+        await asyncio.gather(*(c.disconnect() for c in clients), return_exceptions=True)
+        await moderator.disconnect()
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        log.close()
+
+    delivered = [v for values in latencies.values() for v in values]
+    dropped = sum(1 for c in clients for version in expected if version not in c.received)
+    server_stats.update({
+        'rss_idle_mb': round(rss_idle, 1),
+        'rss_connected_mb': round(rss_connected, 1),
+        'kb_per_client': round((rss_connected - rss_idle) * 1024 / len(clients), 1) if clients else 0.0
+    })
+
+    return {
+        'config': {
+            'async_mode': args.async_mode,
+            'teams_per_side': args.teams,
+            'tableros': args.tableros,
+            'marcadores': args.marcadores,
+            'rounds': args.rounds
+        },
+        'clients': len(clients),
+        'connect_failures': failed,
+        'elapsed_s': round(elapsed, 3),
+        'broadcasts': len(expected),
+        'expected_deliveries': len(expected) * len(clients),
+        'dropped': dropped,
+        'duplicates': sum(c.duplicates for c in clients),
+        'fanout': latency_summary(delivered),
+        'events': {event: latency_summary(values) for event, values in latencies.items()},
+        'answer_rtt': latency_summary(answer_rtt),
+        'server': server_stats
+    }
+
+def print_report(results):
+    config = results['config']
+    print(f"Modo {config['async_mode']}: {results['clients']} clientes "
+          f"({config['teams_per_side']}+{config['teams_per_side']} equipos, "
+          f"{config['tableros']} tableros, {config['marcadores']} marcadores), "
+          f"{config['rounds']} rondas en {results['elapsed_s']} s")
+    print(f"\n{'evento':<22} {'n':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    rows = dict(results['events'], fanout=results['fanout'], answer_result=results['answer_rtt'])
+    for name, s in rows.items():
+        print(f"{name:<22} {s['count']:>7} {s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} "
+              f"{s['p99_ms']:>8.1f} {s['max_ms']:>8.1f}")
+    print(f"\nEntregas: {results['expected_deliveries'] - results['dropped']}/{results['expected_deliveries']}"
+          f"  perdidas: {results['dropped']}  duplicadas: {results['duplicates']}"
+          f"  conexiones fallidas: {results['connect_failures']}")
+    print("Servidor: " + "  ".join(f"{key}={value}" for key, value in results['server'].items()))
+
+def check_gate(results, args):
+    """Comprobar umbrales absolutos y, si hay línea base, regresiones relativas"""
+    failures = []
+    if results['connect_failures']:
+        failures.append(f"{results['connect_failures']} clientes no pudieron conectar")
+    if results['dropped'] > args.max_dropped:
+        failures.append(f"{results['dropped']} entregas perdidas (máximo {args.max_dropped})")
+    if results['duplicates']:
+        failures.append(f"{results['duplicates']} entregas duplicadas")
+    if args.max_p95 is not None and results['fanout']['p95_ms'] > args.max_p95:
+        failures.append(f"p95 de difusión {results['fanout']['p95_ms']} ms > {args.max_p95} ms")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        compared = [
+            ('fanout p95', results['fanout']['p95_ms'], baseline['fanout']['p95_ms'], args.slack_ms),
+            ('answer_result p95', results['answer_rtt']['p95_ms'], baseline['answer_rtt']['p95_ms'], args.slack_ms),
+            ('CPU media %', results['server']['cpu_avg_percent'], baseline['server']['cpu_avg_percent'], 5.0),
+            ('KB por cliente', results['server']['kb_per_client'], baseline['server']['kb_per_client'], 8.0)
+        ]
+        for name, current, base, slack in compared:
+            limit = max(base * (1 + args.tolerance), base + slack)
+            if current > limit:
+                failures.append(f"{name}: {current} > {round(limit, 3)} (línea base {base})")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de una partida con equipos y pantallas simuladas')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--url', help='servidor ya arrancado (por defecto se arranca app.py en --port)')
+    parser.add_argument('--server-pid', type=int, help='PID del servidor indicado en --url, para medir CPU/memoria')
+    parser.add_argument('--async-mode', default=os.getenv('SOCKETIO_ASYNC_MODE', 'threading'))
+    parser.add_argument('--use-database', action='store_true', help='arrancar con USE_DATABASE=True')
+    parser.add_argument('--teams', type=int, default=50, help='dispositivos de respuestas por equipo')
+    parser.add_argument('--tableros', type=int, default=20)
+    parser.add_argument('--marcadores', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--questions', type=int, nargs='+', default=list(range(1, 9)))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=5.0, help='segundos para esperar cada difusión')
+    parser.add_argument('--settle', type=float, default=1.0)
+    parser.add_argument('--connect-batch', type=int, default=50)
+    parser.add_argument('--startup-timeout', type=float, default=20.0)
+    parser.add_argument('--max-dropped', type=int, default=0)
+    parser.add_argument('--max-p95', type=float, help='umbral absoluto de p95 de difusión en ms')
+    parser.add_argument('--baseline', help='JSON de una ejecución anterior con el que comparar')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='empeoramiento relativo permitido')
+    parser.add_argument('--slack-ms', type=float, default=5.0, help='margen absoluto para latencias pequeñas')
+    parser.add_argument('--save-baseline', help='guardar los resultados como línea base')
+    parser.add_argument('--json', action='store_true', help='imprimir los resultados en JSON')
+    args = parser.parse_args()
+
+    if args.url is None:
+        args.url = f"http://localhost:{args.port}"
+    elif args.server_pid is None:
+        parser.error('--url requiere --server-pid para medir CPU y memoria')
+
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    failures = check_gate(results, args)
+    if failures:
+        print("\nREGRESIÓN:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nOK")
+
+if __name__ == '__main__':
+    main()
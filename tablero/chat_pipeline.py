@@ -0,0 +1,183 @@
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+class ChatPipeline:
+    """Entrada del chat del directo hacia el overlay de chat de OBS
+
+    Un chat concurrido puede traer cientos de mensajes por segundo, muchos más
+    de los que una fuente de navegador de OBS puede pintar. Cada mensaje pasa
+    por descarte de duplicados (mismo id de la plataforma, o mismo autor y
+    texto dentro de dedupe_window) y por un límite por autor (cubo de fichas);
+    los que quedan esperan al siguiente ciclo. En cada ciclo se publican como
+    mucho max_rate mensajes por segundo: si hay más, se toma una muestra
+    repartida por todo el intervalo y el resto se descarta. Los publicados
+    entran en un buffer circular de history mensajes para el historial.
+    """
+
+    def __init__(self, publish, history=50, max_rate=10, flush_interval=0.1, author_rate=1.0,
+                 author_burst=3, dedupe_window=30, max_length=300, max_pending=1000):
+        self.publish = publish
+        self.max_rate = max_rate
+        self.flush_interval = flush_interval
+        self.author_rate = author_rate
+        self.author_burst = author_burst
+        self.dedupe_window = dedupe_window
+        self.max_length = max_length
+        self.max_pending = max_pending
+        self._history = deque(maxlen=history)
+        self._pending = []
+        self._seen = OrderedDict()  # clave -> instante en que caduca
+        self._authors = {}  # autor -> [fichas, último instante]
+        self._credit = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {
+            'received': 0,
+            'accepted': 0,
+            'dropped_invalid': 0,
+            'dropped_duplicate': 0,
+            'dropped_rate_limited': 0,
+            'dropped_overload': 0,
+            'flushes': 0
+        }
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='chat-pipeline', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        logger.info("Canal de chat de los overlays iniciado")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval * 2)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error publicando el chat de los overlays: {e}")
+
+    def _normalize(self, raw, now):
+        """Mensaje en el formato de chat_overlay.js, o None si no es válido"""
+        if not isinstance(raw, dict):
+            return None
+        text = ' '.join(str(raw.get('text') or '').split())[:self.max_length]
+        if not text:
+            return None
+        message = {
+            'user': str(raw.get('user') or 'Usuario')[:50],
+            'text': text,
+            'timestamp': raw.get('timestamp') or int(now * 1000)
+        }
+        if raw.get('id') is not None:
+            message['id'] = str(raw['id'])
+        return message
+
+    def _is_duplicate(self, message, now):
+        while self._seen and next(iter(self._seen.values())) <= now:
+            self._seen.popitem(last=False)
+        keys = [('text', message['user'].lower(), message['text'].lower())]
+        if 'id' in message:
+            keys.append(('id', message['id']))
+        if any(key in self._seen for key in keys):
+            return True
+        for key in keys:
+            self._seen[key] = now + self.dedupe_window
+        return False
+
+    def _take_author_token(self, user, now):
+        bucket = self._authors.get(user)
+        if bucket is None:
+            bucket = self._authors[user] = [float(self.author_burst), now]
+        tokens = min(self.author_burst, bucket[0] + (now - bucket[1]) * self.author_rate)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            return False
+        bucket[0] = tokens - 1
+        return True
+
+    def submit(self, raw):
+        """Encolar un mensaje; devuelve None si se aceptó o el motivo del descarte"""
+        now = time.monotonic()
+        message = self._normalize(raw, time.time())
+        with self._lock:
+            self.stats['received'] += 1
+            if message is None:
+                reason = 'invalid'
+            elif self._is_duplicate(message, now):
+                reason = 'duplicate'
+            elif not self._take_author_token(message['user'].lower(), now):
+                reason = 'rate_limited'
+            elif len(self._pending) >= self.max_pending:
+                reason = 'overload'
+            else:
+                self._pending.append(message)
+                return None
+            self.stats[f'dropped_{reason}'] += 1
+            return reason
+
+    def flush(self):
+        """Publicar lo pendiente dentro del presupuesto de mensajes por segundo"""
+        with self._lock:
+            budget = self.max_rate * self.flush_interval
+            # El crédito sin usar no se acumula más allá de un ciclo
+            self._credit = min(self._credit + budget, max(budget, 1.0))
+            self._prune_authors()
+            count = min(len(self._pending), int(self._credit))
+            if not count:
+                # Sin mensajes o sin crédito (max_rate bajo): lo pendiente espera al siguiente ciclo
+                return []
+            pending, self._pending = self._pending, []
+            if count < len(pending):
+                # Muestra repartida por todo el ciclo, no solo los primeros
+                step = len(pending) / count
+                self.stats['dropped_overload'] += len(pending) - count
+                pending = [pending[int((i + 0.5) * step)] for i in range(count)]
+            self._credit -= count
+            self.stats['accepted'] += count
+            self.stats['flushes'] += 1
+            self._history.extend(pending)
+        self.publish(pending)
+        return pending
+
+    def _prune_authors(self):
+        """Olvidar los autores con el cubo lleno cuando hay demasiados"""
+        if len(self._authors) < 10000:
+            return
+        now = time.monotonic()
+        for user in [user for user, (tokens, last) in self._authors.items()
+                     if tokens + (now - last) * self.author_rate >= self.author_burst]:
+            del self._authors[user]
+
+    def seed(self, messages):
+        """Cargar un historial previo (el del worker que marcaba el ritmo antes)"""
+        with self._lock:
+            self._history.clear()
+            self._history.extend(messages)
+
+    def recent(self, limit=None):
+        with self._lock:
+            messages = list(self._history)
+        return messages[-limit:] if limit else messages
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['pending'] = len(self._pending)
+            stats['history'] = len(self._history)
+            stats['authors'] = len(self._authors)
+        stats['dropped'] = sum(value for key, value in stats.items() if key.startswith('dropped_'))
+        return stats
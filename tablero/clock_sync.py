@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import deque
+from config import Config
+
+class ClockSync:
+    """Desfase de reloj y RTT de cada cliente (sid) medidos con clock_ping/clock_pong
+
+    El servidor envía 'clock_ping' y el cliente responde al instante con su
+    propio reloj; el RTT se calcula con el instante de envío que guarda el
+    servidor, no con lo que devuelve el cliente. Como en NTP, la muestra de
+    menor RTT es la que da el desfase más fiable.
+    """
+
+    # Muestras con un RTT mayor se descartan (cliente suspendido, red caída)
+    MAX_RTT = 5.0
+
+    def __init__(self, samples_per_sync=5, history=20):
+        self.samples_per_sync = samples_per_sync
+        self.history = history
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def start(self, sid):
+        """Empezar una ronda de sincronización; devuelve el server_ts del primer ping"""
+        with self._lock:
+            client = self._clients.setdefault(sid, {'samples': deque(maxlen=self.history)})
+            client['pending'] = self.samples_per_sync
+            client['ping_ts'] = time.monotonic()
+            return client['ping_ts']
+
+    def record(self, sid, client_ts):
+        """Registrar un pong; devuelve el server_ts del siguiente ping o None si la ronda terminó"""
+        now = time.monotonic()
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is None or not client.get('ping_ts') or not isinstance(client_ts, (int, float)):
+                return None
+            ping_ts = client['ping_ts']
+            rtt = now - ping_ts
+            if rtt <= self.MAX_RTT:
+                # Se supone que el pong se generó a mitad del viaje de ida y vuelta
+                client['samples'].append((rtt, client_ts - (ping_ts + rtt / 2)))
+            client['pending'] -= 1
+            client['ping_ts'] = time.monotonic() if client['pending'] > 0 else None
+            return client['ping_ts']
+
+    def estimate(self, sid):
+        """(desfase, rtt) de la mejor muestra, o None si el cliente no se ha sincronizado"""
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is None or not client['samples']:
+                return None
+            rtt, offset = min(client['samples'])
+        return offset, rtt
+
+    def timing(self, sid, client_ts=None):
+        """Instante de respuesta en el reloj del servidor y retardo de un sentido
+
+        answered_at es None si el cliente no envió su marca o no hay sincronización.
+        """
+        estimate = self.estimate(sid)
+        if estimate is None:
+            return {'answered_at': None, 'one_way': 0.0}
+        offset, rtt = estimate
+        answered_at = client_ts - offset if isinstance(client_ts, (int, float)) else None
+        return {'answered_at': answered_at, 'one_way': rtt / 2}
+
+    def forget(self, sid):
+        with self._lock:
+            self._clients.pop(sid, None)
+
+clock_sync = ClockSync(samples_per_sync=Config.CLOCK_SYNC_SAMPLES)
+
+def estimate_response_time(sent_at, received_at, answered_at=None, one_way=0.0):
+    """Tiempo de respuesta en segundos descontando la red
+
+    La pregunta llega al cliente en sent_at + one_way. El instante declarado
+    por el cliente (ya en reloj del servidor) no puede ser posterior a
+    received_at ni anterior a received_at - 2 * one_way (un RTT antes de
+    recibirla): un reloj que miente gana como mucho un RTT sobre la
+    estimación sin marca, received_at - one_way.
+    """
+    shown_at = sent_at + one_way
+    if answered_at is None:
+        answered_at = received_at - one_way
+    answered_at = min(max(answered_at, received_at - 2 * one_way), received_at)
+    return max(0.0, answered_at - shown_at)
@@ -14,9 +14,107 @@ class Config:
     # URL de conexión completa
     DATABASE_URL = f"postgresql://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_HOST}:{DATABASE_PORT}/{DATABASE_NAME}"
     
+    # Pool de conexiones (dimensionado para async_mode='threading')
+    DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '2'))
+    DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '20'))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '5'))
+    DB_POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', '1800'))
+    DB_POOL_PING_AFTER = float(os.getenv('DB_POOL_PING_AFTER', '30'))
+    
     # Configuración de Flask
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-here-change-in-production')
     DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
+    PORT = int(os.getenv('PORT', '5000'))
+    
+    # Usar PostgreSQL como origen del banco de preguntas (si no, datos mock)
+    USE_DATABASE = os.getenv('USE_DATABASE', 'False').lower() == 'true'
+    QUESTION_STORE_REFRESH_INTERVAL = float(os.getenv('QUESTION_STORE_REFRESH_INTERVAL', '30'))
+    # Segundos que el refresco incremental vuelve a leer antes de la última sincronización:
+    # updated_at es la hora de inicio de la transacción, que puede confirmarse más tarde
+    QUESTION_STORE_SYNC_OVERLAP = float(os.getenv('QUESTION_STORE_SYNC_OVERLAP', '120'))
+    
+    # Escritura diferida de respuestas y puntuaciones
+    WRITE_BEHIND_MAX_EVENTS = int(os.getenv('WRITE_BEHIND_MAX_EVENTS', '10000'))
+    WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', '500'))
+    WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', '0.5'))
+    # Reintentos de un lote que falla por sus datos antes de partirlo y descartar los eventos culpables
+    WRITE_BEHIND_MAX_RETRIES = int(os.getenv('WRITE_BEHIND_MAX_RETRIES', '3'))
+    
+    # Filas por lote que entrega el cursor del servidor en las exportaciones
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '2000'))
+    # Preguntas por transacción en la importación masiva
+    IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '500'))
+    
+    # Planificador de la siguiente pregunta (botón "Siguiente" del moderador)
+    # Categoría: round_robin o random; dificultad: adaptive o any;
+    # equipo destinatario: both, rotate o trailing (el que va último)
+    SCHEDULER_CATEGORY_POLICY = os.getenv('SCHEDULER_CATEGORY_POLICY', 'round_robin').lower()
+    SCHEDULER_DIFFICULTY_POLICY = os.getenv('SCHEDULER_DIFFICULTY_POLICY', 'adaptive').lower()
+    SCHEDULER_TARGET_POLICY = os.getenv('SCHEDULER_TARGET_POLICY', 'both').lower()
+    # Dificultad de la pregunta n (la última se mantiene hasta el final)
+    SCHEDULER_DIFFICULTY_CURVE = os.getenv('SCHEDULER_DIFFICULTY_CURVE', '1,1,2,2,3,3,4,4,5')
+    
+    # Caché HTTP: compresión de respuestas (Brotli si está instalado, si no gzip)
+    # y max-age de los recursos estáticos con hash en el nombre
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '500'))
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '6'))
+    STATIC_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', '31536000'))
+    
+    # Agrupación de difusiones: ventana de cada trama en ms (0 = enviar cada evento
+    # al momento) y tramas sin confirmar tras las que se deja de enviar a una pantalla
+    BROADCAST_FRAME_MS = float(os.getenv('BROADCAST_FRAME_MS', '33'))
+    BROADCAST_MAX_PENDING_FRAMES = int(os.getenv('BROADCAST_MAX_PENDING_FRAMES', '8'))
+    
+    # Permitir que los clientes pidan eventos en MessagePack (pip install msgpack);
+    # cada difusión se codifica además en binario para las salas que lo usan
+    WIRE_MSGPACK = os.getenv('WIRE_MSGPACK', 'False').lower() == 'true'
+    
+    # Overlays de OBS (overlaysOBS): mensajes de chat que se guardan para el historial
+    OVERLAY_CHAT_HISTORY = int(os.getenv('OVERLAY_CHAT_HISTORY', '50'))
+    # Mensajes en espera por overlay antes de cerrar una conexión que no los lee
+    OVERLAY_OUTBOX_SIZE = int(os.getenv('OVERLAY_OUTBOX_SIZE', '256'))
+    # Chat de los overlays: mensajes por segundo que llegan a OBS (el resto se muestrea),
+    # ciclo de publicación en ms, mensajes por segundo y ráfaga de cada autor,
+    # ventana de duplicados en segundos, longitud máxima y cola máxima por ciclo
+    CHAT_MAX_RATE = float(os.getenv('CHAT_MAX_RATE', '10'))
+    CHAT_FLUSH_MS = float(os.getenv('CHAT_FLUSH_MS', '100'))
+    CHAT_AUTHOR_RATE = float(os.getenv('CHAT_AUTHOR_RATE', '1'))
+    CHAT_AUTHOR_BURST = int(os.getenv('CHAT_AUTHOR_BURST', '3'))
+    CHAT_DEDUPE_SECONDS = float(os.getenv('CHAT_DEDUPE_SECONDS', '30'))
+    CHAT_MAX_LENGTH = int(os.getenv('CHAT_MAX_LENGTH', '300'))
+    CHAT_MAX_PENDING = int(os.getenv('CHAT_MAX_PENDING', '1000'))
+    # Alertas de los overlays: duración por defecto, mínima y máxima y pausa entre
+    # alertas (ms), segundos de cola antes de acortar o descartar, antigüedad
+    # máxima (s) y alertas distintas en espera
+    ALERT_DEFAULT_MS = int(os.getenv('ALERT_DEFAULT_MS', '5000'))
+    ALERT_MIN_MS = int(os.getenv('ALERT_MIN_MS', '2000'))
+    ALERT_MAX_MS = int(os.getenv('ALERT_MAX_MS', '10000'))
+    ALERT_GAP_MS = int(os.getenv('ALERT_GAP_MS', '500'))
+    ALERT_QUEUE_BUDGET = float(os.getenv('ALERT_QUEUE_BUDGET', '60'))
+    ALERT_MAX_AGE = float(os.getenv('ALERT_MAX_AGE', '120'))
+    ALERT_MAX_PENDING = int(os.getenv('ALERT_MAX_PENDING', '50'))
     
     # Configuración de SocketIO
-    SOCKETIO_ASYNC_MODE = 'threading'
\ No newline at end of file
+    # 'threading' (un hilo por conexión, servidor de desarrollo de Werkzeug),
+    # 'eventlet' o 'gevent' (green threads, servidor WSGI de producción)
+    SOCKETIO_ASYNC_MODE = os.getenv('SOCKETIO_ASYNC_MODE', 'threading').lower()
+    
+    # Arbitraje de respuestas: 'all' (puntúan todas) o 'first_correct' (solo la
+    # primera correcta según el reloj monotónico del servidor, común a los
+    # workers de una misma máquina)
+    ANSWER_ARBITRATION = os.getenv('ANSWER_ARBITRATION', 'all').lower()
+    
+    # Muestras por ronda de clock_ping/clock_pong para estimar desfase y RTT de cada cliente
+    CLOCK_SYNC_SAMPLES = int(os.getenv('CLOCK_SYNC_SAMPLES', '5'))
+    
+    # Escalado horizontal (varios workers detrás de un balanceador con sesiones persistentes)
+    # Estado compartido: memory:// (un solo proceso), redis://host:6379/0 o unix:///ruta/redis.sock
+    STATE_BACKEND_URL = os.getenv('STATE_BACKEND_URL', 'memory://')
+    # Cola de mensajes para que los emits de un worker lleguen a los clientes de todos
+    # (redis://..., o redis+socket:///ruta/redis.sock vía kombu); vacío = un solo proceso
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE') or None
+    # Cola compartida de los overlays de OBS (Redis); por defecto la de Socket.IO
+    OVERLAY_MESSAGE_QUEUE = os.getenv('OVERLAY_MESSAGE_QUEUE') or SOCKETIO_MESSAGE_QUEUE
+    # Con cola compartida, segundos del lease del worker que procesa el chat y las alertas de los overlays
+    # (si cae, otro worker lo sustituye cuando caduca)
+    OVERLAY_LEADER_LEASE = float(os.getenv('OVERLAY_LEADER_LEASE', '5'))
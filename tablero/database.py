@@ -1,8 +1,13 @@
 import psycopg2
 import psycopg2.extras
-from psycopg2.pool import SimpleConnectionPool
+from collections import namedtuple
+from functools import lru_cache
 from config import Config
+from db_pool import BlockingConnectionPool
+from metrics import query_latency
 import logging
+import re
+import time
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -16,8 +21,11 @@ class DatabaseManager:
     def init_connection_pool(self):
         """Inicializar el pool de conexiones"""
         try:
-            self.connection_pool = SimpleConnectionPool(
-                1, 10,  # min y max conexiones
+            self.connection_pool = BlockingConnectionPool(
+                Config.DB_POOL_MIN, Config.DB_POOL_MAX,
+                timeout=Config.DB_POOL_TIMEOUT,
+                max_lifetime=Config.DB_POOL_MAX_LIFETIME,
+                ping_after=Config.DB_POOL_PING_AFTER,
                 host=Config.DATABASE_HOST,
                 port=Config.DATABASE_PORT,
                 database=Config.DATABASE_NAME,
@@ -44,15 +52,18 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Error devolviendo conexión: {e}")
     
-    def execute_query(self, query, params=None, fetch_one=False, fetch_all=True):
-        """Ejecutar query y retornar resultados"""
+    def execute_query(self, query, params=None, fetch_one=False, fetch_all=True, write=None, name='adhoc'):
+        """Ejecutar query ad hoc y retornar resultados (las consultas fijas usan execute_named)"""
+        if write is None:
+            write = _is_write_query(query)
         conn = None
+        start = time.perf_counter()
         try:
             conn = self.get_connection()
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
                 cursor.execute(query, params)
                 
-                if query.strip().upper().startswith(('INSERT', 'UPDATE', 'DELETE')):
+                if write:
                     conn.commit()
                     return cursor.rowcount
                 
@@ -71,46 +82,72 @@ class DatabaseManager:
         finally:
             if conn:
                 self.return_connection(conn)
+            query_latency.observe(name, time.perf_counter() - start)
     
+    def execute_named(self, name, params=()):
+        """Ejecutar una consulta fija de QUERIES como sentencia preparada del servidor
+
+        PREPARE se hace una vez por conexión; el descriptor indica si es de
+        escritura (commit) y cómo se leen los resultados.
+        """
+        descriptor = QUERIES[name]
+        conn = None
+        start = time.perf_counter()
+        try:
+            conn = self.get_connection()
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                if name not in conn.prepared:
+                    cursor.execute(f"PREPARE {name} AS {descriptor.sql}")
+                    conn.prepared.add(name)
+
+                cursor.execute(_execute_statement(name, len(params)), params)
+
+                if descriptor.fetch == 'one':
+                    result = cursor.fetchone()
+                elif descriptor.fetch == 'all':
+                    result = cursor.fetchall()
+                else:
+                    result = cursor.rowcount
+
+                if descriptor.write:
+                    conn.commit()
+                return result
+
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            logger.error(f"Error ejecutando consulta {name}: {e}")
+            raise
+        finally:
+            if conn:
+                self.return_connection(conn)
+            query_latency.observe(name, time.perf_counter() - start)
+
+    def pool_stats(self):
+        """Espera y utilización del pool de conexiones"""
+        return self.connection_pool.stats()
+
     def close_all_connections(self):
         """Cerrar todas las conexiones del pool"""
         if self.connection_pool:
             self.connection_pool.closeall()
 
-# Instancia global del manager de base de datos
-db_manager = DatabaseManager()
+@lru_cache(maxsize=None)
+def _is_write_query(query):
+    """Clasificar una consulta ad hoc una sola vez por texto"""
+    return query.lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))
 
-# Funciones para el modelo de preguntas
-def get_all_categories():
-    """Obtener todas las categorías"""
-    query = "SELECT * FROM categories ORDER BY name"
-    return db_manager.execute_query(query)
+@lru_cache(maxsize=None)
+def _execute_statement(name, param_count):
+    placeholders = ', '.join(['%s'] * param_count)
+    return f"EXECUTE {name} ({placeholders})" if param_count else f"EXECUTE {name}"
 
-def get_questions_by_type(question_type):
-    """Obtener preguntas por tipo"""
-    query = """
-    SELECT q.*, c.name as category_name,
-           COALESCE(
-               json_agg(
-                   json_build_object(
-                       'text', qo.option_text,
-                       'order', qo.option_order
-                   ) ORDER BY qo.option_order
-               ) FILTER (WHERE qo.option_text IS NOT NULL),
-               '[]'::json
-           ) as options
-    FROM questions q
-    LEFT JOIN categories c ON q.category_id = c.id
-    LEFT JOIN question_options qo ON q.id = qo.question_id
-    WHERE q.type = %s AND q.is_active = true
-    GROUP BY q.id, c.name
-    ORDER BY q.id
-    """
-    return db_manager.execute_query(query, (question_type,))
+# Descriptor precalculado de cada consulta fija ($n = parámetro posicional)
+# write: requiere commit | fetch: 'all', 'one' o 'rowcount'
+QueryDescriptor = namedtuple('QueryDescriptor', ['name', 'sql', 'write', 'fetch'])
 
-def get_question_by_id(question_id):
-    """Obtener pregunta por ID con sus opciones"""
-    query = """
+# Pregunta con sus opciones agregadas en JSON
+QUESTION_SELECT = """
     SELECT q.*, c.name as category_name,
            COALESCE(
                json_agg(
@@ -124,91 +161,430 @@ def get_question_by_id(question_id):
     FROM questions q
     LEFT JOIN categories c ON q.category_id = c.id
     LEFT JOIN question_options qo ON q.id = qo.question_id
-    WHERE q.id = %s AND q.is_active = true
+"""
+
+QUERIES = {q.name: q for q in (
+    QueryDescriptor('categories', "SELECT * FROM categories ORDER BY name", False, 'all'),
+    QueryDescriptor('active_questions', "SELECT * FROM v_questions_with_options", False, 'all'),
+    QueryDescriptor('questions_updated_since', QUESTION_SELECT + """
+    WHERE q.updated_at > $1
     GROUP BY q.id, c.name
+    ORDER BY q.updated_at
+    """, False, 'all'),
+    QueryDescriptor('questions_deleted_since',
+                    "SELECT question_id, deleted_at FROM deleted_questions WHERE deleted_at > $1",
+                    False, 'all'),
+    QueryDescriptor('all_teams', "SELECT * FROM teams WHERE is_active = true ORDER BY name", False, 'all'),
+    QueryDescriptor('create_session', """
+    INSERT INTO game_sessions (session_name, created_by) 
+    VALUES ($1, $2) 
+    RETURNING id
+    """, True, 'one'),
+    QueryDescriptor('add_team_to_session', """
+    INSERT INTO session_teams (session_id, team_id)
+    VALUES ($1, $2)
+    ON CONFLICT (session_id, team_id) DO NOTHING
+    """, True, 'rowcount'),
+    QueryDescriptor('update_team_score', """
+    UPDATE session_teams 
+    SET current_score = current_score + $1,
+        correct_answers = correct_answers + CASE WHEN $1 > 0 THEN 1 ELSE 0 END,
+        wrong_answers = wrong_answers + CASE WHEN $1 <= 0 THEN 1 ELSE 0 END
+    WHERE session_id = $2 AND team_id = $3
+    """, True, 'rowcount'),
+    QueryDescriptor('session_teams', """
+    SELECT t.*, st.current_score, st.correct_answers, st.wrong_answers
+    FROM session_teams st
+    JOIN teams t ON t.id = st.team_id
+    WHERE st.session_id = $1 AND t.is_active = true
+    ORDER BY st.current_score DESC, st.team_id
+    """, False, 'all'),
+    # Recorre idx_session_teams_leaderboard en orden: sin ordenación y se detiene en LIMIT
+    QueryDescriptor('session_leaderboard', """
+    SELECT st.team_id, t.name, t.color, st.current_score, st.correct_answers, st.wrong_answers
+    FROM session_teams st
+    JOIN teams t ON t.id = st.team_id
+    WHERE st.session_id = $1
+    ORDER BY st.current_score DESC, st.team_id
+    LIMIT $2
+    """, False, 'all'),
+    QueryDescriptor('session_stats', """
+    SELECT ss.session_id, gs.session_name, gs.start_time, gs.end_time,
+           ss.total_teams, ss.total_score, ss.total_responses, ss.correct_responses,
+           ss.questions_answered, ss.last_answered_at,
+           (ss.total_score::float8 / NULLIF(ss.total_teams, 0)) AS avg_score,
+           (EXTRACT(EPOCH FROM ss.total_response_time)::float8 / NULLIF(ss.timed_responses, 0)) AS avg_response_seconds
+    FROM session_stats ss
+    JOIN game_sessions gs ON gs.id = ss.session_id
+    WHERE ss.session_id = $1
+    """, False, 'one'),
+    QueryDescriptor('session_stats_backfill', "SELECT session_stats_backfill($1) AS created", True, 'one'),
+    QueryDescriptor('record_response', """
+    INSERT INTO question_responses 
+    (session_id, question_id, team_id, given_answer, is_correct, points_awarded, response_time)
+    VALUES ($1, $2, $3, $4, $5, $6, $7)
+    """, True, 'rowcount'),
+    QueryDescriptor('session_history', """
+    SELECT qr.*, q.question, q.correct_answer, t.name as team_name
+    FROM question_responses qr
+    JOIN questions q ON qr.question_id = q.id
+    JOIN teams t ON qr.team_id = t.id
+    WHERE qr.session_id = $1
+    ORDER BY qr.answered_at DESC
+    """, False, 'all'),
+    QueryDescriptor('end_session', """
+    UPDATE game_sessions 
+    SET end_time = CURRENT_TIMESTAMP, is_active = false
+    WHERE id = $1
+    """, True, 'rowcount'),
+)}
+
+# Instancia global del manager de base de datos
+db_manager = DatabaseManager()
+
+# Funciones para el modelo de preguntas
+def get_all_categories():
+    """Obtener todas las categorías"""
+    return db_manager.execute_named('categories')
+
+# Filtros de la búsqueda de preguntas (mismo esquema que EXPORT_QUERIES)
+SEARCH_FILTERS = {
+    'text': "q.search_vector @@ to_tsquery('simple', search_unaccent(%(text)s))",
+    'type': "q.type = %(type)s",
+    'category': "c.name = %(category)s",
+    'difficulty': "q.difficulty = %(difficulty)s",
+    'exclude_ids': "q.id <> ALL(%(exclude_ids)s)",
+    'after': "q.id > %(after)s"
+}
+
+def search_query_terms(text):
+    """Consulta tsquery con prefijos ('jupi plan' -> 'jupi:* & plan:*'); None si no hay palabras"""
+    words = re.findall(r'\w+', text or '')
+    return ' & '.join(f"{word}:*" for word in words) or None
+
+def search_questions(text=None, question_type=None, category=None, difficulty=None,
+                     exclude_ids=(), after=None, limit=20):
+    """Buscar preguntas activas con paginación por id (keyset)
+
+    text usa el índice GIN de search_vector con coincidencia por prefijo y sin
+    distinguir tildes, igual que QuestionStore.search, para buscar mientras se
+    escribe. Primero se elige la página de ids y solo
+    después se agregan las opciones de esas preguntas.
+    Devuelve (filas, after de la página siguiente o None).
     """
-    return db_manager.execute_query(query, (question_id,), fetch_one=True)
+    params = {
+        'text': search_query_terms(text),
+        'type': question_type,
+        'category': category,
+        'difficulty': difficulty,
+        'exclude_ids': list(exclude_ids) or None,
+        'after': after
+    }
+    params = {key: value for key, value in params.items() if value is not None}
+    conditions = ["q.is_active = true"] + [SEARCH_FILTERS[key] for key in params]
+    params['limit'] = limit + 1
+
+    rows = db_manager.execute_query(f"""
+        WITH page AS (
+            SELECT q.id
+            FROM questions q
+            LEFT JOIN categories c ON q.category_id = c.id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY q.id
+            LIMIT %(limit)s
+        )
+        {QUESTION_SELECT}
+        WHERE q.id IN (SELECT id FROM page)
+        GROUP BY q.id, c.name
+        ORDER BY q.id
+    """, params, write=False, name='search_questions')
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1]['id']
+    return rows, None
+
+def get_active_questions():
+    """Obtener todo el banco de preguntas activas con sus opciones (carga masiva)"""
+    return db_manager.execute_named('active_questions')
+
+def get_questions_updated_since(last_sync):
+    """Obtener preguntas modificadas desde last_sync, incluidas las desactivadas"""
+    return db_manager.execute_named('questions_updated_since', (last_sync,))
+
+def get_questions_deleted_since(last_sync):
+    """Obtener los ids de las preguntas borradas con DELETE desde last_sync"""
+    return db_manager.execute_named('questions_deleted_since', (last_sync,))
 
 def get_all_teams():
     """Obtener todos los equipos activos"""
-    query = "SELECT * FROM teams WHERE is_active = true ORDER BY name"
-    return db_manager.execute_query(query)
+    return db_manager.execute_named('all_teams')
 
 def create_game_session(session_name="Sesión de Juego", created_by="Sistema"):
     """Crear nueva sesión de juego"""
-    query = """
-    INSERT INTO game_sessions (session_name, created_by) 
-    VALUES (%s, %s) 
-    RETURNING id
-    """
-    result = db_manager.execute_query(query, (session_name, created_by), fetch_one=True)
+    result = db_manager.execute_named('create_session', (session_name, created_by))
     return result['id'] if result else None
 
 def add_team_to_session(session_id, team_id):
     """Agregar equipo a la sesión"""
-    query = """
-    INSERT INTO session_teams (session_id, team_id)
-    VALUES (%s, %s)
-    ON CONFLICT (session_id, team_id) DO NOTHING
-    """
-    return db_manager.execute_query(query, (session_id, team_id))
+    return db_manager.execute_named('add_team_to_session', (session_id, team_id))
 
 def update_team_score_in_session(session_id, team_id, points):
     """Actualizar puntuación del equipo en la sesión"""
-    query = """
-    UPDATE session_teams 
-    SET current_score = current_score + %s,
-        correct_answers = correct_answers + CASE WHEN %s > 0 THEN 1 ELSE 0 END,
-        wrong_answers = wrong_answers + CASE WHEN %s <= 0 THEN 1 ELSE 0 END
-    WHERE session_id = %s AND team_id = %s
-    """
-    return db_manager.execute_query(query, (points, points, points, session_id, team_id))
+    return db_manager.execute_named('update_team_score', (points, session_id, team_id))
 
 def get_session_teams(session_id):
     """Obtener equipos de una sesión con sus puntuaciones"""
-    query = """
-    SELECT t.*, st.current_score, st.correct_answers, st.wrong_answers
-    FROM teams t
-    JOIN session_teams st ON t.id = st.team_id
-    WHERE st.session_id = %s AND t.is_active = true
-    ORDER BY st.current_score DESC, t.name
+    return db_manager.execute_named('session_teams', (session_id,))
+
+def get_session_leaderboard(session_id, limit=10):
+    """Obtener los primeros equipos de la sesión por puntuación"""
+    return db_manager.execute_named('session_leaderboard', (session_id, limit))
+
+def get_session_stats(session_id):
+    """Obtener las estadísticas precalculadas de una sesión
+
+    Una sesión anterior a session_stats no tiene fila: se calcula a partir de
+    sus respuestas, se guarda y los triggers la mantienen desde entonces.
     """
-    return db_manager.execute_query(query, (session_id,))
+    stats = db_manager.execute_named('session_stats', (session_id,))
+    if stats is None and db_manager.execute_named('session_stats_backfill', (session_id,))['created']:
+        stats = db_manager.execute_named('session_stats', (session_id,))
+    return stats
 
-def record_question_response(session_id, question_id, team_id, given_answer, is_correct, points_awarded):
-    """Registrar respuesta a una pregunta"""
-    query = """
-    INSERT INTO question_responses 
-    (session_id, question_id, team_id, given_answer, is_correct, points_awarded)
-    VALUES (%s, %s, %s, %s, %s, %s)
+def record_question_response(session_id, question_id, team_id, given_answer, is_correct, points_awarded,
+                             response_time=None):
+    """Registrar respuesta a una pregunta (response_time como timedelta)"""
+    params = (session_id, question_id, team_id, given_answer, is_correct, points_awarded, response_time)
+    return db_manager.execute_named('record_response', params)
+
+def persist_game_events(responses, score_deltas, revocations=()):
+    """Confirmar en una sola transacción un lote de respuestas y deltas de puntuación
+
+    responses: tuplas (session_id, question_id, team_id, given_answer, is_correct, points_awarded,
+               response_time, answered_at)
+    score_deltas: tuplas (session_id, team_id, points, correct_answers, wrong_answers) ya agregadas
+    revocations: tuplas (session_id, question_id, team_id) de respuestas correctas desbancadas;
+                 se aplican después de insertar las respuestas del lote
     """
-    return db_manager.execute_query(query, (session_id, question_id, team_id, given_answer, is_correct, points_awarded))
+    conn = None
+    start = time.perf_counter()
+    try:
+        conn = db_manager.get_connection()
+        with conn.cursor() as cursor:
+            if responses:
+                psycopg2.extras.execute_values(cursor, """
+                    INSERT INTO question_responses
+                    (session_id, question_id, team_id, given_answer, is_correct, points_awarded,
+                     response_time, answered_at)
+                    VALUES %s
+                """, responses)
+            if revocations:
+                psycopg2.extras.execute_values(cursor, """
+                    UPDATE question_responses AS qr
+                    SET is_correct = FALSE, points_awarded = 0
+                    FROM (VALUES %s) AS v(session_id, question_id, team_id)
+                    WHERE qr.session_id = v.session_id AND qr.question_id = v.question_id
+                      AND qr.team_id = v.team_id AND qr.is_correct
+                """, revocations)
+            if score_deltas:
+                psycopg2.extras.execute_values(cursor, """
+                    UPDATE session_teams AS st
+                    SET current_score = st.current_score + v.points,
+                        correct_answers = st.correct_answers + v.correct,
+                        wrong_answers = st.wrong_answers + v.wrong
+                    FROM (VALUES %s) AS v(session_id, team_id, points, correct, wrong)
+                    WHERE st.session_id = v.session_id AND st.team_id = v.team_id
+                """, score_deltas)
+        conn.commit()
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error(f"Error persistiendo lote de eventos: {e}")
+        raise
+    finally:
+        if conn:
+            db_manager.return_connection(conn)
+        query_latency.observe('persist_game_events', time.perf_counter() - start)
 
 def get_session_history(session_id):
     """Obtener historial de respuestas de una sesión"""
-    query = """
-    SELECT qr.*, q.question, q.correct_answer, t.name as team_name
-    FROM question_responses qr
-    JOIN questions q ON qr.question_id = q.id
-    JOIN teams t ON qr.team_id = t.id
-    WHERE qr.session_id = %s
-    ORDER BY qr.answered_at DESC
+    return db_manager.execute_named('session_history', (session_id,))
+
+# Exportaciones: columnas en orden, consulta base y filtros opcionales. Cada
+# filtro es un fragmento fijo con parámetro con nombre; solo se añaden los que
+# llegan con valor, así el planificador ve las condiciones reales.
+ExportQuery = namedtuple('ExportQuery', ['columns', 'sql', 'filters', 'order_by'])
+
+EXPORT_QUERIES = {
+    'answers': ExportQuery(
+        ('id', 'session_id', 'session_name', 'answered_at', 'team_id', 'team_name', 'question_id',
+         'question', 'given_answer', 'correct_answer', 'is_correct', 'points_awarded', 'response_time'),
+        """
+        SELECT qr.id, qr.session_id, gs.session_name, qr.answered_at, qr.team_id, t.name AS team_name,
+               qr.question_id, q.question, qr.given_answer, q.correct_answer, qr.is_correct,
+               qr.points_awarded, EXTRACT(EPOCH FROM qr.response_time)::float8 AS response_time
+        FROM question_responses qr
+        JOIN game_sessions gs ON qr.session_id = gs.id
+        JOIN questions q ON qr.question_id = q.id
+        JOIN teams t ON qr.team_id = t.id
+        """,
+        {
+            'session_id': "qr.session_id = %(session_id)s",
+            'team_id': "qr.team_id = %(team_id)s",
+            'date_from': "qr.answered_at >= %(date_from)s",
+            'date_to': "qr.answered_at < %(date_to)s"
+        },
+        "qr.session_id, qr.answered_at, qr.id"
+    ),
+    'sessions': ExportQuery(
+        ('id', 'session_name', 'start_time', 'end_time', 'is_active', 'created_by', 'total_teams',
+         'total_score', 'total_responses', 'correct_responses', 'questions_answered',
+         'avg_response_seconds'),
+        """
+        SELECT gs.id, gs.session_name, gs.start_time, gs.end_time, gs.is_active, gs.created_by,
+               ss.total_teams, ss.total_score, ss.total_responses, ss.correct_responses,
+               ss.questions_answered,
+               EXTRACT(EPOCH FROM ss.total_response_time)::float8 / NULLIF(ss.timed_responses, 0)
+                   AS avg_response_seconds
+        FROM game_sessions gs
+        LEFT JOIN session_stats ss ON gs.id = ss.session_id
+        """,
+        {
+            'session_id': "gs.id = %(session_id)s",
+            'team_id': "EXISTS (SELECT 1 FROM session_teams st WHERE st.session_id = gs.id AND st.team_id = %(team_id)s)",
+            'date_from': "gs.start_time >= %(date_from)s",
+            'date_to': "gs.start_time < %(date_to)s"
+        },
+        "gs.id"
+    )
+}
+
+def stream_export(dataset, filters=None, batch_size=None):
+    """Generar las filas de una exportación (dicts) sin cargar el resultado completo
+
+    Usa un cursor con nombre (del lado del servidor): PostgreSQL entrega las
+    filas en lotes de batch_size, de modo que la memoria no crece con el
+    tamaño de la exportación. La conexión queda ocupada mientras se consume
+    el generador y se devuelve al pool al terminar o si se cierra antes.
     """
-    return db_manager.execute_query(query, (session_id,))
+    export = EXPORT_QUERIES[dataset]
+    filters = {key: value for key, value in (filters or {}).items()
+               if key in export.filters and value is not None}
+    conditions = [export.filters[key] for key in filters]
+    sql = export.sql
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" ORDER BY {export.order_by}"
+
+    conn = None
+    start = time.perf_counter()
+    try:
+        conn = db_manager.get_connection()
+        with conn.cursor(name=f"export_{dataset}", cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+            cursor.itersize = batch_size or Config.EXPORT_BATCH_SIZE
+            cursor.execute(sql, filters)
+            for row in cursor:
+                yield row
+    except Exception as e:
+        logger.error(f"Error exportando {dataset}: {e}")
+        raise
+    finally:
+        if conn:
+            # El pool cierra con rollback la transacción de solo lectura del cursor
+            db_manager.return_connection(conn)
+        query_latency.observe(f"export_{dataset}", time.perf_counter() - start)
 
 def end_game_session(session_id):
     """Finalizar sesión de juego"""
-    query = """
-    UPDATE game_sessions 
-    SET end_time = CURRENT_TIMESTAMP, is_active = false
-    WHERE id = %s
+    return db_manager.execute_named('end_session', (session_id,))
+
+def bulk_insert_questions(questions, batch_size=None, skip_existing=True):
+    """Insertar preguntas ya validadas con sus opciones, por lotes
+
+    questions: dicts con type, question, correct_answer, category, difficulty y options.
+    Las categorías se crean y resuelven en una sola pasada; cada lote inserta
+    preguntas y opciones con execute_values en su propia transacción, así un
+    lote fallido no deshace los anteriores. Los ids se reservan antes de
+    insertar para enlazar las opciones sin depender del orden de RETURNING.
+
+    Devuelve {'inserted': [(posición, id)], 'failed': [(posición, error)],
+    'skipped': [posición], 'categories_created': n}; posición es el índice en questions.
     """
-    return db_manager.execute_query(query, (session_id,))
+    batch_size = batch_size or Config.IMPORT_BATCH_SIZE
+    result = {'inserted': [], 'failed': [], 'skipped': [], 'categories_created': 0}
+    if not questions:
+        return result
+
+    conn = None
+    start = time.perf_counter()
+    try:
+        conn = db_manager.get_connection()
+        with conn.cursor() as cursor:
+            pending = list(enumerate(questions))
+            if skip_existing:
+                cursor.execute("SELECT type, question FROM questions WHERE question = ANY(%s)",
+                               ([q['question'] for q in questions],))
+                existing = set(cursor.fetchall())
+                result['skipped'] = [i for i, q in pending if (q['type'], q['question']) in existing]
+                pending = [(i, q) for i, q in pending if (q['type'], q['question']) not in existing]
+
+            names = sorted({q['category'] for _, q in pending if q['category']})
+            category_ids = {}
+            if names:
+                cursor.execute("""
+                    INSERT INTO categories (name) SELECT unnest(%s::text[])
+                    ON CONFLICT (name) DO NOTHING
+                """, (names,))
+                result['categories_created'] = cursor.rowcount
+                cursor.execute("SELECT name, id FROM categories WHERE name = ANY(%s)", (names,))
+                category_ids = dict(cursor.fetchall())
+            conn.commit()
+
+            for offset in range(0, len(pending), batch_size):
+                batch = pending[offset:offset + batch_size]
+                try:
+                    cursor.execute("""
+                        SELECT nextval(pg_get_serial_sequence('questions', 'id'))
+                        FROM generate_series(1, %s)
+                    """, (len(batch),))
+                    ids = [row[0] for row in cursor.fetchall()]
+                    psycopg2.extras.execute_values(cursor, """
+                        INSERT INTO questions (id, type, question, correct_answer, category_id, difficulty)
+                        VALUES %s
+                    """, [(question_id, q['type'], q['question'], q['correct_answer'],
+                           category_ids.get(q['category']), q['difficulty'])
+                          for question_id, (_, q) in zip(ids, batch)], page_size=len(batch))
+                    options = [(question_id, text, order)
+                               for question_id, (_, q) in zip(ids, batch)
+                               for order, text in enumerate(q['options'], 1)]
+                    if options:
+                        psycopg2.extras.execute_values(cursor, """
+                            INSERT INTO question_options (question_id, option_text, option_order)
+                            VALUES %s
+                        """, options, page_size=len(options))
+                    conn.commit()
+                    result['inserted'].extend((i, question_id) for question_id, (i, _) in zip(ids, batch))
+                except psycopg2.Error as e:
+                    conn.rollback()
+                    error = str(e).strip().splitlines()[0]
+                    logger.error(f"Error importando lote de {len(batch)} preguntas: {error}")
+                    result['failed'].extend((i, error) for i, _ in batch)
+
+        return result
+
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error(f"Error en la importación de preguntas: {e}")
+        raise
+    finally:
+        if conn:
+            db_manager.return_connection(conn)
+        query_latency.observe('bulk_insert_questions', time.perf_counter() - start)
 
-# Función para insertar nuevas preguntas
 def insert_question(question_type, question_text, correct_answer, category_name, difficulty=1, options=None):
     """Insertar nueva pregunta"""
     conn = None
+    start = time.perf_counter()
     try:
         conn = db_manager.get_connection()
         with conn.cursor() as cursor:
@@ -255,4 +631,5 @@ def insert_question(question_type, question_text, correct_answer, category_name,
         raise
     finally:
         if conn:
-            db_manager.return_connection(conn)
\ No newline at end of file
+            db_manager.return_connection(conn)
+        query_latency.observe('insert_question', time.perf_counter() - start)
\ No newline at end of file
@@ -7,6 +7,16 @@
 -- Usar la base de datos
 -- \c quiz_game_db;
 
+-- Búsqueda de preguntas sin distinguir tildes
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() no es IMMUTABLE (depende del diccionario por defecto) y no puede
+-- usarse en una columna generada; con el diccionario explícito sí
+CREATE OR REPLACE FUNCTION search_unaccent(text)
+RETURNS text AS $$
+    SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
 -- Tabla de categorías
 CREATE TABLE categories (
     id SERIAL PRIMARY KEY,
@@ -25,7 +35,10 @@ CREATE TABLE questions (
     difficulty INTEGER DEFAULT 1 CHECK (difficulty BETWEEN 1 AND 5),
     is_active BOOLEAN DEFAULT true,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Texto de búsqueda del panel del moderador (se recalcula al cambiar la
+    -- pregunta): palabras sin tildes ni raíces, como la búsqueda en memoria
+    search_vector tsvector GENERATED ALWAYS AS (to_tsvector('simple', search_unaccent(question))) STORED
 );
 
 -- Tabla de opciones para preguntas de opción múltiple
@@ -80,13 +93,39 @@ CREATE TABLE question_responses (
     answered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Estadísticas precalculadas por sesión, mantenidas por triggers: las
+-- consultas de estadísticas leen una fila en lugar de agregar las respuestas
+CREATE TABLE session_stats (
+    session_id INTEGER PRIMARY KEY REFERENCES game_sessions(id) ON DELETE CASCADE,
+    total_teams INTEGER NOT NULL DEFAULT 0,
+    total_score INTEGER NOT NULL DEFAULT 0,
+    total_responses INTEGER NOT NULL DEFAULT 0,
+    correct_responses INTEGER NOT NULL DEFAULT 0,
+    questions_answered INTEGER NOT NULL DEFAULT 0,
+    timed_responses INTEGER NOT NULL DEFAULT 0,
+    total_response_time INTERVAL NOT NULL DEFAULT '0 seconds',
+    last_answered_at TIMESTAMP
+);
+
+-- Preguntas distintas respondidas en cada sesión (sustituye al COUNT(DISTINCT))
+CREATE TABLE session_questions (
+    session_id INTEGER REFERENCES game_sessions(id) ON DELETE CASCADE,
+    question_id INTEGER REFERENCES questions(id) ON DELETE CASCADE,
+    PRIMARY KEY (session_id, question_id)
+);
+
 -- Indices para mejorar rendimiento
 CREATE INDEX idx_questions_category ON questions(category_id);
 CREATE INDEX idx_questions_type ON questions(type);
 CREATE INDEX idx_questions_difficulty ON questions(difficulty);
+CREATE INDEX idx_questions_updated_at ON questions(updated_at);
 CREATE INDEX idx_question_options_question_id ON question_options(question_id);
-CREATE INDEX idx_session_teams_session ON session_teams(session_id);
-CREATE INDEX idx_question_responses_session ON question_responses(session_id);
+-- Búsqueda de texto completo y paginación por id de las preguntas activas
+CREATE INDEX idx_questions_search ON questions USING GIN (search_vector);
+CREATE INDEX idx_questions_active_id ON questions(id) WHERE is_active = true;
+-- Clasificación de una sesión en orden de índice (sin ordenar en cada consulta)
+CREATE INDEX idx_session_teams_leaderboard ON session_teams(session_id, current_score DESC, team_id);
+CREATE INDEX idx_question_responses_session_answered ON question_responses(session_id, answered_at);
 CREATE INDEX idx_question_responses_question ON question_responses(question_id);
 
 -- Función para actualizar timestamp
@@ -102,6 +141,227 @@ $$ language 'plpgsql';
 CREATE TRIGGER update_questions_updated_at BEFORE UPDATE ON questions
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- Cambiar las opciones de una pregunta también cambia su updated_at, para que
+-- el refresco incremental del banco en memoria las vea. Por sentencia: una
+-- importación masiva toca cada pregunta una sola vez.
+CREATE OR REPLACE FUNCTION question_options_touch_question()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE questions SET updated_at = CURRENT_TIMESTAMP
+        WHERE id IN (SELECT question_id FROM new_rows);
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE questions SET updated_at = CURRENT_TIMESTAMP
+        WHERE id IN (SELECT question_id FROM old_rows);
+    ELSE
+        UPDATE questions SET updated_at = CURRENT_TIMESTAMP
+        WHERE id IN (SELECT question_id FROM new_rows UNION SELECT question_id FROM old_rows);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER question_options_touch_insert AFTER INSERT ON question_options
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION question_options_touch_question();
+
+CREATE TRIGGER question_options_touch_update AFTER UPDATE ON question_options
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION question_options_touch_question();
+
+CREATE TRIGGER question_options_touch_delete AFTER DELETE ON question_options
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION question_options_touch_question();
+
+-- Preguntas borradas con DELETE (no solo desactivadas): el refresco
+-- incremental del banco en memoria las lee de aquí para quitarlas
+CREATE TABLE deleted_questions (
+    question_id INTEGER PRIMARY KEY,
+    deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_deleted_questions_deleted_at ON deleted_questions(deleted_at);
+
+CREATE OR REPLACE FUNCTION questions_record_deleted()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO deleted_questions (question_id)
+    SELECT id FROM old_rows
+    ON CONFLICT (question_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER questions_record_deleted AFTER DELETE ON questions
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION questions_record_deleted();
+
+-- Mantenimiento incremental de session_stats. Los triggers de respuestas y
+-- puntuaciones son por sentencia con tablas de transición: un lote de la
+-- escritura diferida actualiza cada sesión una sola vez.
+CREATE OR REPLACE FUNCTION session_stats_init()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO session_stats (session_id) VALUES (NEW.id);
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER game_sessions_stats_init AFTER INSERT ON game_sessions
+    FOR EACH ROW EXECUTE FUNCTION session_stats_init();
+
+CREATE OR REPLACE FUNCTION session_stats_teams_added()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE session_stats s
+    SET total_teams = s.total_teams + n.teams,
+        total_score = s.total_score + n.score
+    FROM (SELECT session_id, COUNT(*) AS teams, SUM(current_score) AS score
+          FROM new_rows GROUP BY session_id) n
+    WHERE s.session_id = n.session_id;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER session_teams_stats_insert AFTER INSERT ON session_teams
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION session_stats_teams_added();
+
+CREATE OR REPLACE FUNCTION session_stats_teams_removed()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE session_stats s
+    SET total_teams = s.total_teams - o.teams,
+        total_score = s.total_score - o.score
+    FROM (SELECT session_id, COUNT(*) AS teams, SUM(current_score) AS score
+          FROM old_rows GROUP BY session_id) o
+    WHERE s.session_id = o.session_id;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER session_teams_stats_delete AFTER DELETE ON session_teams
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION session_stats_teams_removed();
+
+CREATE OR REPLACE FUNCTION session_stats_scores_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE session_stats s
+    SET total_score = s.total_score + d.delta
+    FROM (SELECT n.session_id, SUM(n.current_score - o.current_score) AS delta
+          FROM new_rows n JOIN old_rows o ON o.id = n.id
+          GROUP BY n.session_id) d
+    WHERE s.session_id = d.session_id AND d.delta <> 0;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER session_teams_stats_update AFTER UPDATE ON session_teams
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION session_stats_scores_changed();
+
+-- Las respuestas se insertan y, como mucho, se anulan (is_correct pasa a
+-- falso cuando otro equipo desbanca al ganador); se borran únicamente en
+-- cascada con su sesión
+CREATE OR REPLACE FUNCTION session_stats_responses_added()
+RETURNS TRIGGER AS $$
+BEGIN
+    WITH new_questions AS (
+        INSERT INTO session_questions (session_id, question_id)
+        SELECT DISTINCT session_id, question_id FROM new_rows
+        WHERE session_id IS NOT NULL AND question_id IS NOT NULL
+        ON CONFLICT DO NOTHING
+        RETURNING session_id
+    ), question_counts AS (
+        SELECT session_id, COUNT(*) AS questions FROM new_questions GROUP BY session_id
+    ), response_counts AS (
+        SELECT session_id,
+               COUNT(*) AS responses,
+               COUNT(*) FILTER (WHERE is_correct) AS correct,
+               COUNT(response_time) AS timed,
+               COALESCE(SUM(response_time), '0 seconds') AS response_time,
+               MAX(answered_at) AS last_answered_at
+        FROM new_rows GROUP BY session_id
+    )
+    UPDATE session_stats s
+    SET total_responses = s.total_responses + r.responses,
+        correct_responses = s.correct_responses + r.correct,
+        questions_answered = s.questions_answered + COALESCE(q.questions, 0),
+        timed_responses = s.timed_responses + r.timed,
+        total_response_time = s.total_response_time + r.response_time,
+        last_answered_at = GREATEST(s.last_answered_at, r.last_answered_at)
+    FROM response_counts r
+    LEFT JOIN question_counts q ON q.session_id = r.session_id
+    WHERE s.session_id = r.session_id;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER question_responses_stats_insert AFTER INSERT ON question_responses
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION session_stats_responses_added();
+
+CREATE OR REPLACE FUNCTION session_stats_responses_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE session_stats s
+    SET correct_responses = s.correct_responses + d.delta
+    FROM (SELECT n.session_id,
+                 SUM(COALESCE(n.is_correct, FALSE)::int - COALESCE(o.is_correct, FALSE)::int) AS delta
+          FROM new_rows n JOIN old_rows o ON o.id = n.id
+          WHERE n.is_correct IS DISTINCT FROM o.is_correct
+          GROUP BY n.session_id) d
+    WHERE s.session_id = d.session_id AND d.delta <> 0;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER question_responses_stats_update AFTER UPDATE ON question_responses
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION session_stats_responses_changed();
+
+-- Crear las filas de session_stats (y session_questions) que falten, calculadas
+-- a partir de las respuestas: sesiones anteriores a los triggers. Con una
+-- sesión solo esa; sin argumento, todas. Devuelve cuántas filas creó.
+CREATE OR REPLACE FUNCTION session_stats_backfill(target INTEGER DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    created INTEGER;
+BEGIN
+    INSERT INTO session_questions (session_id, question_id)
+    SELECT DISTINCT qr.session_id, qr.question_id
+    FROM question_responses qr
+    WHERE qr.session_id IS NOT NULL AND qr.question_id IS NOT NULL
+      AND (target IS NULL OR qr.session_id = target)
+      AND NOT EXISTS (SELECT 1 FROM session_stats s WHERE s.session_id = qr.session_id)
+    ON CONFLICT DO NOTHING;
+
+    INSERT INTO session_stats (session_id, total_teams, total_score, total_responses, correct_responses,
+                               questions_answered, timed_responses, total_response_time, last_answered_at)
+    SELECT gs.id,
+           (SELECT COUNT(*) FROM session_teams st WHERE st.session_id = gs.id),
+           (SELECT COALESCE(SUM(st.current_score), 0) FROM session_teams st WHERE st.session_id = gs.id),
+           COUNT(qr.id),
+           COUNT(qr.id) FILTER (WHERE qr.is_correct),
+           (SELECT COUNT(*) FROM session_questions sq WHERE sq.session_id = gs.id),
+           COUNT(qr.response_time),
+           COALESCE(SUM(qr.response_time), '0 seconds'),
+           MAX(qr.answered_at)
+    FROM game_sessions gs
+    LEFT JOIN question_responses qr ON qr.session_id = gs.id
+    WHERE (target IS NULL OR gs.id = target)
+      AND NOT EXISTS (SELECT 1 FROM session_stats s WHERE s.session_id = gs.id)
+    GROUP BY gs.id
+    ON CONFLICT (session_id) DO NOTHING;
+    GET DIAGNOSTICS created = ROW_COUNT;
+    RETURN created;
+END;
+$$ language 'plpgsql';
+
+-- Al actualizar una base de datos existente: rellenar las sesiones que ya había
+SELECT session_stats_backfill();
+
 -- Insertar categorías por defecto
 INSERT INTO categories (name, description) VALUES
 ('Geografía', 'Preguntas sobre países, capitales, océanos y geografía mundial'),
@@ -190,6 +450,7 @@ SELECT
     c.name as category_name,
     q.difficulty,
     q.is_active,
+    q.updated_at,
     COALESCE(
         json_agg(
             json_build_object(
@@ -203,21 +464,23 @@ FROM questions q
 LEFT JOIN categories c ON q.category_id = c.id
 LEFT JOIN question_options qo ON q.id = qo.question_id
 WHERE q.is_active = true
-GROUP BY q.id, q.type, q.question, q.correct_answer, c.name, q.difficulty, q.is_active
+GROUP BY q.id, q.type, q.question, q.correct_answer, c.name, q.difficulty, q.is_active, q.updated_at
 ORDER BY q.id;
 
--- Vista para estadísticas de sesión
+-- Vista para estadísticas de sesión (lee las filas precalculadas de session_stats)
 CREATE VIEW v_session_stats AS
 SELECT 
     gs.id as session_id,
     gs.session_name,
     gs.start_time,
     gs.end_time,
-    COUNT(DISTINCT st.team_id) as total_teams,
-    COUNT(DISTINCT qr.question_id) as questions_answered,
-    AVG(st.current_score) as avg_score
+    ss.total_teams,
+    ss.questions_answered,
+    (ss.total_score::float8 / NULLIF(ss.total_teams, 0)) as avg_score,
+    ss.total_responses,
+    ss.correct_responses,
+    (EXTRACT(EPOCH FROM ss.total_response_time)::float8 / NULLIF(ss.timed_responses, 0)) as avg_response_seconds,
+    ss.last_answered_at
 FROM game_sessions gs
-LEFT JOIN session_teams st ON gs.id = st.session_id
-LEFT JOIN question_responses qr ON gs.id = qr.session_id
-WHERE gs.is_active = true
-GROUP BY gs.id, gs.session_name, gs.start_time, gs.end_time;
\ No newline at end of file
+JOIN session_stats ss ON gs.id = ss.session_id
+WHERE gs.is_active = true;
\ No newline at end of file
@@ -0,0 +1,190 @@
+import logging
+import threading
+import time
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import PoolError
+
+logger = logging.getLogger(__name__)
+
+class PoolTimeoutError(PoolError):
+    """No se obtuvo una conexión dentro del tiempo de espera"""
+
+class PooledConnection(psycopg2.extensions.connection):
+    """Conexión con los metadatos que necesita el pool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        # Sentencias preparadas en esta conexión (PREPARE es por sesión)
+        self.prepared = set()
+
+class BlockingConnectionPool:
+    """Pool thread-safe con espera bloqueante, pre-ping y reciclado de conexiones
+
+    A diferencia de SimpleConnectionPool, cuando no hay conexiones libres los
+    hilos esperan (hasta `timeout`) en lugar de fallar inmediatamente.
+    """
+
+    def __init__(self, minconn, maxconn, timeout=5.0, max_lifetime=1800.0,
+                 ping_after=30.0, **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self._connect_kwargs = connect_kwargs
+        self._cond = threading.Condition()
+        self._idle = []
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+        self._stats = {
+            'acquisitions': 0,
+            'timeouts': 0,
+            'total_wait': 0.0,
+            'max_wait': 0.0,
+            'recycled': 0,
+            'broken': 0
+        }
+
+        for _ in range(minconn):
+            self._idle.append(self._connect())
+            self._size += 1
+
+    def _connect(self):
+        return psycopg2.connect(connection_factory=PooledConnection, **self._connect_kwargs)
+
+    def _is_healthy(self, conn):
+        """Pre-ping de conexiones que llevan tiempo inactivas"""
+        if conn.closed:
+            return False
+        if time.monotonic() - conn.last_used < self.ping_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _validate(self, conn):
+        """Devolver una conexión utilizable: reciclar si es vieja o no responde"""
+        expired = time.monotonic() - conn.created_at > self.max_lifetime
+        if not expired and self._is_healthy(conn):
+            return conn
+
+        with self._cond:
+            self._stats['recycled' if expired else 'broken'] += 1
+        if not expired:
+            logger.warning("Conexión PostgreSQL inválida, reconectando")
+        self._close_quietly(conn)
+        return self._connect()
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self, timeout=None):
+        """Obtener conexión; bloquea hasta `timeout` segundos si el pool está agotado"""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        conn = None
+        create = False
+
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._closed:
+                        raise PoolError("El pool de conexiones está cerrado")
+                    if self._idle:
+                        conn = self._idle.pop()
+                        break
+                    if self._size < self.maxconn:
+                        self._size += 1
+                        create = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"Sin conexiones libres tras {timeout:.1f}s ({self.maxconn} en uso)")
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._in_use += 1
+
+        try:
+            conn = self._connect() if create else self._validate(conn)
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        wait = time.monotonic() - start
+        with self._cond:
+            self._stats['acquisitions'] += 1
+            self._stats['total_wait'] += wait
+            self._stats['max_wait'] = max(self._stats['max_wait'], wait)
+        return conn
+
+    def putconn(self, conn, close=False):
+        """Devolver la conexión; se descarta si está cerrada o en mal estado"""
+        if not conn.closed and not close:
+            status = conn.info.transaction_status
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+
+        with self._cond:
+            self._in_use -= 1
+            if close or conn.closed or self._closed:
+                self._close_quietly(conn)
+                self._size -= 1
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def closeall(self):
+        """Cerrar todas las conexiones inactivas y rechazar nuevas solicitudes"""
+        with self._cond:
+            self._closed = True
+            for conn in self._idle:
+                self._close_quietly(conn)
+            self._size -= len(self._idle)
+            self._idle = []
+            self._cond.notify_all()
+
+    def stats(self):
+        """Instrumentación: tamaño, uso, esperas y reciclados"""
+        with self._cond:
+            acquisitions = self._stats['acquisitions']
+            return {
+                'size': self._size,
+                'max_size': self.maxconn,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': self._waiting,
+                'utilization': round(self._in_use / self.maxconn, 4),
+                'acquisitions': acquisitions,
+                'timeouts': self._stats['timeouts'],
+                'avg_wait_ms': round(self._stats['total_wait'] / acquisitions * 1000, 3) if acquisitions else 0.0,
+                'max_wait_ms': round(self._stats['max_wait'] * 1000, 3),
+                'recycled': self._stats['recycled'],
+                'broken': self._stats['broken']
+            }
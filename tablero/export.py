@@ -0,0 +1,59 @@
+"""
+Serialización en streaming de las exportaciones (CSV y NDJSON).
+
+Las filas llegan de un generador (ver database.stream_export) y se agrupan en
+trozos de unos CHUNK_SIZE bytes: la respuesta sale por partes sin construir
+el archivo completo en memoria y sin una escritura al socket por fila.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+CHUNK_SIZE = 64 * 1024
+
+MIMETYPES = {
+    'csv': 'text/csv',  # Werkzeug añade charset=utf-8 a los text/*
+    'ndjson': 'application/x-ndjson; charset=utf-8'
+}
+
+def export_value(value):
+    """Valor apto para CSV/JSON (fechas en ISO 8601, intervalos en segundos)"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+def iter_csv(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([export_value(row[column]) for column in columns])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def iter_ndjson(rows, columns):
+    lines = []
+    size = 0
+    for row in rows:
+        line = json.dumps({column: export_value(row[column]) for column in columns},
+                          ensure_ascii=False) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(lines)
+            lines = []
+            size = 0
+    if lines:
+        yield ''.join(lines)
+
+SERIALIZERS = {'csv': iter_csv, 'ndjson': iter_ndjson}
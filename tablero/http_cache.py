@@ -0,0 +1,165 @@
+"""
+Caché HTTP: ETags, compresión y recursos estáticos con hash en el nombre.
+
+- Las respuestas de la API que dependen de una versión conocida (estado de
+  la partida, banco de preguntas) llevan un ETag débil derivado de esa
+  versión; si el cliente ya la tiene se responde 304 sin construir el cuerpo.
+- Las respuestas se comprimen con Brotli (si está instalado) o gzip según
+  Accept-Encoding.
+- asset_url('js/tablero.js') devuelve /assets/js/tablero.<hash>.js: el
+  nombre cambia con el contenido, así que se puede cachear un año. Cada
+  recurso se lee y comprime una sola vez por versión.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from flask import Blueprint, Response, abort, jsonify, request
+from werkzeug.security import safe_join
+from config import Config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/javascript', 'text/javascript',
+                          'text/css', 'text/html', 'text/plain', 'image/svg+xml'}
+ASSET_MIMETYPES = {'.js': 'text/javascript', '.css': 'text/css', '.svg': 'image/svg+xml'}
+
+def question_bank_tag(store):
+    """Versión del banco de preguntas de este worker
+
+    last_sync acompaña a la versión local porque cada worker numera sus
+    recargas por separado: la misma marca implica el mismo contenido.
+    """
+    last_sync = store.last_sync.isoformat() if store.last_sync else ''
+    return f"q{store.version}-{last_sync}"
+
+def cached_json(tag, build):
+    """JSON con ETag débil; 304 sin llamar a build() si el cliente ya tiene esa versión"""
+    if request.if_none_match.contains_weak(tag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(tag, weak=True)
+    # El cliente puede guardar la respuesta pero debe revalidarla cada vez
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=Config.COMPRESS_LEVEL)
+    return gzip.compress(data, compresslevel=Config.COMPRESS_LEVEL, mtime=0)
+
+def compress_response(response):
+    """after_request: comprimir respuestas completas y de tipo texto"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    data = response.get_data()
+    if encoding is None or len(data) < Config.COMPRESS_MIN_SIZE:
+        return response
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+class AssetManifest:
+    """Hash del contenido de cada recurso estático y sus versiones comprimidas
+
+    En DEBUG se vuelve a leer un recurso si cambia su fecha de modificación.
+    """
+
+    def __init__(self, folder, debug=False):
+        self.folder = folder
+        self.debug = debug
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def _load(self, filename):
+        path = os.path.join(self.folder, filename)
+        mtime = os.path.getmtime(path)
+        asset = self._assets.get(filename)
+        if asset is not None and (not self.debug or asset['mtime'] == mtime):
+            return asset
+        with open(path, 'rb') as file:
+            data = file.read()
+        asset = {
+            'mtime': mtime,
+            'hash': hashlib.sha256(data).hexdigest()[:12],
+            'bodies': {None: data}
+        }
+        self._assets[filename] = asset
+        return asset
+
+    def get(self, filename):
+        with self._lock:
+            return self._load(filename)
+
+    def body(self, filename, encoding):
+        with self._lock:
+            bodies = self._load(filename)['bodies']
+            if encoding not in bodies:
+                bodies[encoding] = compress(bodies[None], encoding)
+            return bodies[encoding]
+
+    def url(self, filename):
+        stem, extension = os.path.splitext(filename)
+        return f"/assets/{stem}.{self.get(filename)['hash']}{extension}"
+
+def split_hashed_name(hashed):
+    """'js/tablero.1a2b3c4d5e6f.js' -> ('js/tablero.js', '1a2b3c4d5e6f')"""
+    stem, extension = os.path.splitext(hashed)
+    stem, _, digest = stem.rpartition('.')
+    if not stem or not digest:
+        return None, None
+    return stem + extension, digest
+
+def register_http_cache(app):
+    manifest = AssetManifest(app.static_folder, debug=app.debug or Config.DEBUG)
+    assets_bp = Blueprint('assets', __name__)
+
+    @assets_bp.route('/assets/<path:hashed>')
+    def asset(hashed):
+        filename, digest = split_hashed_name(hashed)
+        extension = os.path.splitext(filename or '')[1]
+        if extension not in ASSET_MIMETYPES:
+            abort(404)
+        # safe_join evita salir de la carpeta static
+        path = safe_join(app.static_folder, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+
+        current = manifest.get(filename)['hash']
+        # ETag débil: la misma versión se sirve con distintas codificaciones
+        if request.if_none_match.contains_weak(current):
+            response = Response(status=304)
+        else:
+            encoding = choose_encoding()
+            response = Response(manifest.body(filename, encoding), mimetype=ASSET_MIMETYPES[extension])
+            if encoding is not None:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(current, weak=True)
+        response.vary.add('Accept-Encoding')
+        if digest == current:
+            response.headers['Cache-Control'] = f'public, max-age={Config.STATIC_MAX_AGE}, immutable'
+        else:
+            # Página antigua que pide una versión ya sustituida: contenido actual sin cachear
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    app.register_blueprint(assets_bp)
+    app.jinja_env.globals['asset_url'] = manifest.url
+    app.after_request(compress_response)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga del servidor de tablero.
+
+Conecta pantallas de tablero (sala 'display') en escalones y, en cada
+escalón, el moderador envía 'update_score'; se mide cuántas pantallas reciben
+la difusión y con qué latencia. El último escalón con entrega completa y p95
+por debajo del umbral es el número de pantallas que el servidor sostiene.
+
+Requiere: pip install "python-socketio[asyncio_client]"
+
+Uso:
+    python loadtest.py --url http://localhost:5000 --max-clients 2000 --step 100
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import socketio
+
+class DisplayClient:
+    """Pantalla simulada que registra cuándo recibe cada versión del estado"""
+
+    def __init__(self, url):
+        self.url = url
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.received = {}
+        self.sio.on('score_updated', self._on_score_updated)
+        self.sio.on('batch', self._on_batch)
+
+    async def _on_score_updated(self, data):
+        self.received[data['version']] = time.perf_counter()
+
+    async def _on_batch(self, data):
+        # Trama agrupada por el servidor (BROADCAST_FRAME_MS): se confirma como el navegador
+        for event, payload in data['events']:
+            if event == 'score_updated':
+                await self._on_score_updated(payload)
+        await self.sio.emit('batch_ack', {'origin': data['origin']})
+
+    async def connect(self):
+        await self.sio.connect(self.url, transports=['websocket'])
+        await self.sio.emit('join', {'room': 'display'})
+
+    async def disconnect(self):
+        await self.sio.disconnect()
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+async def probe(moderator, displays, timeout):
+    """Enviar una actualización y medir entrega y latencia en todas las pantallas"""
+    confirmed = asyncio.get_running_loop().create_future()
+    moderator.on('score_update_confirmed', lambda data: confirmed.done() or confirmed.set_result(data))
+
+    start = time.perf_counter()
+    await moderator.emit('update_score', {'team_id': 'team1', 'points': 1})
+    await asyncio.wait_for(confirmed, timeout)
+
+    deadline = start + timeout
+    latest = None
+    while time.perf_counter() < deadline:
+        versions = [max(d.received) for d in displays if d.received]
+        latest = max(versions) if versions else None
+        if latest is not None and all(latest in d.received for d in displays):
+            break
+        await asyncio.sleep(0.01)
+
+    latencies = [(d.received[latest] - start) * 1000 for d in displays
+                 if latest is not None and latest in d.received]
+    return len(latencies), latencies
+
+async def run(args):
+    moderator = socketio.AsyncClient(reconnection=False)
+    await moderator.connect(args.url, transports=['websocket'])
+    await moderator.emit('join', {'room': 'moderator'})
+
+    displays = []
+    sustained = 0
+    print(f"{'pantallas':>10} {'conexión':>9} {'entregados':>11} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+
+    try:
+        while len(displays) < args.max_clients:
+            batch = [DisplayClient(args.url) for _ in range(args.step)]
+            results = await asyncio.gather(*(d.connect() for d in batch), return_exceptions=True)
+            failed = sum(1 for r in results if isinstance(r, Exception))
+            displays.extend(d for d, r in zip(batch, results) if not isinstance(r, Exception))
+            await asyncio.sleep(args.settle)
+
+            delivered, latencies = await probe(moderator, displays, args.timeout)
+            p50 = statistics.median(latencies) if latencies else 0.0
+            p95 = percentile(latencies, 0.95)
+            print(f"{len(displays):>10} {'ok' if not failed else f'{failed} err':>9} "
+                  f"{delivered:>5}/{len(displays):<5} {p50:>8.1f} {p95:>8.1f} "
+                  f"{max(latencies, default=0.0):>8.1f}")
+
+            if failed or delivered < len(displays) or p95 > args.max_p95:
+                break
+            sustained = len(displays)
+    finally:
+        await moderator.emit('reset_game')
+        await asyncio.gather(*(d.disconnect() for d in displays), return_exceptions=True)
+        await moderator.disconnect()
+
+    print(f"\nPantallas sostenidas: {sustained} (entrega completa y p95 <= {args.max_p95} ms)")
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga de pantallas conectadas')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--max-clients', type=int, default=1000)
+    parser.add_argument('--step', type=int, default=100)
+    parser.add_argument('--timeout', type=float, default=5.0, help='segundos para esperar la difusión')
+    parser.add_argument('--max-p95', type=float, default=1000.0, help='umbral de p95 en ms')
+    parser.add_argument('--settle', type=float, default=0.5, help='pausa tras conectar cada escalón')
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == '__main__':
+    main()
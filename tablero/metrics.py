@@ -0,0 +1,103 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Límites de los buckets en milisegundos (escala aproximadamente logarítmica)
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Tiempos de respuesta de los equipos (de 100 ms a 1 min)
+RESPONSE_TIME_BUCKETS_MS = (100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000, 7500, 10000, 15000, 20000, 30000, 60000)
+
+class LatencyHistogram:
+    """Histograma de latencias por buckets fijos con percentiles aproximados"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # el último bucket es +inf
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        ms = seconds * 1000
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+            self.count += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q):
+        """Límite superior del bucket que contiene el percentil q (0-1)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return min(self.buckets[i], self.max_ms) if i < len(self.buckets) else self.max_ms
+        return self.max_ms
+
+    def summary(self):
+        with self._lock:
+            return {
+                'count': self.count,
+                'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+                'p50_ms': round(self.percentile(0.50), 3),
+                'p95_ms': round(self.percentile(0.95), 3),
+                'p99_ms': round(self.percentile(0.99), 3),
+                'max_ms': round(self.max_ms, 3)
+            }
+
+class LatencyRegistry:
+    """Histogramas de latencia agrupados por nombre"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, LatencyHistogram(self.buckets))
+        return histogram
+
+    def observe(self, name, seconds):
+        self.histogram(name).observe(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def clear(self):
+        with self._lock:
+            self._histograms = {}
+
+    def summary(self):
+        """Resumen ordenado por tiempo total acumulado (las consultas que dominan primero)"""
+        with self._lock:
+            items = list(self._histograms.items())
+        summaries = {name: h.summary() for name, h in items}
+        return dict(sorted(summaries.items(),
+                           key=lambda item: item[1]['mean_ms'] * item[1]['count'],
+                           reverse=True))
+
+# Latencias de las consultas a PostgreSQL por nombre de consulta
+query_latency = LatencyRegistry()
+
+# Tiempos de respuesta por partida y equipo (de este worker)
+response_times = {}
+
+def game_response_times(game_id):
+    """Registro de tiempos de respuesta de una partida, creado al primer uso"""
+    registry = response_times.get(game_id)
+    if registry is None:
+        registry = response_times.setdefault(game_id, LatencyRegistry(RESPONSE_TIME_BUCKETS_MS))
+    return registry
@@ -1,27 +1,307 @@
-class GameState:
-    def __init__(self):
-        self.current_question = None
-        self.target_team = 'both'  # 'team1', 'team2', o 'both'
-        self.teams = {
-            "team1": {
-                "name": "Equipo Azul",
-                "score": 0,
-                "color": "blue-600",
-                "correct_answers": 0,
-                "wrong_answers": 0
-            },
-            "team2": {
-                "name": "Equipo Rojo", 
+import logging
+import re
+import secrets
+import threading
+import time
+import unicodedata
+from datetime import timedelta
+from config import Config
+from clock_sync import estimate_response_time
+from state_backend import SharedState, create_state_backend
+
+logger = logging.getLogger(__name__)
+
+class AnswerRejected(Exception):
+    """La respuesta de un equipo no puede aceptarse en el estado actual"""
+
+# Partida que usan los clientes que no indican ninguna
+DEFAULT_GAME = 'default'
+DEFAULT_TEAMS = [
+    {'name': 'Equipo Azul', 'color': 'blue-600'},
+    {'name': 'Equipo Rojo', 'color': 'red-600'}
+]
+# Colores que se asignan en orden a los equipos que no traen el suyo
+TEAM_COLORS = ('blue-600', 'red-600', 'green-600', 'yellow-600',
+               'purple-600', 'pink-600', 'indigo-600', 'orange-600')
+GAME_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,32}$')
+
+def initial_game_state(teams=None):
+    """Estado inicial con N equipos; sus ids son team1..teamN"""
+    return {
+        'current_question': None,
+        'target_team': 'both',  # id de un equipo o 'both' (todos)
+        'teams': {
+            f"team{number}": {
+                "name": team['name'],
                 "score": 0,
-                "color": "red-600",
+                "color": team.get('color') or TEAM_COLORS[(number - 1) % len(TEAM_COLORS)],
                 "correct_answers": 0,
                 "wrong_answers": 0
             }
-        }
-        self.game_active = False
-        self.show_answer = False
+            for number, team in enumerate(teams or DEFAULT_TEAMS, start=1)
+        },
+        'game_active': False,
+        'show_answer': False,
+        # Campos internos (PRIVATE_FIELDS), fuera de parches e instantáneas públicas.
+        # time.monotonic() del servidor al difundir la pregunta actual
+        'question_sent_at': None,
+        # Arbitraje 'first_correct': equipo ganador e instante estimado de su respuesta
+        'answered_by': None,
+        # Ids de las preguntas ya enviadas en esta partida y número de reinicios
+        # de esa lista, para que el planificador detecte un reinicio
+        'used_questions': [],
+        'used_epoch': 0
+    }
+
+# Campos del estado que solo usa el servidor: no salen en /api/game_state, en
+# game_state ni en los parches (no cambian el ETag ni revelan el arbitraje)
+PRIVATE_FIELDS = frozenset(('question_sent_at', 'answered_by', 'used_questions', 'used_epoch'))
+
+class GameState:
+    """Estado de una partida guardado en un backend compartido entre workers
+
+    La versión del documento es la versión de los parches: cada mutación
+    confirmada genera un parche con version + 1.
+    """
+
+    def __init__(self, backend, game_id=DEFAULT_GAME, initial=None):
+        """Sin initial solo se enlaza a una partida que ya existe en el backend"""
+        self.game_id = game_id
+        self._shared = SharedState(backend, f'tablero:game_state:{game_id}', initial)
+        # Sesión persistida en PostgreSQL (None si se juega solo en memoria).
+        # Documento aparte para no consumir versiones de los parches.
+        session = {'session_id': None, 'team_db_ids': {}} if initial is not None else None
+        self._session = SharedState(backend, f'tablero:db_session:{game_id}', session)
+
+    def _read(self, field):
+        return self._shared.get()[1][field]
+
+    @property
+    def version(self):
+        return self._shared.get()[0]
+
+    @property
+    def current_question(self):
+        return self._read('current_question')
+
+    @property
+    def target_team(self):
+        return self._read('target_team')
+
+    @property
+    def teams(self):
+        return self._read('teams')
+
+    @property
+    def game_active(self):
+        return self._read('game_active')
+
+    @property
+    def show_answer(self):
+        return self._read('show_answer')
+
+    @property
+    def used_questions(self):
+        # Las partidas creadas antes de existir el campo no lo tienen
+        return self._shared.get()[1].get('used_questions', ())
+
+    @property
+    def used_epoch(self):
+        return self._shared.get()[1].get('used_epoch', 0)
+
+    @property
+    def session_id(self):
+        return self._session.get()[1]['session_id']
+
+    @property
+    def team_db_ids(self):
+        return self._session.get()[1]['team_db_ids']
+
+    def snapshot(self):
+        """Estado completo del juego junto con su versión (incluye los campos internos)"""
+        version, state = self._shared.get()
+        return dict(state, version=version)
+
+    def public_snapshot(self):
+        """Estado que se envía a los clientes: el completo sin PRIVATE_FIELDS"""
+        version, state = self._shared.get()
+        public = {key: value for key, value in state.items() if key not in PRIVATE_FIELDS}
+        return dict(public, version=version)
+
+    def mutate(self, fn):
+        """Aplicar fn(estado) -> cambios de forma atómica y devolver el parche versionado
+
+        fn puede ejecutarse más de una vez si otro worker confirma antes;
+        debe depender solo del estado que recibe. Si devuelve None no se
+        confirma nada y se devuelve None.
+        """
+        version, changes = self._shared.mutate(fn)
+        if changes is None:
+            return None
+        changes = {key: value for key, value in changes.items() if key not in PRIVATE_FIELDS}
+        return {'version': version, 'changes': changes}
+
+    def attach_session(self, session_id, team_db_ids):
+        """Asociar la sesión de BD si ningún worker lo hizo antes; devuelve la sesión vigente"""
+        def apply(session):
+            if session['session_id'] is not None:
+                return None
+            session.update(session_id=session_id, team_db_ids=team_db_ids)
+            return session
+        self._session.mutate(apply)
+        return self.session_id
+
+    def start_database_session(self, session_name):
+        """Crear la sesión de juego en PostgreSQL y asociar los equipos por nombre"""
+        from database import create_game_session, get_all_teams, add_team_to_session, end_game_session
+
+        # Con varios workers solo el primero crea la sesión; el resto la reutiliza
+        if self.session_id is not None:
+            logger.info(f"Partida {self.game_id}: usando la sesión de juego {self.session_id}")
+            return
+
+        session_id = create_game_session(session_name)
+        team_db_ids = {}
+        teams_by_name = {team['name']: team['id'] for team in get_all_teams()}
+        for team_key, team in self.teams.items():
+            db_id = teams_by_name.get(team['name'])
+            if db_id is None:
+                logger.warning(f"Equipo '{team['name']}' no existe en la base de datos")
+                continue
+            add_team_to_session(session_id, db_id)
+            team_db_ids[team_key] = db_id
+
+        active_session = self.attach_session(session_id, team_db_ids)
+        if active_session != session_id:
+            # Otro worker la asoció mientras tanto: cerrar la nuestra
+            end_game_session(session_id)
+            logger.info(f"Partida {self.game_id}: usando la sesión de juego {active_session}")
+            return
+        logger.info(f"Partida {self.game_id}: sesión de juego {session_id} iniciada")
+
+    def delete(self):
+        """Eliminar los documentos de la partida del backend"""
+        self._shared.delete()
+        self._session.delete()
+
+class GameRegistry:
+    """Partidas simultáneas, cada una con sus equipos, su estado y sus salas
+
+    El índice de partidas vive en el backend compartido para que todos los
+    workers vean las mismas; cada worker solo guarda en caché sus GameState.
+    Cuando otro worker termina una partida (o la vuelve a crear con el mismo
+    id), este lo ve al cambiar la versión del índice y libera lo suyo: su
+    GameState y lo registrado con on_removed.
+    """
+
+    INDEX_KEY = 'tablero:games'
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._index = SharedState(backend, self.INDEX_KEY, {})
+        self._games = {}
+        self._created = {}  # created_at de cada partida en caché, para detectar recreaciones
+        self._index_version = None
+        self._removed_callbacks = []
+
+    def on_removed(self, callback):
+        """Registrar callback(game_id) para liberar el estado local de una partida terminada"""
+        self._removed_callbacks.append(callback)
+        return callback
+
+    def _forget(self, game_id):
+        self._games.pop(game_id, None)
+        self._created.pop(game_id, None)
+        for callback in self._removed_callbacks:
+            try:
+                callback(game_id)
+            except Exception as e:
+                logger.error(f"Error liberando el estado de la partida {game_id}: {e}")
+
+    def _read_index(self):
+        """Índice de partidas; si cambió, liberar las que ya no están"""
+        version, index = self._index.get()
+        if version != self._index_version:
+            self._index_version = version
+            stale = [game_id for game_id, created_at in self._created.items()
+                     if index.get(game_id, {}).get('created_at') != created_at]
+            for game_id in stale:
+                self._forget(game_id)
+        return index
+
+    def get(self, game_id):
+        """GameState de la partida, o None si no existe o ya terminó"""
+        index = self._read_index()
+        if game_id not in index:
+            return None
+        game = self._games.get(game_id)
+        if game is None:
+            game = self._games.setdefault(game_id, GameState(self.backend, game_id))
+            self._created.setdefault(game_id, index[game_id]['created_at'])
+        return game
+
+    def info(self, game_id):
+        """Nombre y fecha de creación de la partida, o None"""
+        return self._index.get()[1].get(game_id)
+
+    def list(self):
+        return [dict(info, id=game_id) for game_id, info in self._read_index().items()]
+
+    def create(self, name=None, teams=None, game_id=None):
+        """Crear una partida con sus equipos; lanza ValueError si el id no es válido o ya existe"""
+        game_id = game_id or secrets.token_hex(4)
+        if not GAME_ID_PATTERN.match(game_id):
+            raise ValueError('Identificador de partida no válido')
+        if game_id in self._index.get()[1]:
+            raise ValueError(f"La partida '{game_id}' ya existe")
+
+        # El estado se crea antes de publicar la partida en el índice: ningún
+        # worker puede encontrarla sin documento
+        game = GameState(self.backend, game_id, initial_game_state(teams))
+
+        def apply(index):
+            if game_id in index:
+                return None
+            index[game_id] = {'name': name or f'Partida {game_id}', 'created_at': time.time()}
+            return index[game_id]
+
+        info = self._index.mutate(apply)[1]
+        if info is None:
+            raise ValueError(f"La partida '{game_id}' ya existe")
+        if game_id in self._created:
+            # Recreada con el mismo id antes de que este worker viera la baja
+            self._forget(game_id)
+        self._games[game_id] = game
+        self._created[game_id] = info['created_at']
+        logger.info(f"Partida {game_id} creada con {len(game.teams)} equipos")
+        return game
 
-game_state = GameState()
+    def ensure(self, game_id, name=None, teams=None):
+        """Devolver la partida y crearla si no existe (seguro con varios workers)"""
+        game = self.get(game_id)
+        if game is not None:
+            return game
+        try:
+            return self.create(name, teams, game_id)
+        except ValueError:
+            return self.get(game_id)
+
+    def remove(self, game_id):
+        """Terminar la partida (y su sesión en BD) y liberar su estado; devuelve el GameState o None"""
+        game = self.get(game_id)
+        if game is None or self._index.mutate(lambda index: index.pop(game_id, None))[1] is None:
+            return None
+        self._forget(game_id)
+        session_id = game.session_id
+        game.delete()
+        if session_id is not None:
+            from database import end_game_session
+            end_game_session(session_id)
+        logger.info(f"Partida {game_id} terminada")
+        return game
+
+game_registry = GameRegistry(create_state_backend(Config.STATE_BACKEND_URL))
+game_registry.ensure(DEFAULT_GAME, 'Partida principal')
 
 mock_questions = [
     {
@@ -98,26 +378,342 @@ mock_questions = [
     }
 ]
 
+class QuestionStore:
+    """Banco de preguntas activas en memoria con índices por id, tipo, categoría y dificultad"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_id = {}
+        # Cada índice secundario guarda {valor: {id: pregunta}} para altas/bajas en O(1)
+        self._indexes = {'type': {}, 'category': {}, 'difficulty': {}}
+        # Palabras normalizadas de cada pregunta para la búsqueda sin base de datos
+        self._words = {}
+        self.last_sync = None
+        self.version = 0
+        self.stats = {'lookups': 0, 'misses': 0, 'full_loads': 0, 'refreshes': 0, 'refreshed_rows': 0}
+
+    @staticmethod
+    def normalize(row):
+        """Convertir una fila de v_questions_with_options al formato que usan los clientes"""
+        options = sorted(row.get('options') or [], key=lambda o: o['order'])
+        return {
+            'id': row['id'],
+            'type': row['type'],
+            'question': row['question'],
+            'options': [o['text'] for o in options],
+            'correct_answer': row['correct_answer'],
+            'category': row.get('category_name'),
+            'difficulty': row['difficulty']
+        }
+
+    @staticmethod
+    def search_words(text):
+        """Palabras en minúsculas y sin tildes ('Júpiter?' -> ['jupiter'])"""
+        text = unicodedata.normalize('NFKD', (text or '').lower())
+        return re.findall(r'\w+', ''.join(c for c in text if not unicodedata.combining(c)))
+
+    def _index(self, question):
+        self._by_id[question['id']] = question
+        self._words[question['id']] = self.search_words(question['question'])
+        for field, index in self._indexes.items():
+            index.setdefault(question[field], {})[question['id']] = question
+
+    def _unindex(self, question_id):
+        question = self._by_id.pop(question_id, None)
+        if question is None:
+            return
+        self._words.pop(question_id, None)
+        for field, index in self._indexes.items():
+            bucket = index.get(question[field])
+            if bucket is not None:
+                bucket.pop(question_id, None)
+                if not bucket:
+                    del index[question[field]]
+
+    def load(self, questions, last_sync=None):
+        """Reemplazar el banco completo"""
+        with self._lock:
+            self._by_id = {}
+            self._words = {}
+            self._indexes = {field: {} for field in self._indexes}
+            for question in questions:
+                self._index(question)
+            self.last_sync = last_sync
+            self.version += 1
+            self.stats['full_loads'] += 1
+
+    def apply_changes(self, upserts=(), removed_ids=(), last_sync=None):
+        """Aplicar cambios incrementales sobre el banco cargado"""
+        with self._lock:
+            for question_id in removed_ids:
+                self._unindex(question_id)
+            for question in upserts:
+                self._unindex(question['id'])
+                self._index(question)
+            if last_sync is not None:
+                self.last_sync = last_sync
+            self.version += 1
+            self.stats['refreshes'] += 1
+            self.stats['refreshed_rows'] += len(upserts) + len(removed_ids)
+
+    def get(self, question_id):
+        question = self._by_id.get(question_id)
+        with self._lock:
+            self.stats['lookups'] += 1
+            if question is None:
+                self.stats['misses'] += 1
+        return question
+
+    def all(self):
+        with self._lock:
+            return list(self._by_id.values())
+
+    def _lookup(self, field, value):
+        with self._lock:
+            return list(self._indexes[field].get(value, {}).values())
+
+    def by_type(self, question_type):
+        return self._lookup('type', question_type)
+
+    def by_category(self, category):
+        return self._lookup('category', category)
+
+    def by_difficulty(self, difficulty):
+        return self._lookup('difficulty', difficulty)
+
+    def categories(self):
+        with self._lock:
+            return sorted(category for category in self._indexes['category'] if category)
+
+    def search(self, text=None, question_type=None, category=None, difficulty=None,
+               exclude_ids=(), after=None, limit=20):
+        """Misma búsqueda que database.search_questions sobre el banco en memoria
+
+        Cada palabra del texto debe ser prefijo de alguna palabra de la
+        pregunta. Devuelve (preguntas ordenadas por id, after siguiente o None).
+        """
+        terms = self.search_words(text)
+        exclude_ids = set(exclude_ids)
+        filters = [(field, value) for field, value in
+                   (('type', question_type), ('category', category), ('difficulty', difficulty))
+                   if value is not None]
+        with self._lock:
+            # Partir del índice más selectivo de los filtros pedidos
+            buckets = [self._indexes[field].get(value, {}) for field, value in filters]
+            candidates = min(buckets, key=len) if buckets else self._by_id
+            results = []
+            for question_id in sorted(candidates):
+                if after is not None and question_id <= after or question_id in exclude_ids:
+                    continue
+                question = candidates[question_id]
+                if any(question[field] != value for field, value in filters):
+                    continue
+                words = self._words[question_id]
+                if all(any(word.startswith(term) for word in words) for term in terms):
+                    results.append(question)
+                    if len(results) > limit:
+                        return results[:limit], results[limit - 1]['id']
+        return results, None
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def get_stats(self):
+        """Tamaño, versión y sincronización del banco; búsquedas por id y fallos"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update(questions=len(self._by_id), version=self.version,
+                         last_sync=self.last_sync.isoformat() if self.last_sync else None)
+        return stats
+
+    def load_from_database(self):
+        """Carga masiva de v_questions_with_options"""
+        from database import get_active_questions
+
+        rows = get_active_questions()
+        last_sync = max((row['updated_at'] for row in rows), default=None)
+        self.load([self.normalize(row) for row in rows], last_sync)
+        logger.info(f"Banco de preguntas cargado en memoria: {len(rows)} preguntas")
+
+    def refresh_from_database(self):
+        """Traer solo las preguntas modificadas o borradas desde la última sincronización
+
+        Se vuelve a leer QUESTION_STORE_SYNC_OVERLAP segundos antes de last_sync:
+        updated_at es la hora de inicio de la transacción, así que una que
+        confirma tarde puede traer filas más viejas que la última vista. Lo
+        releído que no cambió no cuenta como cambio.
+        """
+        from database import get_questions_deleted_since, get_questions_updated_since
+
+        if self.last_sync is None:
+            return self.load_from_database()
+
+        since = self.last_sync - timedelta(seconds=Config.QUESTION_STORE_SYNC_OVERLAP)
+        rows = get_questions_updated_since(since)
+        deleted = get_questions_deleted_since(since)
+        last_sync = max([self.last_sync] + [row['updated_at'] for row in rows]
+                        + [row['deleted_at'] for row in deleted])
+
+        active = [self.normalize(row) for row in rows if row['is_active']]
+        active_ids = {question['id'] for question in active}
+        upserts = [question for question in active if self._by_id.get(question['id']) != question]
+        removed_ids = ({row['id'] for row in rows if not row['is_active']}
+                       | {row['question_id'] for row in deleted})
+        removed_ids = [question_id for question_id in removed_ids - active_ids if question_id in self._by_id]
+        if not upserts and not removed_ids:
+            self.last_sync = last_sync
+            return
+        self.apply_changes(upserts, removed_ids, last_sync=last_sync)
+        logger.info(f"Banco de preguntas actualizado: {len(upserts)} altas/cambios, {len(removed_ids)} bajas")
+
+question_store = QuestionStore()
+question_store.load(mock_questions)
+
 def get_questions_by_type(question_type):
-    return [q for q in mock_questions if q["type"] == question_type]
+    return question_store.by_type(question_type)
 
 def get_question_by_id(question_id):
-    return next((q for q in mock_questions if q["id"] == question_id), None)
-
-def update_team_score(team_id, points):
-    if team_id in game_state.teams:
-        game_state.teams[team_id]["score"] += points
-        if points > 0:
-            game_state.teams[team_id]["correct_answers"] += 1
-        else:
-            game_state.teams[team_id]["wrong_answers"] += 1
-
-def reset_game():
-    game_state.current_question = None
-    game_state.target_team = 'both'
-    game_state.game_active = False
-    game_state.show_answer = False
-    for team in game_state.teams.values():
-        team["score"] = 0
-        team["correct_answers"] = 0
-        team["wrong_answers"] = 0
\ No newline at end of file
+    return question_store.get(question_id)
+
+def set_current_question(game, question, target_team='both'):
+    """Activar una pregunta y devolver el parche correspondiente"""
+    def apply(state):
+        changes = {
+            'current_question': question,
+            'target_team': target_team,
+            'game_active': True,
+            'show_answer': False,
+            'answered_by': None
+        }
+        state.update(changes)
+        state['question_sent_at'] = time.monotonic()
+        used = state.setdefault('used_questions', [])
+        if question['id'] not in used:
+            used.append(question['id'])
+        return changes
+    return game.mutate(apply)
+
+def reveal_answer(game):
+    """Marcar la respuesta como visible y devolver el parche con la respuesta correcta
+
+    Devuelve None si no hay pregunta activa.
+    """
+    revealed = {}
+
+    def apply(state):
+        if not state['current_question']:
+            return None
+        revealed['correct_answer'] = state['current_question']['correct_answer']
+        state['show_answer'] = True
+        return {'show_answer': True}
+
+    patch = game.mutate(apply)
+    if patch:
+        patch['correct_answer'] = revealed['correct_answer']
+    return patch
+
+def _apply_score(state, team_id, points):
+    team = state['teams'][team_id]
+    team["score"] += points
+    counter = "correct_answers" if points > 0 else "wrong_answers"
+    team[counter] += 1
+    return {'teams': {team_id: {'score': team["score"], counter: team[counter]}}}
+
+def _revoke_score(state, team_id, points):
+    team = state['teams'][team_id]
+    team["score"] -= points
+    team["correct_answers"] -= 1
+    return {'score': team["score"], 'correct_answers': team["correct_answers"]}
+
+def update_team_score(game, team_id, points):
+    """Actualizar puntuación y devolver un parche con los campos modificados del equipo"""
+    def apply(state):
+        if team_id not in state['teams']:
+            return None
+        return _apply_score(state, team_id, points)
+    return game.mutate(apply)
+
+def submit_team_answer(game, team_id, answer, received_at=None, answered_at=None, one_way=0.0):
+    """Validar y puntuar la respuesta de un equipo en una sola mutación atómica
+
+    received_at es el time.monotonic() del servidor al recibir la respuesta;
+    answered_at y one_way vienen de la sincronización de reloj del cliente
+    (ver clock_sync). Con ANSWER_ARBITRATION='first_correct' la primera
+    respuesta correcta según el tiempo de respuesta estimado (no por orden de
+    confirmación) cierra la pregunta: las posteriores se rechazan y una
+    correcta más rápida que la ganadora le quita los puntos.
+
+    Devuelve (parche, resultado); lanza AnswerRejected si no se puede aceptar.
+    """
+    if received_at is None:
+        received_at = time.monotonic()
+    first_correct = Config.ANSWER_ARBITRATION == 'first_correct'
+    result = {}
+
+    def apply(state):
+        question = state['current_question']
+        if not question or not state['game_active']:
+            raise AnswerRejected('No hay pregunta activa')
+        # Verificar si el equipo puede responder a esta pregunta
+        if state['target_team'] != 'both' and state['target_team'] != team_id:
+            raise AnswerRejected('Esta pregunta no está dirigida a tu equipo')
+        if team_id not in state['teams']:
+            raise AnswerRejected('Equipo no encontrado')
+
+        is_correct = answer == question['correct_answer']
+        points = 10 if is_correct else -5
+        sent_at = state['question_sent_at']
+        response_time = estimate_response_time(sent_at, received_at, answered_at, one_way)
+        answer_instant = sent_at + response_time
+        winner = state['answered_by']
+        changes = {}
+
+        if first_correct and winner is not None:
+            if answer_instant >= winner['answered_at']:
+                raise AnswerRejected(f"{state['teams'][winner['team_id']]['name']} respondió primero")
+            if is_correct:
+                # Respondió antes pero se confirmó después: desbancar al ganador
+                changes['teams'] = {winner['team_id']: _revoke_score(state, winner['team_id'], 10)}
+
+        result.update({
+            'question_id': question['id'],
+            'correct_answer': question['correct_answer'],
+            'team_name': state['teams'][team_id]['name'],
+            'target_team': state['target_team'],
+            'is_correct': is_correct,
+            'points': points,
+            'response_time': response_time,
+            'displaced_team': winner['team_id'] if changes else None,
+            'displaced_points': 10 if changes else 0
+        })
+
+        score_changes = _apply_score(state, team_id, points)
+        changes.setdefault('teams', {}).update(score_changes['teams'])
+        if first_correct and is_correct:
+            state['answered_by'] = {'team_id': team_id, 'answered_at': answer_instant}
+        return changes
+
+    return game.mutate(apply), result
+
+def reset_game(game):
+    def apply(state):
+        changes = {
+            'current_question': None,
+            'target_team': 'both',
+            'game_active': False,
+            'show_answer': False,
+            'answered_by': None,
+            'teams': {
+                team_id: {'score': 0, 'correct_answers': 0, 'wrong_answers': 0}
+                for team_id in state['teams']
+            }
+        }
+        for key in ('current_question', 'target_team', 'game_active', 'show_answer', 'answered_by'):
+            state[key] = changes[key]
+        state['question_sent_at'] = None
+        state['used_questions'] = []
+        state['used_epoch'] = state.get('used_epoch', 0) + 1
+        for team_id, counters in changes['teams'].items():
+            state['teams'][team_id].update(counters)
+        return changes
+    return game.mutate(apply)
@@ -0,0 +1,161 @@
+"""
+Un solo worker marca el ritmo del chat y de las alertas de los overlays.
+
+Con OVERLAY_MESSAGE_QUEUE lo publicado llega a los overlays de todos los
+workers, pero el chat (duplicados, límites por autor, mensajes por segundo)
+y la cola de alertas (una alerta en pantalla cada vez) tienen que decidirse
+en un único sitio: con N workers habría N historiales, N veces el límite y
+alertas solapadas. LeaderRelay elige un líder con un lease en Redis (SET NX
+PX que el líder renueva); cualquier worker deja lo que recibe en una lista
+de Redis y solo el líder la vacía. El líder guarda además en Redis lo que
+todos deben poder servir (historial del chat, alerta en pantalla). Si el
+líder cae, otro toma el lease al caducar y sigue con la lista.
+"""
+
+import atexit
+import json
+import logging
+import secrets
+import threading
+
+logger = logging.getLogger(__name__)
+
+class LeaderRelay:
+    """Lista compartida que vacía un solo worker, el que tiene el lease
+
+    forward() encola desde cualquier worker; el hilo de start() toma o
+    renueva el lease y, si es el líder, entrega cada elemento a handle().
+    set_state()/get_state() guardan un valor común (con caducidad opcional).
+    """
+
+    def __init__(self, client, name, handle, lease=5.0, on_elected=None):
+        self.redis = client
+        self.name = name
+        self.handle = handle
+        self.lease_ms = int(lease * 1000)
+        self.on_elected = on_elected
+        self.token = secrets.token_hex(8)
+        self.is_leader = False
+        self._lease_key = f'tablero:overlays:{name}:leader'
+        self._inbox_key = f'tablero:overlays:{name}:inbox'
+        self._state_key = f'tablero:overlays:{name}:state'
+        # Espera en la lista: bastante menos que el lease para renovarlo a tiempo
+        self._poll = max(lease / 5, 0.05)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name=f'overlay-relay-{self.name}', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self._poll * 2)
+            self._thread = None
+        self.release()
+
+    def forward(self, item):
+        """Dejar item en la lista para el líder"""
+        self.redis.rpush(self._inbox_key, json.dumps(item, ensure_ascii=False))
+
+    def renew(self):
+        """Tomar el lease si está libre o renovarlo si es nuestro; devuelve si somos el líder"""
+        from redis.exceptions import WatchError
+
+        was_leader = self.is_leader
+        with self.redis.pipeline() as pipe:
+            try:
+                pipe.watch(self._lease_key)
+                owner = pipe.get(self._lease_key)
+                if owner is not None and owner.decode() != self.token:
+                    pipe.unwatch()
+                    self.is_leader = False
+                else:
+                    pipe.multi()
+                    pipe.set(self._lease_key, self.token, px=self.lease_ms)
+                    pipe.execute()
+                    self.is_leader = True
+            except WatchError:
+                self.is_leader = False
+        if self.is_leader and not was_leader:
+            logger.info(f"Este worker marca el ritmo de '{self.name}' en los overlays")
+            if self.on_elected is not None:
+                self.on_elected()
+        return self.is_leader
+
+    def release(self):
+        """Soltar el lease (al apagar) para que otro worker lo tome sin esperar"""
+        from redis.exceptions import WatchError
+
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        with self.redis.pipeline() as pipe:
+            try:
+                pipe.watch(self._lease_key)
+                owner = pipe.get(self._lease_key)
+                if owner is None or owner.decode() != self.token:
+                    pipe.unwatch()
+                    return
+                pipe.multi()
+                pipe.delete(self._lease_key)
+                pipe.execute()
+            except WatchError:
+                pass
+
+    def drain(self):
+        """Entregar a handle() todo lo que haya en la lista (solo el líder); devuelve cuántos"""
+        count = 0
+        while self.is_leader:
+            raw = self.redis.lpop(self._inbox_key)
+            if raw is None:
+                break
+            self._handle(raw)
+            count += 1
+        return count
+
+    def _handle(self, raw):
+        try:
+            self.handle(json.loads(raw))
+        except Exception as e:
+            logger.error(f"Error procesando un elemento de '{self.name}': {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if not self.renew():
+                    self._stop.wait(self._poll)
+                    continue
+                popped = self.redis.blpop([self._inbox_key], timeout=self._poll)
+                if popped is not None:
+                    self._handle(popped[1])
+                    self.drain()
+            except Exception as e:
+                logger.error(f"Error en el relevo de '{self.name}': {e}")
+                self._stop.wait(self._poll)
+
+    def set_state(self, value, ttl_ms=None):
+        """Guardar el valor común (None lo borra); con ttl_ms caduca solo"""
+        if value is None:
+            self.redis.delete(self._state_key)
+            return
+        ttl_ms = int(ttl_ms) if ttl_ms else None
+        if ttl_ms is not None and ttl_ms <= 0:
+            self.redis.delete(self._state_key)
+            return
+        self.redis.set(self._state_key, json.dumps(value, ensure_ascii=False), px=ttl_ms)
+
+    def get_state(self):
+        """(valor, milisegundos que le quedan o None si no caduca); (None, None) si no hay"""
+        with self.redis.pipeline() as pipe:
+            raw, ttl = pipe.get(self._state_key).pttl(self._state_key).execute()
+        if raw is None:
+            return None, None
+        return json.loads(raw), ttl if ttl >= 0 else None
+
+    def get_stats(self):
+        return {'leader': self.is_leader, 'forwarded_pending': self.redis.llen(self._inbox_key)}
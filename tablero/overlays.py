@@ -0,0 +1,486 @@
+"""
+Pub/sub por canales para los overlays de OBS (overlaysOBS/).
+
+Los overlays abren un WebSocket simple en /ws/overlays (sin el protocolo de
+Socket.IO) y envían {"type": "subscribe", "channel": "chat"}; cada conexión
+solo recibe los mensajes de sus canales. Canales: 'chat', 'alerts' y
+'scoreboard' (marcador de la partida principal) o 'scoreboard:<partida>'.
+
+El estado inicial sale de memoria: al suscribirse se envía la instantánea
+del canal, y /api/overlay/chat y /api/overlay/scoreboard la sirven por REST.
+Cada mensaje se serializa una sola vez para todos sus suscriptores. El chat
+entra por chat_pipeline.py (duplicados, límite por autor y muestreo) y se
+publica agrupado en un mensaje 'new_messages' por ciclo. Las alertas pasan
+por alert_queue.py, que decide cuál se muestra y cuándo.
+
+Con OVERLAY_MESSAGE_QUEUE (Redis) lo publicado en un worker pasa por un canal
+de Redis y cada worker lo entrega a sus propios overlays; el chat y las
+alertas entran por un solo worker (overlay_relay.py), que guarda en Redis el
+historial del chat y la alerta en pantalla. La entrega no
+bloquea a quien publica: cada conexión tiene una cola de salida y un hilo que
+envía; si un overlay se queda atrás y la cola se llena, se cierra y el
+overlay se reconecta con la instantánea.
+"""
+
+import json
+import logging
+import queue
+import threading
+from flask import Blueprint, jsonify, request
+from flask_sock import Sock
+from simple_websocket import ConnectionClosed
+from alert_queue import AlertQueue, ALERT_KINDS
+from chat_pipeline import ChatPipeline
+from config import Config
+from models import game_registry, DEFAULT_GAME
+from overlay_relay import LeaderRelay
+from state_backend import SharedState
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ('chat', 'alerts', 'scoreboard')
+
+overlay_bp = Blueprint('overlays', __name__)
+sock = Sock()
+
+class OverlayConnection:
+    """WebSocket de un overlay con su cola de salida
+
+    Quien publica solo encola; sender() envía desde su propio hilo. Si la
+    cola se llena (overlay lento o colgado) se cierra la conexión.
+    """
+
+    def __init__(self, ws, outbox_size=256):
+        self.ws = ws
+        self.channels = set()
+        self.closed = False
+        self._outbox = queue.Queue(maxsize=outbox_size)
+
+    def send_text(self, text):
+        """Encolar un mensaje ya serializado; False si la conexión está cerrada o se cerró ahora"""
+        if self.closed:
+            return False
+        try:
+            self._outbox.put_nowait(text)
+            return True
+        except queue.Full:
+            logger.warning("Overlay sin leer sus mensajes: se cierra la conexión")
+            self.close()
+            return False
+
+    def send(self, message):
+        return self.send_text(json.dumps(message, ensure_ascii=False))
+
+    def close(self):
+        """Dejar de aceptar mensajes y despertar al hilo de envío para que cierre"""
+        self.closed = True
+        while True:
+            # Lo pendiente ya no se envía: vaciar y dejar solo la marca de cierre
+            try:
+                while True:
+                    self._outbox.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self._outbox.put_nowait(None)
+                return
+            except queue.Full:
+                continue
+
+    def sender(self):
+        while True:
+            text = self._outbox.get()
+            if text is None:
+                break
+            try:
+                self.ws.send(text)
+            except ConnectionClosed:
+                self.closed = True
+                return
+        # Cierre por cola llena: receive() falla y el handler libera la conexión
+        try:
+            self.ws.close()
+        except Exception:
+            pass
+
+class OverlayHub:
+    """Suscripciones por canal y difusión a las conexiones de cada canal
+
+    Sin bus_url solo se entrega en este proceso; con una URL de Redis publish()
+    va al canal BUS_CHANNEL y el hilo de start() entrega lo de todos los workers.
+    """
+
+    BUS_CHANNEL = 'tablero:overlays'
+
+    def __init__(self, bus_url=None):
+        self._channels = {}
+        self._lock = threading.Lock()
+        self._redis = None
+        self._thread = None
+        self._counters_lock = threading.Lock()
+        self.counters = {'published': 0, 'delivered': 0, 'dropped_slow': 0}
+        if bus_url:
+            if bus_url.startswith('redis+socket://'):
+                # Misma URL que SOCKETIO_MESSAGE_QUEUE (kombu); redis-py usa unix://
+                bus_url = 'unix://' + bus_url[len('redis+socket://'):]
+            if not bus_url.startswith(('redis://', 'rediss://', 'unix://')):
+                raise ValueError(f"OVERLAY_MESSAGE_QUEUE no soportado: {bus_url}")
+            import redis
+            self._redis = redis.Redis.from_url(bus_url)
+
+    def relay(self, name, handle, on_elected=None):
+        """LeaderRelay para que un solo worker procese name (None sin cola compartida)"""
+        if self._redis is None:
+            return None
+        return LeaderRelay(self._redis, name, handle, Config.OVERLAY_LEADER_LEASE, on_elected)
+
+    def start(self):
+        if self._redis is None or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._listen, name='overlay-bus', daemon=True)
+        self._thread.start()
+        logger.info("Overlays suscritos a la cola compartida")
+
+    def _listen(self):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.BUS_CHANNEL)
+        for item in pubsub.listen():
+            try:
+                channel, _, text = item['data'].decode('utf-8').partition('\n')
+                self._deliver(channel, text)
+            except Exception as e:
+                logger.error(f"Error entregando mensaje de overlays: {e}")
+
+    def subscribe(self, connection, channel):
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(connection)
+            connection.channels.add(channel)
+
+    def unsubscribe(self, connection, channel):
+        with self._lock:
+            subscribers = self._channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard(connection)
+                if not subscribers:
+                    del self._channels[channel]
+            connection.channels.discard(channel)
+
+    def drop(self, connection):
+        for channel in list(connection.channels):
+            self.unsubscribe(connection, channel)
+
+    def _count(self, key, amount=1):
+        with self._counters_lock:
+            self.counters[key] += amount
+
+    def wants(self, channel):
+        """Si vale la pena publicar en el canal (con cola, puede haber suscriptores en otro worker)"""
+        return self._redis is not None or channel in self._channels
+
+    def publish(self, channel, message):
+        """Publicar message en el canal sin esperar a los overlays"""
+        text = json.dumps(message, ensure_ascii=False)
+        self._count('published')
+        if self._redis is not None:
+            self._redis.publish(self.BUS_CHANNEL, f'{channel}\n{text}')
+        else:
+            self._deliver(channel, text)
+
+    def _deliver(self, channel, text):
+        """Encolar el mensaje en cada suscriptor local del canal"""
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        delivered = 0
+        for connection in subscribers:
+            if connection.send_text(text):
+                delivered += 1
+            else:
+                self._count('dropped_slow')
+                self.drop(connection)
+        self._count('delivered', delivered)
+
+    def stats(self):
+        with self._lock:
+            return {channel: len(subscribers) for channel, subscribers in self._channels.items()}
+
+    def get_stats(self):
+        with self._counters_lock:
+            counters = dict(self.counters)
+        return dict(counters, shared=self._redis is not None)
+
+class OverlayState:
+    """Ronda y temporizador del marcador de cada partida, en el backend compartido"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._docs = {}
+
+    def _doc(self, game_id):
+        doc = self._docs.get(game_id)
+        if doc is None:
+            doc = self._docs.setdefault(
+                game_id, SharedState(self.backend, f'tablero:overlay_scoreboard:{game_id}', {}))
+        return doc
+
+    def update_scoreboard(self, game_id, **fields):
+        def apply(state):
+            state.update(fields)
+            return fields
+        self._doc(game_id).mutate(apply)
+
+    def forget(self, game_id):
+        """Soltar el documento en caché de una partida terminada (en cada worker)"""
+        self._docs.pop(game_id, None)
+
+    def delete(self, game_id):
+        """Eliminar del backend el estado de overlay de una partida terminada"""
+        SharedState(self.backend, f'tablero:overlay_scoreboard:{game_id}').delete()
+
+    def scoreboard_state(self, game):
+        """Mensaje full_state de scoreboard_overlay.js para una partida"""
+        teams = game.teams
+        extra = self._doc(game.game_id).get()[1] or {}
+        return {
+            'type': 'full_state',
+            'scores': {team_id: team['score'] for team_id, team in teams.items()},
+            'teamNames': {team_id: team['name'] for team_id, team in teams.items()},
+            'round': extra.get('round'),
+            'timer': extra.get('timer')
+        }
+
+overlay_hub = OverlayHub(Config.OVERLAY_MESSAGE_QUEUE)
+overlay_state = OverlayState(game_registry.backend)
+game_registry.on_removed(overlay_state.forget)
+def publish_chat(messages):
+    if chat_relay is not None:
+        # Historial común para los overlays y /api/overlay/chat de cualquier worker
+        chat_relay.set_state(chat_pipeline.recent())
+    overlay_hub.publish('chat', {'type': 'new_messages', 'messages': messages})
+
+chat_pipeline = ChatPipeline(
+    publish_chat,
+    history=Config.OVERLAY_CHAT_HISTORY,
+    max_rate=Config.CHAT_MAX_RATE,
+    flush_interval=Config.CHAT_FLUSH_MS / 1000,
+    author_rate=Config.CHAT_AUTHOR_RATE,
+    author_burst=Config.CHAT_AUTHOR_BURST,
+    dedupe_window=Config.CHAT_DEDUPE_SECONDS,
+    max_length=Config.CHAT_MAX_LENGTH,
+    max_pending=Config.CHAT_MAX_PENDING
+)
+# Con cola compartida el chat lo filtra y lo marca solo el worker líder; al
+# tomar el relevo recupera el historial común
+chat_relay = overlay_hub.relay(
+    'chat', chat_pipeline.submit,
+    on_elected=lambda: chat_pipeline.seed(chat_relay.get_state()[0] or []))
+
+def submit_chat(raw):
+    """Encolar un mensaje de chat; devuelve el motivo del descarte (None si se aceptó o se reenvió)"""
+    if chat_relay is None:
+        return chat_pipeline.submit(raw)
+    chat_relay.forward(raw)
+    return None
+
+def recent_chat(limit=None):
+    if chat_relay is None:
+        return chat_pipeline.recent(limit)
+    messages = chat_relay.get_state()[0] or []
+    return messages[-limit:] if limit else messages
+
+def publish_alert(message):
+    if alert_relay is not None:
+        # Alerta en pantalla común, caduca cuando termina
+        if message.get('type') == 'alert':
+            alert_relay.set_state(message, message['duration'])
+        else:
+            alert_relay.set_state(None)
+    overlay_hub.publish('alerts', message)
+
+alert_queue = AlertQueue(
+    publish_alert,
+    default_duration=Config.ALERT_DEFAULT_MS,
+    min_duration=Config.ALERT_MIN_MS,
+    max_duration=Config.ALERT_MAX_MS,
+    gap=Config.ALERT_GAP_MS,
+    budget=Config.ALERT_QUEUE_BUDGET,
+    max_age=Config.ALERT_MAX_AGE,
+    max_pending=Config.ALERT_MAX_PENDING
+)
+
+def handle_alert_item(item):
+    if item.get('type') == 'clear_alerts':
+        alert_queue.clear()
+    else:
+        alert_queue.submit(item['alert'])
+
+# Con cola compartida la cola de alertas (prioridad y ritmo) vive solo en el worker líder
+alert_relay = overlay_hub.relay('alerts', handle_alert_item)
+
+def submit_alert(alert):
+    if alert_relay is None:
+        alert_queue.submit(alert)
+    else:
+        alert_relay.forward({'type': 'alert', 'alert': alert})
+
+def clear_alerts():
+    if alert_relay is None:
+        alert_queue.clear()
+    else:
+        alert_relay.forward({'type': 'clear_alerts'})
+
+def current_alert():
+    """Alerta en pantalla con el tiempo que le queda, la muestre el worker que la muestre"""
+    if alert_relay is None:
+        return current_alert()
+    alert, remaining = alert_relay.get_state()
+    if alert is None or not remaining:
+        return None
+    # Sin sonido: ya sonó cuando empezó
+    alert = {key: value for key, value in alert.items() if key != 'sound'}
+    return dict(alert, duration=remaining)
+
+def scoreboard_channel(game_id):
+    return 'scoreboard' if game_id == DEFAULT_GAME else f'scoreboard:{game_id}'
+
+def channel_game(channel):
+    """Partida de un canal 'scoreboard[:partida]' (None si no existe)"""
+    _, _, game_id = channel.partition(':')
+    return game_registry.get(game_id or DEFAULT_GAME)
+
+def channel_snapshot(channel):
+    """Instantánea que recibe un overlay al suscribirse (None si el canal no tiene)"""
+    if channel == 'chat':
+        return {'type': 'chat_history', 'messages': recent_chat()}
+    if channel == 'alerts':
+        return alert_queue.current()
+    if channel.split(':')[0] == 'scoreboard':
+        game = channel_game(channel)
+        return overlay_state.scoreboard_state(game) if game is not None else None
+    return None
+
+def publish_game_patch(game, event, payload):
+    """Reenviar al marcador de OBS los cambios de puntuación de un parche de la partida"""
+    channel = scoreboard_channel(game.game_id)
+    if not overlay_hub.wants(channel):
+        return
+    if event == 'game_reset':
+        overlay_hub.publish(channel, overlay_state.scoreboard_state(game))
+        return
+    for team_id, fields in payload.get('changes', {}).get('teams', {}).items():
+        if 'score' in fields:
+            overlay_hub.publish(channel, {'type': 'score_update', 'team': team_id, 'score': fields['score']})
+
+@sock.route('/ws/overlays', bp=overlay_bp)
+def overlay_socket(ws):
+    connection = OverlayConnection(ws, Config.OVERLAY_OUTBOX_SIZE)
+    threading.Thread(target=connection.sender, name='overlay-sender', daemon=True).start()
+    try:
+        while True:
+            try:
+                data = json.loads(ws.receive())
+            except (TypeError, ValueError):
+                continue
+            if not isinstance(data, dict):
+                continue
+            channel = str(data.get('channel') or '')
+            if data.get('type') == 'subscribe' and channel.split(':')[0] in CHANNELS:
+                overlay_hub.subscribe(connection, channel)
+                snapshot = channel_snapshot(channel)
+                if snapshot is not None:
+                    connection.send(snapshot)
+            elif data.get('type') == 'chat_message':
+                # Un bot de chat puede mantener este socket abierto en vez de hacer un POST por mensaje
+                submit_chat(data)
+            elif data.get('type') == 'unsubscribe':
+                overlay_hub.unsubscribe(connection, channel)
+            elif data.get('type') == 'ping':
+                connection.send({'type': 'pong'})
+    except ConnectionClosed:
+        pass
+    finally:
+        overlay_hub.drop(connection)
+        if not connection.closed:
+            connection.close()
+
+@overlay_bp.after_request
+def allow_file_origin(response):
+    # Los overlays se abren en OBS como file://, otro origen
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+@overlay_bp.route('/api/overlay/chat')
+def api_overlay_chat():
+    limit = request.args.get('limit', type=int)
+    return jsonify({'messages': recent_chat(limit if limit and limit > 0 else None)})
+
+@overlay_bp.route('/api/overlay/chat', methods=['POST'])
+def api_overlay_chat_post():
+    """Encolar mensajes de chat: {"user", "text", "id"?} o {"messages": [...]}"""
+    data = request.get_json(silent=True) or {}
+    messages = data.get('messages') if isinstance(data.get('messages'), list) else [data]
+    dropped = {}
+    for message in messages:
+        reason = submit_chat(message)
+        if reason is not None:
+            dropped[reason] = dropped.get(reason, 0) + 1
+    return jsonify({'status': 'success', 'queued': len(messages) - sum(dropped.values()),
+                    'dropped': dropped})
+
+@overlay_bp.route('/api/overlay/alerts', methods=['POST'])
+def api_overlay_alert():
+    """Encolar una alerta: {"kind"?, "title"?, "message"?, "user"?, "amount"?, "priority"?,
+    "icon"?, "duration"?, "sound"?, "style"?}; con kind conocido bastan user/amount"""
+    data = request.get_json(silent=True) or {}
+    if data.get('type') == 'clear_alerts':
+        clear_alerts()
+        return jsonify({'status': 'success'})
+    alert = {key: data[key] for key in ('kind', 'title', 'message', 'user', 'amount', 'priority', 'icon',
+                                        'duration', 'sound', 'style') if key in data}
+    if not alert.get('title') and not alert.get('message') and alert.get('kind') not in ALERT_KINDS:
+        return jsonify({'error': 'Falta title, message o un kind conocido'}), 400
+    submit_alert(alert)
+    # Con cola compartida la cola está en el worker líder: aquí no se conoce
+    queue = alert_queue.get_stats()['pending'] if alert_relay is None else None
+    return jsonify({'status': 'success', 'queue': queue})
+
+@overlay_bp.route('/api/overlay/scoreboard')
+def api_overlay_scoreboard():
+    game = game_registry.get(request.args.get('game', DEFAULT_GAME))
+    if game is None:
+        return jsonify({'error': 'Partida no encontrada'}), 404
+    return jsonify(overlay_state.scoreboard_state(game))
+
+@overlay_bp.route('/api/overlay/scoreboard', methods=['POST'])
+def api_overlay_scoreboard_post():
+    """Ronda y temporizador del marcador de OBS: {"round"?, "timer"?} (?game=)"""
+    game = game_registry.get(request.args.get('game', DEFAULT_GAME))
+    if game is None:
+        return jsonify({'error': 'Partida no encontrada'}), 404
+    data = request.get_json(silent=True) or {}
+    # Validar todo antes de cambiar nada: un timer erróneo no deja la ronda a medias
+    fields = {}
+    if 'round' in data:
+        if isinstance(data['round'], (dict, list, bool)):
+            return jsonify({'error': 'round debe ser un número o un texto'}), 400
+        fields['round'] = data['round']
+    if 'timer' in data:
+        try:
+            fields['timer'] = int(data['timer'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'timer debe ser un número de segundos'}), 400
+    if fields:
+        overlay_state.update_scoreboard(game.game_id, **fields)
+        channel = scoreboard_channel(game.game_id)
+        if 'round' in fields:
+            overlay_hub.publish(channel, {'type': 'round_info', 'round': fields['round']})
+        if 'timer' in fields:
+            overlay_hub.publish(channel, {'type': 'timer_update', 'time': fields['timer']})
+    return jsonify(overlay_state.scoreboard_state(game))
+
+@overlay_bp.route('/api/overlay/stats')
+def api_overlay_stats():
+    return jsonify({'subscribers': overlay_hub.stats(), 'delivery': overlay_hub.get_stats(),
+                    'chat': dict(chat_pipeline.get_stats(),
+                                 relay=chat_relay.get_stats() if chat_relay is not None else None),
+                    'alerts': dict(alert_queue.get_stats(),
+                                   relay=alert_relay.get_stats() if alert_relay is not None else None)})
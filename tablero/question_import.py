@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Importación masiva de preguntas desde CSV o JSON.
+
+Valida todas las filas antes de tocar la base de datos y después inserta las
+válidas por lotes (ver database.bulk_insert_questions). El informe indica los
+errores de cada fila y el rendimiento de la importación.
+
+CSV (con cabecera): type,question,correct_answer,category,difficulty,options
+    options separadas por "|" (opcional en cierto_falso)
+JSON: lista de objetos con los mismos campos (options como lista), o
+    {"questions": [...]}; es el mismo formato que mock_questions.
+
+Uso:
+    python question_import.py preguntas.csv
+    python question_import.py preguntas.json --dry-run
+    python question_import.py preguntas.csv --batch-size 1000 --allow-duplicates
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+
+QUESTION_TYPES = ('cierto_falso', 'opcion_multiple')
+TRUE_FALSE_OPTIONS = ['Cierto', 'Falso']
+OPTION_SEPARATOR = '|'
+
+class ImportFormatError(Exception):
+    """El archivo no se puede leer como CSV o JSON de preguntas"""
+
+def parse_rows(text, fmt):
+    """Devolver [(número de fila, dict)]; en CSV el número es la línea (la cabecera es la 1)"""
+    if fmt == 'json':
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ImportFormatError(f"JSON no válido: {e}") from e
+        if isinstance(data, dict):
+            data = data.get('questions')
+        if not isinstance(data, list):
+            raise ImportFormatError('Se esperaba una lista de preguntas o {"questions": [...]}')
+        return list(enumerate(data, start=1))
+
+    if fmt == 'csv':
+        reader = csv.DictReader(io.StringIO(text))
+        missing = {'type', 'question', 'correct_answer'} - set(reader.fieldnames or ())
+        if missing:
+            raise ImportFormatError(f"Faltan columnas en el CSV: {', '.join(sorted(missing))}")
+        return [(reader.line_num, row) for row in reader]
+
+    raise ImportFormatError(f"Formato no soportado: {fmt} (csv o json)")
+
+def validate_row(raw):
+    """Normalizar una fila; lanza ValueError con el motivo si no es válida"""
+    if not isinstance(raw, dict):
+        raise ValueError('La fila no es un objeto')
+
+    question_type = str(raw.get('type') or '').strip()
+    if question_type not in QUESTION_TYPES:
+        raise ValueError(f"type debe ser {' o '.join(QUESTION_TYPES)}")
+    question = str(raw.get('question') or '').strip()
+    if not question:
+        raise ValueError('question vacía')
+    correct_answer = str(raw.get('correct_answer') or '').strip()
+    if not correct_answer:
+        raise ValueError('correct_answer vacía')
+
+    difficulty = raw.get('difficulty')
+    try:
+        difficulty = int(difficulty) if difficulty not in (None, '') else 1
+    except (TypeError, ValueError):
+        raise ValueError('difficulty debe ser un entero') from None
+    if not 1 <= difficulty <= 5:
+        raise ValueError('difficulty debe estar entre 1 y 5')
+
+    options = raw.get('options') or []
+    if isinstance(options, str):
+        options = options.split(OPTION_SEPARATOR)
+    if not isinstance(options, list):
+        raise ValueError('options debe ser una lista')
+    options = [str(option).strip() for option in options if str(option).strip()]
+    if not options and question_type == 'cierto_falso':
+        options = list(TRUE_FALSE_OPTIONS)
+    if len(options) < 2:
+        raise ValueError('Se necesitan al menos 2 opciones')
+    if len(set(options)) != len(options):
+        raise ValueError('Opciones repetidas')
+    if correct_answer not in options:
+        raise ValueError('correct_answer no está entre las opciones')
+
+    return {
+        'type': question_type,
+        'question': question,
+        'correct_answer': correct_answer,
+        'category': str(raw.get('category') or '').strip() or None,
+        'difficulty': difficulty,
+        'options': options
+    }
+
+def validate_rows(rows):
+    """Separar filas válidas y errores; también detecta preguntas repetidas en el archivo"""
+    valid = []
+    errors = []
+    seen = {}
+    for row_number, raw in rows:
+        try:
+            question = validate_row(raw)
+            key = (question['type'], question['question'])
+            if key in seen:
+                raise ValueError(f"Pregunta repetida (fila {seen[key]})")
+            seen[key] = row_number
+            valid.append((row_number, question))
+        except ValueError as e:
+            errors.append({'row': row_number, 'error': str(e)})
+    return valid, errors
+
+def import_questions(text, fmt, batch_size=None, dry_run=False, skip_existing=True):
+    """Validar e importar; devuelve el informe (lanza ImportFormatError si el archivo no se puede leer)"""
+    start = time.perf_counter()
+    rows = parse_rows(text, fmt)
+    valid, errors = validate_rows(rows)
+    report = {
+        'total_rows': len(rows),
+        'valid_rows': len(valid),
+        'imported': 0,
+        'skipped_existing': 0,
+        'skipped_rows': [],
+        'categories_created': 0,
+        'dry_run': dry_run,
+        'errors': errors
+    }
+
+    if valid and not dry_run:
+        from database import bulk_insert_questions
+
+        result = bulk_insert_questions([question for _, question in valid], batch_size, skip_existing)
+        report['imported'] = len(result['inserted'])
+        report['skipped_existing'] = len(result['skipped'])
+        report['categories_created'] = result['categories_created']
+        report['skipped_rows'] = [valid[i][0] for i in result['skipped']]
+        errors.extend({'row': valid[i][0], 'error': error} for i, error in result['failed'])
+        errors.sort(key=lambda error: error['row'])
+
+    seconds = time.perf_counter() - start
+    report['seconds'] = round(seconds, 3)
+    report['rows_per_second'] = round(len(rows) / seconds, 1) if seconds > 0 else None
+    return report
+
+def detect_format(filename, default='csv'):
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    return extension if extension in ('csv', 'json') else default
+
+def main():
+    parser = argparse.ArgumentParser(description="Importar preguntas desde CSV o JSON")
+    parser.add_argument('file', help="archivo .csv o .json")
+    parser.add_argument('--format', choices=('csv', 'json'), help="por defecto según la extensión")
+    parser.add_argument('--batch-size', type=int, help="preguntas por transacción (IMPORT_BATCH_SIZE)")
+    parser.add_argument('--dry-run', action='store_true', help="solo validar, sin escribir")
+    parser.add_argument('--allow-duplicates', action='store_true',
+                        help="importar aunque la pregunta ya exista en la base de datos")
+    args = parser.parse_args()
+
+    with open(args.file, 'r', encoding='utf-8-sig') as file:
+        text = file.read()
+
+    print(f"📥 Importando {args.file}{' (solo validación)' if args.dry_run else ''}...")
+    try:
+        report = import_questions(text, args.format or detect_format(args.file), args.batch_size,
+                                  args.dry_run, not args.allow_duplicates)
+    except ImportFormatError as e:
+        print(f"❌ {e}")
+        return False
+
+    for error in report['errors']:
+        print(f"  ⚠️  Fila {error['row']}: {error['error']}")
+    print(f"\n📊 Filas: {report['total_rows']}  válidas: {report['valid_rows']}  "
+          f"importadas: {report['imported']}  ya existentes: {report['skipped_existing']}  "
+          f"errores: {len(report['errors'])}")
+    print(f"📂 Categorías nuevas: {report['categories_created']}")
+    print(f"⏱️  {report['seconds']} s ({report['rows_per_second']} filas/s)")
+    return not report['errors']
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -1,57 +1,348 @@
-from flask import Blueprint, render_template, jsonify
-from models import mock_questions, get_questions_by_type, game_state
+from datetime import datetime, timedelta
+from flask import Blueprint, Response, render_template, jsonify, request, abort, stream_with_context
+from markupsafe import escape
+from config import Config
+from export import MIMETYPES, SERIALIZERS
+from http_cache import cached_json, question_bank_tag
+from metrics import query_latency, game_response_times, response_times
+from models import question_store, game_registry, DEFAULT_GAME
+from overlays import overlay_state
+from wire import WIRE_KEYS, WIRE_SCHEMA_VERSION
+from write_behind import answer_writer
 
 main_bp = Blueprint('main', __name__)
 
+# Emoji de cada color base de equipo en las pantallas
+TEAM_EMOJIS = {'blue': '🔵', 'red': '🔴', 'green': '🟢', 'yellow': '🟡',
+               'purple': '🟣', 'orange': '🟠'}
+
+# Lo que este worker guarda de cada partida se libera al terminarla, aunque la
+# termine otro worker (scheduler.py y overlays.py registran lo suyo)
+game_registry.on_removed(lambda game_id: response_times.pop(game_id, None))
+
+@main_bp.app_context_processor
+def wire_schema_context():
+    # Esquema de claves de MessagePack para base.html
+    return {'wire_keys': WIRE_KEYS, 'wire_schema': WIRE_SCHEMA_VERSION}
+
+def requested_game():
+    """Partida indicada con ?game= (la principal si no se indica); 404 si no existe"""
+    game = game_registry.get(request.args.get('game', DEFAULT_GAME))
+    if game is None:
+        abort(404, description='Partida no encontrada')
+    return game
+
+def int_arg(name):
+    """Parámetro entero opcional de la query (None si no llega); ValueError si no es entero"""
+    value = request.args.get(name, '')
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{name} debe ser un entero') from None
+
+def team_views(game):
+    """Equipos de la partida con su color base y emoji, en orden, para las plantillas"""
+    views = []
+    for team_id, team in game.teams.items():
+        color = team['color'].split('-')[0]
+        views.append({'id': team_id, 'name': team['name'], 'color': color,
+                      'emoji': TEAM_EMOJIS.get(color, '⚪')})
+    return views
+
+def render_game_page(template, game, **context):
+    return render_template(template, game_id=game.game_id, teams=team_views(game), **context)
+
 @main_bp.route('/')
 def index():
-    return '''
+    sections = []
+    for info in game_registry.list():
+        game = game_registry.get(info['id'])
+        if game is None:
+            continue
+        query = f"?game={game.game_id}"
+        links = [f'<li><a href="/moderador{query}">Panel del Moderador</a></li>',
+                 f'<li><a href="/tablero{query}">Tablero Principal (Solo Vista)</a></li>']
+        links += [f'<li><a href="/respuestas/{team["id"]}{query}">Panel Respuestas - {escape(team["name"])}</a></li>'
+                  for team in team_views(game)]
+        links.append(f'<li><a href="/marcador{query}">Marcador de Equipos</a></li>')
+        sections.append(f"<h2>{escape(info['name'])}</h2>\n    <ul>\n        " + "\n        ".join(links) + "\n    </ul>")
+    return """
     <h1>Sistema de Tablero para Juego de Preguntas</h1>
-    <ul>
-        <li><a href="/moderador">Panel del Moderador</a></li>
-        <li><a href="/tablero">Tablero Principal (Solo Vista)</a></li>
-        <li><a href="/respuestas/team1">Panel Respuestas - Equipo Azul</a></li>
-        <li><a href="/respuestas/team2">Panel Respuestas - Equipo Rojo</a></li>
-        <li><a href="/marcador">Marcador de Equipos</a></li>
-    </ul>
-    '''
+    """ + "\n    ".join(sections)
 
 @main_bp.route('/moderador')
 def moderador():
-    return render_template('moderador.html')
+    return render_game_page('moderador.html', requested_game())
 
 @main_bp.route('/tablero')
 def tablero():
-    return render_template('tablero.html')
+    return render_game_page('tablero.html', requested_game())
 
 @main_bp.route('/marcador')
 def marcador():
-    return render_template('marcador.html')
+    return render_game_page('marcador.html', requested_game())
 
 @main_bp.route('/respuestas/<team_id>')
 def respuestas(team_id):
-    if team_id not in ['team1', 'team2']:
-        return "Equipo no válido. Use team1 o team2.", 400
-    
-    team_name = "Equipo Azul" if team_id == "team1" else "Equipo Rojo"
-    team_color = "blue" if team_id == "team1" else "red"
-    
-    return render_template('respuestas.html', 
-                         team_id=team_id, 
-                         team_name=team_name, 
-                         team_color=team_color)
+    game = requested_game()
+    team = next((team for team in team_views(game) if team['id'] == team_id), None)
+    if team is None:
+        return "Equipo no válido en esta partida.", 400
+
+    return render_game_page('respuestas.html', game,
+                            team_id=team_id,
+                            team_name=team['name'],
+                            team_color=team['color'],
+                            team_emoji=team['emoji'])
+
+@main_bp.route('/api/games')
+def api_games():
+    """Partidas en curso con su número de equipos"""
+    games = []
+    for info in game_registry.list():
+        game = game_registry.get(info['id'])
+        if game is not None:
+            games.append(dict(info, teams=len(game.teams), session_id=game.session_id))
+    return jsonify(games)
+
+@main_bp.route('/api/games', methods=['POST'])
+def api_create_game():
+    """Crear una partida: {"name", "game_id"?, "teams"?: [{"name", "color"?}]}
+
+    Sin equipos se usan los de la base de datos (si está activa) o los dos por defecto.
+    """
+    data = request.get_json(silent=True) or {}
+    teams = data.get('teams')
+    if teams is not None and (not isinstance(teams, list) or
+                              not all(isinstance(team, dict) and team.get('name') for team in teams)):
+        return jsonify({'error': 'teams debe ser una lista de {"name", "color"}'}), 400
+    if not teams and Config.USE_DATABASE:
+        from database import get_all_teams
+        teams = [{'name': team['name'], 'color': team['color']} for team in get_all_teams()]
+
+    try:
+        game = game_registry.create(data.get('name'), teams or None, data.get('game_id'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    info = game_registry.info(game.game_id)
+    if Config.USE_DATABASE:
+        game.start_database_session(info['name'])
+    return jsonify(dict(info, id=game.game_id, teams=game.teams)), 201
+
+@main_bp.route('/api/games/<game_id>', methods=['DELETE'])
+def api_end_game(game_id):
+    """Terminar una partida y liberar su estado (la principal no se puede terminar)"""
+    if game_id == DEFAULT_GAME:
+        return jsonify({'error': 'La partida principal no se puede terminar'}), 400
+    game = game_registry.remove(game_id)
+    if game is None:
+        return jsonify({'error': 'Partida no encontrada'}), 404
+    overlay_state.delete(game_id)
+    return jsonify({'status': 'success', 'id': game_id})
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+@main_bp.route('/api/questions/search')
+def api_search_questions():
+    """Buscar preguntas: ?q=&type=&category=&difficulty=&unused=1&game=&after=&limit=
+
+    Paginación por id: la respuesta trae next_after para pedir la página siguiente.
+    unused=1 excluye las preguntas ya enviadas en la partida (desde el último reinicio).
+    """
+    try:
+        difficulty = int_arg('difficulty')
+        after = int_arg('after')
+        limit = int_arg('limit')
+        limit = SEARCH_PAGE_SIZE if limit is None else min(max(limit, 1), SEARCH_MAX_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    filters = {
+        'text': request.args.get('q', '').strip() or None,
+        'question_type': request.args.get('type') or None,
+        'category': request.args.get('category') or None,
+        'difficulty': difficulty,
+        'after': after,
+        'limit': limit
+    }
+
+    # La URL ya distingue los filtros; el ETag cubre el banco y, con unused, la partida
+    tag = question_bank_tag(question_store)
+    if request.args.get('unused') == '1':
+        game = requested_game()
+        tag = f"{tag}-{game.game_id}-{game.version}"
+        filters['exclude_ids'] = game.used_questions
+
+    def build():
+        if Config.USE_DATABASE:
+            from database import search_questions
+            rows, next_after = search_questions(**filters)
+            items = [question_store.normalize(row) for row in rows]
+        else:
+            items, next_after = question_store.search(**filters)
+        return {'items': items, 'next_after': next_after}
+    return cached_json(tag, build)
+
+@main_bp.route('/api/questions/categories')
+def api_question_categories():
+    return cached_json(question_bank_tag(question_store), question_store.categories)
 
 @main_bp.route('/api/questions/<question_type>')
 def api_questions(question_type):
-    questions = get_questions_by_type(question_type)
-    return jsonify(questions)
+    return cached_json(question_bank_tag(question_store), lambda: question_store.by_type(question_type))
 
 @main_bp.route('/api/game_state')
 def api_game_state():
+    game = requested_game()
+    # La versión se lee antes que el estado: el cuerpo nunca es más viejo que su ETag
+    return cached_json(f"{game.game_id}-{game.version}", game.public_snapshot)
+
+@main_bp.route('/api/response_times')
+def api_response_times():
+    """Distribución de tiempos de respuesta por equipo en la partida"""
+    game = requested_game()
+    summary = game_response_times(game.game_id).summary()
+    teams = game.teams
     return jsonify({
-        'current_question': game_state.current_question,
-        'target_team': game_state.target_team,
-        'teams': game_state.teams,
-        'game_active': game_state.game_active,
-        'show_answer': game_state.show_answer
-    })
\ No newline at end of file
+        team_id: dict(summary.get(team_id, {'count': 0}), name=team['name'])
+        for team_id, team in teams.items()
+    })
+
+LEADERBOARD_LIMIT = 10
+LEADERBOARD_MAX_LIMIT = 100
+
+@main_bp.route('/api/leaderboard')
+def api_leaderboard():
+    """Clasificación de la partida (filas precalculadas en PostgreSQL)"""
+    game = requested_game()
+    try:
+        limit = int_arg('limit')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    limit = LEADERBOARD_LIMIT if limit is None else min(max(limit, 1), LEADERBOARD_MAX_LIMIT)
+    session_id = game.session_id
+    if Config.USE_DATABASE and session_id is not None:
+        from database import get_session_leaderboard
+        return jsonify(get_session_leaderboard(session_id, limit))
+
+    ranking = sorted(game.teams.items(), key=lambda item: -item[1]['score'])
+    return jsonify([
+        {'team_id': team_id, 'name': team['name'], 'color': team['color'],
+         'current_score': team['score'], 'correct_answers': team['correct_answers'],
+         'wrong_answers': team['wrong_answers']}
+        for team_id, team in ranking[:limit]
+    ])
+
+@main_bp.route('/api/stats')
+def api_stats():
+    """Estadísticas de la partida"""
+    game = requested_game()
+    session_id = game.session_id
+    if Config.USE_DATABASE and session_id is not None:
+        from database import get_session_stats
+        return jsonify(get_session_stats(session_id))
+
+    teams = game.teams.values()
+    correct = sum(team['correct_answers'] for team in teams)
+    wrong = sum(team['wrong_answers'] for team in teams)
+    total_score = sum(team['score'] for team in teams)
+    return jsonify({
+        'session_id': None,
+        'total_teams': len(teams),
+        'total_score': total_score,
+        'total_responses': correct + wrong,
+        'correct_responses': correct,
+        'avg_score': total_score / len(teams) if teams else None
+    })
+
+def parse_export_date(value, end=False):
+    """Fecha u hora ISO 8601; una fecha sola como fin del rango incluye ese día completo"""
+    parsed = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+@main_bp.route('/api/export/<dataset>')
+def api_export(dataset):
+    """Exportar en streaming el historial de respuestas o de sesiones
+
+    ?format=csv|ndjson, filtros opcionales session_id, team_id (ids de la BD),
+    from y to (ISO 8601; to es exclusivo salvo que sea una fecha sola).
+    """
+    from_value = request.args.get('from')
+    to_value = request.args.get('to')
+    fmt = request.args.get('format', 'csv')
+    if not Config.USE_DATABASE:
+        return jsonify({'error': 'La exportación requiere USE_DATABASE=True'}), 503
+    if fmt not in SERIALIZERS:
+        return jsonify({'error': 'Formato no soportado (csv o ndjson)'}), 400
+
+    from database import EXPORT_QUERIES, stream_export
+    if dataset not in EXPORT_QUERIES:
+        return jsonify({'error': f"Exportación no válida: {', '.join(EXPORT_QUERIES)}"}), 400
+    try:
+        filters = {'session_id': int_arg('session_id'), 'team_id': int_arg('team_id')}
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        filters.update({
+            'date_from': parse_export_date(from_value) if from_value else None,
+            'date_to': parse_export_date(to_value, end=True) if to_value else None
+        })
+    except ValueError:
+        return jsonify({'error': 'Fechas no válidas (use ISO 8601, p. ej. 2024-05-01)'}), 400
+
+    rows = stream_export(dataset, filters)
+    chunks = SERIALIZERS[fmt](rows, EXPORT_QUERIES[dataset].columns)
+    filename = f"{dataset}_{datetime.now():%Y%m%d_%H%M%S}.{fmt}"
+    return Response(stream_with_context(chunks), mimetype=MIMETYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@main_bp.route('/api/admin/questions/import', methods=['POST'])
+def api_import_questions():
+    """Importar preguntas desde CSV o JSON (archivo 'file' o cuerpo de la petición)
+
+    ?format=csv|json (por defecto según el nombre o el tipo del contenido),
+    ?dry_run=1 solo valida. Devuelve el informe con los errores por fila.
+    """
+    from question_import import ImportFormatError, detect_format, import_questions
+
+    upload = request.files.get('file')
+    try:
+        if upload is not None:
+            text = upload.read().decode('utf-8-sig')
+            default_format = detect_format(upload.filename)
+        else:
+            text = request.get_data().decode('utf-8-sig')
+            default_format = 'json' if request.is_json else 'csv'
+    except UnicodeDecodeError:
+        return jsonify({'error': 'El archivo debe estar en UTF-8'}), 400
+    fmt = request.args.get('format', default_format)
+    dry_run = request.args.get('dry_run', '').lower() in ('1', 'true')
+    if not Config.USE_DATABASE and not dry_run:
+        return jsonify({'error': 'La importación requiere USE_DATABASE=True (o dry_run=1)'}), 503
+
+    try:
+        report = import_questions(text, fmt, dry_run=dry_run)
+    except ImportFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    if report['imported']:
+        # Traer las nuevas preguntas al banco en memoria sin esperar al refresco periódico
+        question_store.refresh_from_database()
+    return jsonify(report), 200 if not report['errors'] else 207
+
+@main_bp.route('/api/admin/db_stats')
+def api_admin_db_stats():
+    """Latencias por consulta (p50/p95/p99), pool, banco de preguntas en memoria y escritura diferida"""
+    stats = {
+        'database_enabled': Config.USE_DATABASE,
+        'queries': query_latency.summary(),
+        'question_store': question_store.get_stats(),
+        'write_behind': answer_writer.get_stats()
+    }
+    if Config.USE_DATABASE:
+        from database import db_manager
+        stats['pool'] = db_manager.pool_stats()
+    return jsonify(stats)
\ No newline at end of file
@@ -0,0 +1,209 @@
+import random
+import threading
+from config import Config
+from models import game_registry, question_store
+
+CATEGORY_POLICIES = ('round_robin', 'random')
+DIFFICULTY_POLICIES = ('adaptive', 'any')
+TARGET_POLICIES = ('both', 'rotate', 'trailing')
+DIFFICULTY_LEVELS = (1, 2, 3, 4, 5)
+
+# Orden de dificultades a probar para cada objetivo: primero la más cercana
+DIFFICULTY_ORDER = {
+    target: tuple(sorted(DIFFICULTY_LEVELS, key=lambda level: (abs(level - target), level)))
+    for target in DIFFICULTY_LEVELS
+}
+
+class QuestionPools:
+    """Ids de las preguntas activas agrupados por (categoría, dificultad)
+
+    Se reconstruyen solo cuando cambia question_store.version; cada pool se
+    baraja una vez al construirlo.
+    """
+
+    def __init__(self, store, rng=None):
+        self._store = store
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._built = (None, {}, ())
+
+    def get(self):
+        """(versión, {(categoría, dificultad): [ids]}, categorías ordenadas)"""
+        with self._lock:
+            version = self._store.version
+            if self._built[0] != version:
+                pools = {}
+                for question in self._store.all():
+                    pools.setdefault((question['category'], question['difficulty']), []).append(question['id'])
+                for ids in pools.values():
+                    ids.sort()
+                    self._rng.shuffle(ids)
+                categories = tuple(sorted({category for category, _ in pools}, key=str))
+                self._built = (version, pools, categories)
+            return self._built
+
+class GameSchedule:
+    """Estado del planificador para una partida: bitset de usadas y cursores por pool"""
+
+    def __init__(self):
+        self.used = bytearray()
+        self.used_count = 0
+        self.epoch = None
+        self.pools_version = None
+        self.cursors = {}
+        self.category_index = 0
+        self.team_index = 0
+
+    def is_used(self, question_id):
+        byte = question_id >> 3
+        return byte < len(self.used) and bool(self.used[byte] & (1 << (question_id & 7)))
+
+    def mark_used(self, question_id):
+        byte = question_id >> 3
+        if byte >= len(self.used):
+            self.used.extend(bytes(byte - len(self.used) + 1))
+        self.used[byte] |= 1 << (question_id & 7)
+
+    def sync(self, used_questions, epoch, pools_version):
+        """Incorporar las preguntas enviadas desde la última vez (también a mano o en otro worker)
+
+        used_questions solo crece hasta que un reinicio la vacía y cambia epoch.
+        """
+        if epoch != self.epoch:
+            self.used = bytearray()
+            self.used_count = 0
+            self.epoch = epoch
+            self.cursors = {}
+        for question_id in used_questions[self.used_count:]:
+            self.mark_used(question_id)
+        self.used_count = len(used_questions)
+        if pools_version != self.pools_version:
+            # Pools nuevos: los cursores apuntaban a las listas anteriores
+            self.pools_version = pools_version
+            self.cursors = {}
+
+    def take(self, key, pool):
+        """Primera pregunta sin usar del pool (el cursor nunca retrocede)"""
+        cursor = self.cursors.get(key, 0)
+        while cursor < len(pool) and self.is_used(pool[cursor]):
+            cursor += 1
+        self.cursors[key] = cursor
+        return pool[cursor] if cursor < len(pool) else None
+
+class QuestionScheduler:
+    """Elige la siguiente pregunta de una partida sin repetir ninguna
+
+    El coste no depende del tamaño del banco: se prueban como mucho
+    categorías x 5 pools y los cursores solo avanzan, saltando las usadas.
+
+    Políticas:
+    - categoría: 'round_robin' (una categoría distinta cada vez) o 'random'
+    - dificultad: 'adaptive' (curva según las preguntas enviadas, corregida
+      por el acierto del equipo destinatario) o 'any' (rotando niveles)
+    - equipo: 'both', 'rotate' (por turnos) o 'trailing' (el que va último)
+    """
+
+    # Respuestas mínimas del destinatario antes de corregir la curva por acierto
+    ADAPT_MIN_ANSWERS = 4
+    ADAPT_HIGH_ACCURACY = 0.75
+    ADAPT_LOW_ACCURACY = 0.4
+
+    def __init__(self, store, category_policy='round_robin', difficulty_policy='adaptive',
+                 target_policy='both', difficulty_curve=(1, 1, 2, 2, 3, 3, 4, 4, 5), rng=None):
+        self.category_policy = category_policy
+        self.difficulty_policy = difficulty_policy
+        self.target_policy = target_policy
+        self.difficulty_curve = tuple(difficulty_curve) or (1,)
+        self._rng = rng or random.Random()
+        self._pools = QuestionPools(store, self._rng)
+        self._store = store
+        self._schedules = {}
+        self._lock = threading.Lock()
+
+    def forget(self, game_id):
+        with self._lock:
+            self._schedules.pop(game_id, None)
+
+    def _target_team(self, schedule, teams, policy):
+        team_ids = list(teams)
+        if policy == 'rotate' and team_ids:
+            team_id = team_ids[schedule.team_index % len(team_ids)]
+            schedule.team_index += 1
+            return team_id
+        if policy == 'trailing' and team_ids:
+            return min(team_ids, key=lambda team_id: teams[team_id]['score'])
+        return 'both'
+
+    def _target_difficulty(self, teams, target_team, asked, policy):
+        if policy == 'any':
+            return DIFFICULTY_LEVELS[asked % len(DIFFICULTY_LEVELS)]
+        level = self.difficulty_curve[min(asked, len(self.difficulty_curve) - 1)]
+        answering = teams.values() if target_team == 'both' else [teams[target_team]]
+        correct = sum(team['correct_answers'] for team in answering)
+        answered = correct + sum(team['wrong_answers'] for team in answering)
+        if answered >= self.ADAPT_MIN_ANSWERS:
+            accuracy = correct / answered
+            if accuracy >= self.ADAPT_HIGH_ACCURACY:
+                level += 1
+            elif accuracy < self.ADAPT_LOW_ACCURACY:
+                level -= 1
+        return min(max(level, DIFFICULTY_LEVELS[0]), DIFFICULTY_LEVELS[-1])
+
+    def next_question(self, game, target_team=None, category_policy=None,
+                      difficulty_policy=None, target_policy=None):
+        """(pregunta, equipo destinatario) o (None, None) si no quedan preguntas
+
+        target_team fija el destinatario; las políticas sustituyen a las
+        configuradas solo en esta llamada. La pregunta queda marcada como
+        usada en este worker; set_current_question la registra en la partida.
+        """
+        category_policy = category_policy or self.category_policy
+        difficulty_policy = difficulty_policy or self.difficulty_policy
+        state = game.snapshot()
+        teams = state['teams']
+        version, pools, categories = self._pools.get()
+
+        with self._lock:
+            schedule = self._schedules.setdefault(game.game_id, GameSchedule())
+            schedule.sync(state.get('used_questions', ()), state.get('used_epoch', 0), version)
+
+            if target_team is None:
+                target_team = self._target_team(schedule, teams, target_policy or self.target_policy)
+            difficulty = self._target_difficulty(teams, target_team, schedule.used_count, difficulty_policy)
+
+            if not categories:
+                return None, None
+            start = (schedule.category_index if category_policy == 'round_robin'
+                     else self._rng.randrange(len(categories)))
+            for offset in range(len(categories)):
+                index = (start + offset) % len(categories)
+                for level in DIFFICULTY_ORDER[difficulty]:
+                    question = self._take(schedule, (categories[index], level), pools)
+                    if question is not None:
+                        schedule.category_index = index + 1
+                        return question, target_team
+        return None, None
+
+    def _take(self, schedule, key, pools):
+        pool = pools.get(key, ())
+        while True:
+            question_id = schedule.take(key, pool)
+            if question_id is None:
+                return None
+            schedule.mark_used(question_id)
+            question = self._store.get(question_id)
+            # None: baja posterior a la construcción de los pools
+            if question is not None:
+                return question
+
+def parse_difficulty_curve(value):
+    return tuple(int(level) for level in value.split(',') if level.strip())
+
+question_scheduler = QuestionScheduler(
+    question_store,
+    category_policy=Config.SCHEDULER_CATEGORY_POLICY,
+    difficulty_policy=Config.SCHEDULER_DIFFICULTY_POLICY,
+    target_policy=Config.SCHEDULER_TARGET_POLICY,
+    difficulty_curve=parse_difficulty_curve(Config.SCHEDULER_DIFFICULTY_CURVE)
+)
+game_registry.on_removed(question_scheduler.forget)
@@ -84,7 +84,8 @@ def verify_installation():
         tables = cursor.fetchall()
         expected_tables = [
             'categories', 'questions', 'question_options', 'teams',
-            'game_sessions', 'session_teams', 'question_responses'
+            'game_sessions', 'session_teams', 'question_responses',
+            'session_stats', 'session_questions'
         ]
         
         print("\n📋 Tablas creadas:")
@@ -0,0 +1,17 @@
+"""
+Estado compartido entre workers.
+
+La implementación es común a tablero y overlay-congregacion y vive en
+comun/state_backend.py (en la raíz del repositorio); este módulo solo la
+reexporta para que la aplicación se siga ejecutando desde su carpeta.
+"""
+
+import os
+import sys
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_ROOT not in sys.path:
+    sys.path.append(_REPO_ROOT)
+
+from comun.state_backend import (FrozenDict, freeze, thaw, MemoryStateBackend,  # noqa: E402
+                                 RedisStateBackend, create_state_backend, SharedState)
@@ -7,9 +7,8 @@ let gameStats = {
 
 // Inicialización cuando se carga la página
 document.addEventListener('DOMContentLoaded', function() {
-    // Unirse a las salas de display y scoreboard
-    socket.emit('join', { room: 'display' });
-    socket.emit('join', { room: 'scoreboard' });
+    // Unirse a las salas de display y scoreboard de la partida
+    joinGameRooms(['display', 'scoreboard']);
     
     // Obtener estado inicial del juego
     socket.emit('get_game_state');
@@ -17,19 +16,17 @@ document.addEventListener('DOMContentLoaded', function() {
 
 // Actualizar información de los equipos
 function updateTeamInfo(teams) {
-    if (!teams || !teams.team1 || !teams.team2) return;
-    
-    // Equipo 1 (Azul)
-    document.getElementById('team1-name').textContent = teams.team1.name;
-    document.getElementById('team1-score').textContent = teams.team1.score;
-    document.getElementById('team1-correct').textContent = teams.team1.correct_answers;
-    document.getElementById('team1-wrong').textContent = teams.team1.wrong_answers;
-    
-    // Equipo 2 (Rojo)  
-    document.getElementById('team2-name').textContent = teams.team2.name;
-    document.getElementById('team2-score').textContent = teams.team2.score;
-    document.getElementById('team2-correct').textContent = teams.team2.correct_answers;
-    document.getElementById('team2-wrong').textContent = teams.team2.wrong_answers;
+    if (!teams) return;
+    
+    Object.keys(teams).forEach(teamId => {
+        const team = teams[teamId];
+        const card = document.getElementById(`${teamId}-card`);
+        if (!card) return;
+        document.getElementById(`${teamId}-name`).textContent = team.name;
+        document.getElementById(`${teamId}-score`).textContent = team.score;
+        document.getElementById(`${teamId}-correct`).textContent = team.correct_answers;
+        document.getElementById(`${teamId}-wrong`).textContent = team.wrong_answers;
+    });
     
     // Actualizar estadísticas generales
     updateGeneralStats(teams);
@@ -37,13 +34,11 @@ function updateTeamInfo(teams) {
 
 // Actualizar estadísticas generales
 function updateGeneralStats(teams) {
-    const team1Correct = teams.team1.correct_answers;
-    const team1Wrong = teams.team1.wrong_answers;
-    const team2Correct = teams.team2.correct_answers;
-    const team2Wrong = teams.team2.wrong_answers;
+    const allTeams = Object.values(teams);
+    const totalCorrect = allTeams.reduce((sum, team) => sum + team.correct_answers, 0);
+    const totalWrong = allTeams.reduce((sum, team) => sum + team.wrong_answers, 0);
     
-    const totalQuestions = team1Correct + team1Wrong + team2Correct + team2Wrong;
-    const totalCorrect = team1Correct + team2Correct;
+    const totalQuestions = totalCorrect + totalWrong;
     const accuracyRate = totalQuestions > 0 ? Math.round((totalCorrect / totalQuestions) * 100) : 0;
     
     document.getElementById('total-questions').textContent = totalQuestions;
@@ -59,19 +54,9 @@ function updateCurrentQuestion(question, target_team = 'both') {
     const questionText = document.getElementById('current-question-text');
     
     if (question) {
-        let targetTeamText = '';
-        let targetTeamColor = '';
-        
-        if (target_team === 'team1') {
-            targetTeamText = '🔵 Para Equipo Azul';
-            targetTeamColor = 'text-blue-600';
-        } else if (target_team === 'team2') {
-            targetTeamText = '🔴 Para Equipo Rojo';
-            targetTeamColor = 'text-red-600';
-        } else {
-            targetTeamText = '👥 Para Ambos Equipos';
-            targetTeamColor = 'text-purple-600';
-        }
+        const target = targetTeamInfo(target_team);
+        const targetTeamText = target.text;
+        const targetTeamColor = `text-${target.color}-600`;
         
         questionText.innerHTML = `
             <div class="font-medium text-gray-800">${question.question}</div>
@@ -221,14 +206,13 @@ function createConfettiAt(x, y) {
 
 // Mostrar celebración global cuando un equipo alcanza hitos
 function checkMilestones(teams) {
-    const team1Score = teams.team1.score;
-    const team2Score = teams.team2.score;
+    const scores = Object.values(teams).map(team => team.score);
     
     // Hitos de puntuación (50, 100, 150, etc.)
     const milestones = [50, 100, 150, 200, 250];
     
     milestones.forEach(milestone => {
-        if (team1Score === milestone || team2Score === milestone) {
+        if (scores.includes(milestone)) {
             showGlobalCelebration();
         }
     });
@@ -294,24 +278,34 @@ function resetStats() {
 
 // Event listeners para WebSocket
 socket.on('new_question', function(data) {
-    updateCurrentQuestion(data.question, data.target_team);
+    applyStatePatch(data);
+    updateCurrentQuestion(data.changes.current_question, data.changes.target_team);
+});
+
+socket.on('show_correct_answer', function(data) {
+    applyStatePatch(data);
 });
 
 socket.on('team_answered', function(data) {
     addToAnswerHistory(data);
-    updateTeamInfo(data.teams);
-    animateScoreUpdate(data.team_id, data.points);
-    checkMilestones(data.teams);
+    if (applyStatePatch(data)) {
+        updateTeamInfo(syncedState.teams);
+        animateScoreUpdate(data.team_id, data.points);
+        checkMilestones(syncedState.teams);
+    }
 });
 
 socket.on('score_updated', function(data) {
-    updateTeamInfo(data.teams);
-    animateScoreUpdate(data.updated_team, data.points_added);
-    checkMilestones(data.teams);
+    if (applyStatePatch(data)) {
+        updateTeamInfo(syncedState.teams);
+        animateScoreUpdate(data.updated_team, data.points_added);
+        checkMilestones(syncedState.teams);
+    }
 });
 
 socket.on('game_reset', function(data) {
-    updateTeamInfo(data.teams);
+    applyStatePatch(data);
+    updateTeamInfo(syncedState.teams);
     updateCurrentQuestion(null);
     resetStats();
     showNotification('Juego reiniciado', 'success');
@@ -2,6 +2,13 @@
 let currentQuestions = [];
 let selectedQuestionType = null;
 let selectedTargetTeam = 'both'; // Por defecto ambos equipos
+
+// Búsqueda incremental: se espera una pausa al escribir y se cancela la
+// petición anterior para que una respuesta vieja no pise a la nueva
+const SEARCH_DEBOUNCE_MS = 250;
+let searchTimer = null;
+let searchController = null;
+let nextAfter = null;
 let gameState = {
     current_question: null,
     teams: {},
@@ -11,16 +18,20 @@ let gameState = {
 
 // Inicialización cuando se carga la página
 document.addEventListener('DOMContentLoaded', function() {
-    // Unirse a la sala del moderador
-    socket.emit('join', { room: 'moderator' });
+    // Unirse a la sala del moderador de la partida
+    joinGameRooms(['moderator']);
     
     // Obtener estado inicial del juego
     loadGameState();
+
+    // Filtros y primera página de preguntas
+    loadCategories();
+    searchQuestions();
 });
 
 // Cargar estado actual del juego
 function loadGameState() {
-    fetch('/api/game_state')
+    fetch(`/api/game_state?game=${encodeURIComponent(GAME_ID)}`)
         .then(response => response.json())
         .then(data => {
             gameState = data;
@@ -37,14 +48,8 @@ function updateGameStatusDisplay() {
     // Actualizar pregunta actual
     const currentQuestionDisplay = document.getElementById('current-question-display');
     if (gameState.current_question) {
-        let targetText = '';
-        if (gameState.target_team === 'team1') {
-            targetText = '<span class="text-blue-600">🔵 Para Equipo Azul</span>';
-        } else if (gameState.target_team === 'team2') {
-            targetText = '<span class="text-red-600">🔴 Para Equipo Rojo</span>';
-        } else {
-            targetText = '<span class="text-purple-600">👥 Para Ambos Equipos</span>';
-        }
+        const target = targetTeamInfo(gameState.target_team);
+        const targetText = `<span class="text-${target.color}-600">${target.text}</span>`;
         
         currentQuestionDisplay.innerHTML = `
             <strong>Pregunta Activa:</strong><br>
@@ -57,50 +62,100 @@ function updateGameStatusDisplay() {
     }
     
     // Actualizar puntuaciones
-    if (gameState.teams && gameState.teams.team1 && gameState.teams.team2) {
-        document.getElementById('team1-score').textContent = gameState.teams.team1.score;
-        document.getElementById('team2-score').textContent = gameState.teams.team2.score;
-    }
+    Object.keys(gameState.teams || {}).forEach(teamId => {
+        const scoreElement = document.getElementById(`${teamId}-score`);
+        if (scoreElement) {
+            scoreElement.textContent = gameState.teams[teamId].score;
+        }
+    });
 }
 
-// Seleccionar tipo de pregunta
+// Seleccionar tipo de pregunta (pulsar de nuevo el mismo tipo quita el filtro)
 function selectQuestionType(type) {
-    selectedQuestionType = type;
+    selectedQuestionType = selectedQuestionType === type ? null : type;
     
     // Actualizar botones de tipo
-    document.querySelectorAll('[id^="btn-"]').forEach(btn => {
+    document.querySelectorAll('#btn-cierto-falso, #btn-opcion-multiple').forEach(btn => {
         btn.classList.remove('ring-4', 'ring-blue-300');
     });
     
-    const selectedBtn = document.getElementById(`btn-${type.replace('_', '-')}`);
-    selectedBtn.classList.add('ring-4', 'ring-blue-300');
-    
-    // Cargar preguntas del tipo seleccionado
-    loadQuestions(type);
+    if (selectedQuestionType) {
+        const selectedBtn = document.getElementById(`btn-${type.replace('_', '-')}`);
+        selectedBtn.classList.add('ring-4', 'ring-blue-300');
+    }
     
-    showNotification(`Tipo seleccionado: ${type === 'cierto_falso' ? 'Cierto/Falso' : 'Opción Múltiple'}`, 'success');
+    // Buscar preguntas del tipo seleccionado
+    searchQuestions();
 }
 
-// Cargar preguntas por tipo
-function loadQuestions(type) {
-    fetch(`/api/questions/${type}`)
+// Cargar las categorías del filtro
+function loadCategories() {
+    fetch('/api/questions/categories')
         .then(response => response.json())
-        .then(questions => {
-            currentQuestions = questions;
-            displayQuestions(questions);
+        .then(categories => {
+            const select = document.getElementById('search-category');
+            categories.forEach(category => select.add(new Option(category, category)));
+        })
+        .catch(error => console.error('Error loading categories:', error));
+}
+
+// Parámetros de búsqueda según los filtros actuales
+function searchParams(after) {
+    const params = new URLSearchParams({ game: GAME_ID });
+    const text = document.getElementById('question-search').value.trim();
+    const category = document.getElementById('search-category').value;
+    const difficulty = document.getElementById('search-difficulty').value;
+    if (text) params.set('q', text);
+    if (selectedQuestionType) params.set('type', selectedQuestionType);
+    if (category) params.set('category', category);
+    if (difficulty) params.set('difficulty', difficulty);
+    if (document.getElementById('search-unused').checked) params.set('unused', '1');
+    if (after !== null) params.set('after', after);
+    return params;
+}
+
+function scheduleSearch() {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => searchQuestions(), SEARCH_DEBOUNCE_MS);
+}
+
+// Buscar preguntas; con after se añade la página siguiente a la lista
+function searchQuestions(after = null) {
+    clearTimeout(searchTimer);
+    if (searchController) {
+        searchController.abort();
+    }
+    searchController = new AbortController();
+
+    fetch(`/api/questions/search?${searchParams(after)}`, { signal: searchController.signal })
+        .then(response => response.json())
+        .then(data => {
+            currentQuestions = after === null ? data.items : currentQuestions.concat(data.items);
+            nextAfter = data.next_after;
+            displayQuestions(currentQuestions);
         })
         .catch(error => {
-            console.error('Error loading questions:', error);
+            if (error.name === 'AbortError') {
+                return;
+            }
+            console.error('Error searching questions:', error);
             showNotification('Error al cargar preguntas', 'error');
         });
 }
 
+function loadMoreQuestions() {
+    if (nextAfter !== null) {
+        searchQuestions(nextAfter);
+    }
+}
+
 // Mostrar lista de preguntas
 function displayQuestions(questions) {
     const questionsList = document.getElementById('questions-list');
+    document.getElementById('btn-load-more').classList.toggle('hidden', nextAfter === null);
     
     if (questions.length === 0) {
-        questionsList.innerHTML = '<p class="text-gray-500 text-sm">No hay preguntas de este tipo</p>';
+        questionsList.innerHTML = '<p class="text-gray-500 text-sm">No hay preguntas que coincidan con la búsqueda</p>';
         return;
     }
     
@@ -124,33 +179,16 @@ function selectTargetTeam(teamTarget) {
         btn.classList.remove('ring-4', 'ring-blue-300', 'ring-red-300', 'ring-purple-300');
     });
     
+    const target = targetTeamInfo(teamTarget);
     const selectedBtn = document.getElementById(`btn-target-${teamTarget}`);
-    if (teamTarget === 'team1') {
-        selectedBtn.classList.add('ring-4', 'ring-blue-300');
-    } else if (teamTarget === 'team2') {
-        selectedBtn.classList.add('ring-4', 'ring-red-300');
-    } else {
-        selectedBtn.classList.add('ring-4', 'ring-purple-300');
-    }
+    selectedBtn.classList.add('ring-4', `ring-${target.color}-300`);
     
     // Actualizar información del equipo objetivo
     const targetInfo = document.getElementById('target-team-info');
-    if (teamTarget === 'team1') {
-        targetInfo.textContent = 'Pregunta dirigida al Equipo Azul 🔵';
-        targetInfo.className = 'mt-3 text-center text-sm text-blue-600 font-medium';
-    } else if (teamTarget === 'team2') {
-        targetInfo.textContent = 'Pregunta dirigida al Equipo Rojo 🔴';
-        targetInfo.className = 'mt-3 text-center text-sm text-red-600 font-medium';
-    } else {
-        targetInfo.textContent = 'Pregunta para ambos equipos 👥';
-        targetInfo.className = 'mt-3 text-center text-sm text-purple-600 font-medium';
-    }
+    targetInfo.textContent = teamTarget === 'both' ? `Pregunta para ${target.name.toLowerCase()} 👥` : `Pregunta dirigida a ${target.name}`;
+    targetInfo.className = `mt-3 text-center text-sm text-${target.color}-600 font-medium`;
     
-    showNotification(`Equipo seleccionado: ${
-        teamTarget === 'team1' ? 'Equipo Azul' : 
-        teamTarget === 'team2' ? 'Equipo Rojo' : 
-        'Ambos Equipos'
-    }`, 'success');
+    showNotification(`Equipo seleccionado: ${target.name}`, 'success');
 }
 
 // Seleccionar pregunta específica
@@ -161,9 +199,7 @@ function selectQuestion(questionId) {
         return;
     }
     
-    const targetText = selectedTargetTeam === 'team1' ? 'Equipo Azul' : 
-                      selectedTargetTeam === 'team2' ? 'Equipo Rojo' : 
-                      'Ambos Equipos';
+    const targetText = targetTeamInfo(selectedTargetTeam).name;
     
     // Confirmar envío
     if (confirm(`¿Enviar esta pregunta al tablero?\n\n"${question.question}"\n\nDirigida a: ${targetText}`)) {
@@ -179,6 +215,17 @@ function sendQuestion(questionId) {
     });
 }
 
+// Enviar la pregunta que elige el planificador del servidor (sin repetir,
+// rotando categorías y ajustando la dificultad). Con un equipo seleccionado
+// la pregunta va dirigida a él; si no, decide la política del servidor.
+function nextQuestion() {
+    const data = {};
+    if (selectedTargetTeam !== 'both') {
+        data.target_team = selectedTargetTeam;
+    }
+    socket.emit('next_question', data);
+}
+
 // Mostrar respuesta correcta
 function showAnswer() {
     if (!gameState.current_question) {
@@ -207,9 +254,7 @@ function resetGame() {
 // Event listeners para WebSocket
 socket.on('question_sent', function(data) {
     if (data.status === 'success') {
-        const targetText = data.target_team === 'team1' ? 'Equipo Azul' : 
-                          data.target_team === 'team2' ? 'Equipo Rojo' : 
-                          'Ambos Equipos';
+        const targetText = targetTeamInfo(data.target_team).name;
         showNotification(`Pregunta enviada al tablero para ${targetText}`, 'success');
         gameState.current_question = data.question;
         gameState.target_team = data.target_team;
@@ -217,6 +262,12 @@ socket.on('question_sent', function(data) {
         gameState.show_answer = false;
         updateGameStatusDisplay();
         
+        // La pregunta enviada deja de aparecer entre las no usadas
+        if (document.getElementById('search-unused').checked) {
+            searchQuestions();
+            return;
+        }
+        
         // Resaltar pregunta actual en la lista
         document.querySelectorAll('#questions-list button').forEach(btn => {
             btn.classList.remove('bg-blue-100', 'border-blue-300');
@@ -261,10 +312,13 @@ socket.on('reset_confirmed', function(data) {
         loadGameState(); // Recargar estado completo
         showNotification('Juego reiniciado', 'success');
         
-        // Limpiar selecciones
+        // Limpiar selecciones (al reiniciar todas las preguntas vuelven a estar sin usar)
         document.querySelectorAll('#questions-list button').forEach(btn => {
             btn.classList.remove('bg-blue-100', 'border-blue-300');
         });
+        if (document.getElementById('search-unused').checked) {
+            searchQuestions();
+        }
     } else {
         showNotification('Error al reiniciar juego', 'error');
     }
@@ -295,6 +349,4 @@ socket.on('disconnect', function() {
 
 socket.on('connect', function() {
     showNotification('Conectado al servidor', 'success');
-    // Reunirse a la sala después de reconectar
-    socket.emit('join', { room: 'moderator' });
 });
\ No newline at end of file
@@ -9,12 +9,16 @@ let hasAnswered = false;
 
 // Inicialización cuando se carga la página
 document.addEventListener('DOMContentLoaded', function() {
-    // Unirse a la sala de display para recibir actualizaciones
-    socket.emit('join', { room: 'display' });
+    // Unirse a la sala de display de la partida para recibir actualizaciones
+    joinGameRooms(['display']);
     
     // Obtener estado inicial del juego
     socket.emit('get_game_state');
     
+    // Sincronizar el reloj con el servidor para medir el tiempo de respuesta
+    socket.emit('clock_sync');
+    setInterval(() => socket.emit('clock_sync'), 30000);
+    
     // Mostrar estado de conexión
     showConnectionStatus();
 });
@@ -65,7 +69,7 @@ function updateQuestionStatus(question, target_team, game_active) {
         eligibilityDiv.classList.remove('hidden');
         showQuestion(question);
     } else {
-        const otherTeamName = target_team === 'team1' ? 'Equipo Azul' : 'Equipo Rojo';
+        const otherTeamName = targetTeamInfo(target_team).name;
         eligibilityDiv.innerHTML = `
             <div class="text-orange-700 bg-orange-100 border border-orange-300">
                 ⏸️ Esta pregunta es para ${otherTeamName}
@@ -156,8 +160,15 @@ function cancelAnswer() {
     document.getElementById('answer-options').classList.remove('hidden');
 }
 
+// Reloj local en segundos con resolución sub-milisegundo
+function clientNow() {
+    return (performance.timeOrigin + performance.now()) / 1000;
+}
+
 // Enviar respuesta
 function submitAnswer() {
+    const answeredAt = clientNow();
+    
     if (!selectedAnswer) {
         showNotification('No hay respuesta seleccionada', 'error');
         return;
@@ -174,7 +185,8 @@ function submitAnswer() {
     // Enviar respuesta al servidor
     socket.emit('team_answer', {
         team_id: TEAM_ID,
-        answer: selectedAnswer
+        answer: selectedAnswer,
+        client_ts: answeredAt
     });
     
     // Ocultar sección de respuestas
@@ -209,6 +221,7 @@ function showAnswerResult(data) {
         <p class="text-2xl font-bold">
             ${points > 0 ? '+' : ''}${points} puntos
         </p>
+        <p class="text-sm mt-2">Tiempo de respuesta: ${(data.response_time_ms / 1000).toFixed(2)} s</p>
     `;
     
     resultSection.classList.remove('hidden');
@@ -301,19 +314,29 @@ function createConfetti() {
 
 // Event listeners para WebSocket
 socket.on('new_question', function(data) {
-    currentQuestion = data.question;
-    targetTeam = data.target_team;
-    gameActive = data.game_active;
-    showAnswer = data.show_answer;
+    applyStatePatch(data);
+    currentQuestion = data.changes.current_question;
+    targetTeam = data.changes.target_team;
+    gameActive = data.changes.game_active;
+    showAnswer = data.changes.show_answer;
     
-    updateQuestionStatus(data.question, data.target_team, data.game_active);
+    updateQuestionStatus(currentQuestion, targetTeam, gameActive);
 });
 
 socket.on('show_correct_answer', function(data) {
+    applyStatePatch(data);
     showAnswer = true;
     showCorrectAnswer(data.correct_answer);
 });
 
+socket.on('clock_ping', function() {
+    socket.emit('clock_pong', { client_ts: clientNow() });
+});
+
+socket.on('connect', function() {
+    socket.emit('clock_sync');
+});
+
 socket.on('answer_result', function(data) {
     if (data.status === 'success') {
         showAnswerResult(data);
@@ -328,7 +351,16 @@ socket.on('answer_result', function(data) {
     }
 });
 
+socket.on('team_answered', function(data) {
+    applyStatePatch(data);
+});
+
+socket.on('score_updated', function(data) {
+    applyStatePatch(data);
+});
+
 socket.on('game_reset', function(data) {
+    applyStatePatch(data);
     // Reiniciar todo
     currentQuestion = null;
     targetTeam = 'both';
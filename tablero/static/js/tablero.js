@@ -6,8 +6,8 @@ let showAnswer = false;
 
 // Inicialización cuando se carga la página
 document.addEventListener('DOMContentLoaded', function() {
-    // Unirse a la sala de display
-    socket.emit('join', { room: 'display' });
+    // Unirse a la sala de display de la partida
+    joinGameRooms(['display']);
     
     // Obtener estado inicial del juego
     socket.emit('get_game_state');
@@ -33,19 +33,10 @@ function displayQuestion(question, target_team = 'both') {
     
     // Mostrar indicador de equipo objetivo
     const targetIndicator = document.getElementById('target-team-indicator');
-    if (target_team === 'team1') {
-        targetIndicator.textContent = '🔵 Para Equipo Azul';
-        targetIndicator.className = 'text-sm font-medium text-blue-600 bg-blue-100 px-3 py-1 rounded-full inline-block mb-4';
-        targetIndicator.classList.remove('hidden');
-    } else if (target_team === 'team2') {
-        targetIndicator.textContent = '🔴 Para Equipo Rojo';
-        targetIndicator.className = 'text-sm font-medium text-red-600 bg-red-100 px-3 py-1 rounded-full inline-block mb-4';
-        targetIndicator.classList.remove('hidden');
-    } else {
-        targetIndicator.textContent = '👥 Para Ambos Equipos';
-        targetIndicator.className = 'text-sm font-medium text-purple-600 bg-purple-100 px-3 py-1 rounded-full inline-block mb-4';
-        targetIndicator.classList.remove('hidden');
-    }
+    const target = targetTeamInfo(target_team);
+    targetIndicator.textContent = target.text;
+    targetIndicator.className = `text-sm font-medium text-${target.color}-600 bg-${target.color}-100 px-3 py-1 rounded-full inline-block mb-4`;
+    targetIndicator.classList.remove('hidden');
     
     // Crear opciones de respuesta
     createAnswerOptions(question);
@@ -189,24 +180,29 @@ function returnToWaitingState() {
 
 // Event listeners para WebSocket
 socket.on('new_question', function(data) {
-    gameActive = data.game_active;
-    showAnswer = data.show_answer;
-    displayQuestion(data.question, data.target_team);
+    applyStatePatch(data);
+    gameActive = data.changes.game_active;
+    showAnswer = data.changes.show_answer;
+    displayQuestion(data.changes.current_question, data.changes.target_team);
 });
 
 socket.on('show_correct_answer', function(data) {
+    applyStatePatch(data);
     displayCorrectAnswer(data.correct_answer);
 });
 
 socket.on('team_answered', function(data) {
+    applyStatePatch(data);
     displayTeamResult(data);
 });
 
 socket.on('score_updated', function(data) {
     // Las actualizaciones de puntuación se muestran en el marcador
+    applyStatePatch(data);
 });
 
 socket.on('game_reset', function(data) {
+    applyStatePatch(data);
     returnToWaitingState();
     showNotification('Juego reiniciado', 'success');
 });
@@ -0,0 +1,17 @@
+import os
+import sys
+import pytest
+
+# Las pruebas usan el banco de preguntas en memoria y el estado en memoria,
+# sin PostgreSQL ni Redis (antes de que config.py lea el .env)
+os.environ['USE_DATABASE'] = 'False'
+os.environ['STATE_BACKEND_URL'] = 'memory://'
+os.environ['SOCKETIO_MESSAGE_QUEUE'] = ''
+os.environ['OVERLAY_MESSAGE_QUEUE'] = ''
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def client():
+    from app import app
+    return app.test_client()
@@ -0,0 +1,49 @@
+from alert_queue import AlertQueue
+
+def make_queue(**options):
+    return AlertQueue(lambda alert: None, **options)
+
+def next_alert(queue):
+    with queue._cond:
+        return queue._next(0.0)
+
+def test_pending_alerts_of_a_known_kind_merge():
+    queue = make_queue()
+    for user in ('ana', 'bo', 'carla', 'dani', 'eva'):
+        queue.submit({'kind': 'follow', 'user': user})
+    alert = next_alert(queue)
+    assert alert['count'] == 5
+    assert alert['title'] == '¡5 nuevos seguidores!'
+    assert alert['message'] == 'ana, bo, carla y 2 más'
+    assert queue.get_stats()['merged'] == 4
+    assert next_alert(queue) is None
+
+def test_merged_donations_add_up_the_amount():
+    queue = make_queue()
+    queue.submit({'kind': 'donation', 'user': 'ana', 'amount': 5})
+    queue.submit({'kind': 'donation', 'user': 'bo', 'amount': 2.5})
+    assert next_alert(queue)['message'] == 'ana, bo · 7.50 en total'
+
+def test_higher_priority_alerts_are_shown_first():
+    queue = make_queue()
+    queue.submit({'kind': 'follow', 'user': 'ana'})
+    queue.submit({'kind': 'raid', 'user': 'bo'})
+    queue.submit({'title': 'Aviso', 'priority': 35})
+    assert [next_alert(queue)['kind'] for _ in range(3)] == ['raid', None, 'follow']
+
+def test_budget_drops_the_lowest_priority_alerts():
+    queue = make_queue(min_duration=2000, budget=4, max_pending=10)
+    queue.submit({'kind': 'raid', 'user': 'ana'})
+    queue.submit({'title': 'baja', 'priority': 1})
+    queue.submit({'kind': 'donation', 'user': 'bo', 'amount': 1})
+    # 3 alertas a 2 s superan los 4 s de presupuesto: sale la de menor prioridad
+    stats = queue.get_stats()
+    assert stats['pending'] == 2
+    assert stats['dropped_budget'] == 1
+    assert [next_alert(queue)['kind'] for _ in range(2)] == ['raid', 'donation']
+
+def test_max_pending_caps_the_queue():
+    queue = make_queue(budget=1000, max_pending=2)
+    for priority in (10, 30, 20):
+        queue.submit({'title': f'p{priority}', 'priority': priority})
+    assert [next_alert(queue)['title'] for _ in range(2)] == ['p30', 'p20']
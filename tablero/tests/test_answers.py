@@ -0,0 +1,61 @@
+import pytest
+from config import Config
+from models import (AnswerRejected, GameState, PRIVATE_FIELDS, initial_game_state, question_store,
+                    set_current_question, submit_team_answer)
+from state_backend import MemoryStateBackend
+
+@pytest.fixture
+def game():
+    return GameState(MemoryStateBackend(), 'test', initial_game_state())
+
+@pytest.fixture
+def question(game):
+    question = next(q for q in question_store.all() if q['type'] == 'opcion_multiple')
+    set_current_question(game, question)
+    return question
+
+@pytest.fixture
+def first_correct(monkeypatch):
+    monkeypatch.setattr(Config, 'ANSWER_ARBITRATION', 'first_correct')
+
+def sent_at(game):
+    return game.snapshot()['question_sent_at']
+
+def test_faster_correct_answer_displaces_the_winner(game, question, first_correct):
+    start = sent_at(game)
+    submit_team_answer(game, 'team1', question['correct_answer'], start + 2.0)
+    # team2 respondió antes (answered_at) aunque su respuesta llegó después
+    patch, result = submit_team_answer(game, 'team2', question['correct_answer'], start + 2.1,
+                                       answered_at=start + 1.9, one_way=0.1)
+    assert result['displaced_team'] == 'team1'
+    assert result['displaced_points'] == 10
+    teams = game.teams
+    assert (teams['team1']['score'], teams['team1']['correct_answers']) == (0, 0)
+    assert (teams['team2']['score'], teams['team2']['correct_answers']) == (10, 1)
+    assert patch['changes']['teams']['team1'] == {'score': 0, 'correct_answers': 0}
+    # El arbitraje es interno: no sale en el parche
+    assert not PRIVATE_FIELDS & set(patch['changes'])
+
+def test_slower_answer_after_the_winner_is_rejected(game, question, first_correct):
+    start = sent_at(game)
+    submit_team_answer(game, 'team1', question['correct_answer'], start + 1.0)
+    with pytest.raises(AnswerRejected):
+        submit_team_answer(game, 'team2', question['correct_answer'], start + 2.0)
+    assert game.teams['team1']['score'] == 10
+    assert game.teams['team2']['score'] == 0
+
+def test_faster_wrong_answer_does_not_displace(game, question, first_correct):
+    start = sent_at(game)
+    submit_team_answer(game, 'team1', question['correct_answer'], start + 2.0)
+    _, result = submit_team_answer(game, 'team2', 'respuesta incorrecta', start + 2.1,
+                                   answered_at=start + 1.9, one_way=0.1)
+    assert result['displaced_team'] is None
+    assert result['displaced_points'] == 0
+    assert game.teams['team1']['score'] == 10
+    assert game.teams['team2']['score'] == -5
+
+def test_public_snapshot_hides_private_fields(game, question):
+    snapshot = game.public_snapshot()
+    assert not PRIVATE_FIELDS & set(snapshot)
+    assert snapshot['current_question']['id'] == question['id']
+    assert snapshot['version'] == game.version
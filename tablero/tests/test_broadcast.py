@@ -0,0 +1,55 @@
+from websocket_events import BroadcastScheduler, merge_patch_changes
+
+def score_patch(version, team_id, score, points):
+    return {'version': version, 'changes': {'teams': {team_id: {'score': score, 'correct_answers': 1}}},
+            'updated_team': team_id, 'points_added': points}
+
+def test_consecutive_score_updates_of_a_team_merge_with_base_version():
+    events = []
+    BroadcastScheduler._coalesce(events, 'score_updated', score_patch(5, 'team1', 10, 10))
+    BroadcastScheduler._coalesce(events, 'score_updated', score_patch(6, 'team1', 15, 5))
+    assert len(events) == 1
+    event, payload = events[0]
+    assert event == 'score_updated'
+    assert payload['base_version'] == 4
+    assert payload['version'] == 6
+    assert payload['points_added'] == 15
+    assert payload['changes']['teams']['team1']['score'] == 15
+
+def test_score_updates_are_not_merged_across_teams_or_version_gaps():
+    events = []
+    BroadcastScheduler._coalesce(events, 'score_updated', score_patch(5, 'team1', 10, 10))
+    BroadcastScheduler._coalesce(events, 'score_updated', score_patch(6, 'team2', 10, 10))
+    # Falta la versión 7 (otro evento): no puede fundirse con la 6
+    BroadcastScheduler._coalesce(events, 'score_updated', score_patch(8, 'team2', 20, 10))
+    assert [payload['version'] for _, payload in events] == [5, 6, 8]
+    assert all('base_version' not in payload for _, payload in events)
+
+def test_other_events_are_kept_in_order():
+    events = []
+    BroadcastScheduler._coalesce(events, 'team_answered', {'version': 3, 'changes': {}})
+    BroadcastScheduler._coalesce(events, 'score_updated', score_patch(4, 'team1', 10, 10))
+    assert [event for event, _ in events] == ['team_answered', 'score_updated']
+
+def test_merge_patch_changes_merges_teams_field_by_field():
+    merged = merge_patch_changes({'teams': {'team1': {'score': 10, 'correct_answers': 1}}},
+                                 {'teams': {'team1': {'score': 5, 'wrong_answers': 1}}, 'show_answer': True})
+    assert merged == {'teams': {'team1': {'score': 5, 'correct_answers': 1, 'wrong_answers': 1}},
+                      'show_answer': True}
+
+def test_leaving_one_display_room_keeps_the_other():
+    broadcaster = BroadcastScheduler(None)
+    broadcaster.add_display('sid1', 'default', 'display:default')
+    broadcaster.add_display('sid1', 'default', 'scoreboard:default')
+    broadcaster.remove_display('sid1', 'display:default')
+    assert broadcaster._displays == {'sid1': 'default'}
+    broadcaster.remove_display('sid1', 'scoreboard:default')
+    assert broadcaster._displays == {}
+
+def test_disconnect_removes_the_display_from_every_room():
+    broadcaster = BroadcastScheduler(None)
+    broadcaster.add_display('sid1', 'default', 'display:default')
+    broadcaster.add_display('sid1', 'default', 'scoreboard:default')
+    broadcaster.remove_display('sid1')
+    assert broadcaster._displays == {}
+    assert broadcaster._in_flight == {}
@@ -0,0 +1,35 @@
+from chat_pipeline import ChatPipeline
+
+def make_pipeline(**options):
+    published = []
+    options = dict({'max_rate': 1000, 'flush_interval': 0.1, 'author_rate': 0.001}, **options)
+    return ChatPipeline(published.extend, **options), published
+
+def test_duplicates_by_text_and_by_id_are_dropped():
+    pipeline, published = make_pipeline()
+    assert pipeline.submit({'user': 'ana', 'text': 'hola', 'id': 1}) is None
+    assert pipeline.submit({'user': 'ANA', 'text': '  Hola '}) == 'duplicate'
+    assert pipeline.submit({'user': 'bo', 'text': 'otro texto', 'id': 1}) == 'duplicate'
+    pipeline.flush()
+    assert [message['text'] for message in published] == ['hola']
+
+def test_invalid_messages_are_dropped():
+    pipeline, _ = make_pipeline()
+    assert pipeline.submit({'user': 'ana', 'text': '   '}) == 'invalid'
+    assert pipeline.submit('hola') == 'invalid'
+
+def test_author_rate_limit_allows_only_the_burst():
+    pipeline, _ = make_pipeline(author_burst=3)
+    reasons = [pipeline.submit({'user': 'ana', 'text': f'mensaje {i}'}) for i in range(5)]
+    assert reasons == [None, None, None, 'rate_limited', 'rate_limited']
+    assert pipeline.submit({'user': 'bo', 'text': 'mensaje 0'}) is None
+
+def test_flush_samples_across_the_cycle_when_over_budget():
+    pipeline, published = make_pipeline(max_rate=20, author_burst=1)
+    for i in range(10):
+        pipeline.submit({'user': f'user{i}', 'text': f'mensaje {i}'})
+    sent = pipeline.flush()
+    # 20 mensajes/s en ciclos de 0.1 s: 2 por ciclo, repartidos por todo el ciclo
+    assert [message['text'] for message in sent] == ['mensaje 2', 'mensaje 7']
+    assert pipeline.get_stats()['dropped_overload'] == 8
+    assert pipeline.recent() == published == sent
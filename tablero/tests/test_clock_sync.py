@@ -0,0 +1,20 @@
+import pytest
+from clock_sync import estimate_response_time
+
+def test_without_client_timestamp_the_network_delay_is_discounted():
+    assert estimate_response_time(0.0, 10.0, None, 0.1) == pytest.approx(9.8)
+
+def test_honest_client_timestamp_is_used():
+    assert estimate_response_time(0.0, 10.0, 9.85, 0.1) == pytest.approx(9.75)
+
+def test_early_client_timestamp_gains_at_most_one_rtt():
+    honest = estimate_response_time(0.0, 10.0, None, 0.1)
+    lying = estimate_response_time(0.0, 10.0, 0.0, 0.1)
+    assert lying == pytest.approx(9.7)
+    assert honest - lying == pytest.approx(0.1)
+
+def test_client_timestamp_after_arrival_is_capped():
+    assert estimate_response_time(0.0, 10.0, 12.0, 0.1) == pytest.approx(9.9)
+
+def test_response_time_is_never_negative():
+    assert estimate_response_time(0.0, 0.1, None, 0.1) == 0.0
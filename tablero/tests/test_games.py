@@ -0,0 +1,80 @@
+from models import GameRegistry
+from state_backend import MemoryStateBackend
+
+def two_workers():
+    # Dos workers: cada uno con su registro y su caché, mismo backend compartido
+    backend = MemoryStateBackend()
+    return GameRegistry(backend), GameRegistry(backend)
+
+def test_ending_a_game_frees_local_state_on_every_worker():
+    first, second = two_workers()
+    freed = []
+    second.on_removed(freed.append)
+    first.create('Partida', game_id='final')
+    assert second.get('final') is not None
+
+    first.remove('final')
+    assert freed == []  # el otro worker aún no ha consultado el índice
+    assert second.get('final') is None
+    assert freed == ['final']
+    assert 'final' not in second._games
+
+def test_recreated_game_replaces_the_stale_cached_state():
+    first, second = two_workers()
+    freed = []
+    second.on_removed(freed.append)
+    first.create('Partida', game_id='final')
+    old = second.get('final')
+
+    first.remove('final')
+    first.create('Revancha', game_id='final')
+    # El otro worker no llegó a ver la partida fuera del índice
+    assert second.get('final') is not old
+    assert freed == ['final']
+
+def test_unrelated_games_are_kept():
+    first, second = two_workers()
+    freed = []
+    second.on_removed(freed.append)
+    first.create(game_id='uno')
+    first.create(game_id='dos')
+    kept = second.get('dos')
+    second.get('uno')
+
+    first.remove('uno')
+    assert second.get('dos') is kept
+    assert freed == ['uno']
+    assert [game['id'] for game in second.list()] == ['dos']
+
+def test_a_failing_callback_does_not_block_the_rest():
+    registry = GameRegistry(MemoryStateBackend())
+    freed = []
+    registry.on_removed(lambda game_id: 1 / 0)
+    registry.on_removed(freed.append)
+    registry.create(game_id='final')
+    assert registry.remove('final') is not None
+    assert freed == ['final']
+
+def test_broadcasts_stay_in_their_game_rooms():
+    from app import app, socketio
+    from models import game_registry, question_store
+    for game_id in ('liga', 'copa'):
+        game_registry.create(game_id=game_id)
+    liga, copa = socketio.test_client(app), socketio.test_client(app)
+    moderator = socketio.test_client(app)
+    try:
+        liga.emit('join', {'room': 'display', 'game': 'liga'})
+        copa.emit('join', {'room': 'scoreboard', 'game': 'copa'})
+        moderator.emit('join', {'room': 'moderator', 'game': 'liga'})
+        liga.get_received()
+        copa.get_received()
+
+        moderator.emit('send_question', {'question_id': question_store.all()[0]['id']})
+        assert [message['name'] for message in liga.get_received()] == ['new_question']
+        assert copa.get_received() == []
+        assert game_registry.get('copa').current_question is None
+    finally:
+        for client in (liga, copa, moderator):
+            client.disconnect()
+        for game_id in ('liga', 'copa'):
+            game_registry.remove(game_id)
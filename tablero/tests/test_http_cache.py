@@ -0,0 +1,45 @@
+import gzip
+import json
+from config import Config
+from models import game_registry, update_team_score
+
+def test_game_state_revalidates_with_304_until_the_version_changes(client):
+    game = game_registry.create(game_id='cache')
+    try:
+        first = client.get('/api/game_state?game=cache')
+        etag = first.headers['ETag']
+        assert first.headers['Cache-Control'] == 'no-cache'
+
+        cached = client.get('/api/game_state?game=cache', headers={'If-None-Match': etag})
+        assert cached.status_code == 304
+        assert cached.data == b''
+
+        update_team_score(game, 'team1', 10)
+        changed = client.get('/api/game_state?game=cache', headers={'If-None-Match': etag})
+        assert changed.status_code == 200
+        assert changed.headers['ETag'] != etag
+    finally:
+        game_registry.remove('cache')
+
+def test_large_json_is_gzipped_when_accepted(client):
+    plain = client.get('/api/questions/opcion_multiple')
+    assert len(plain.data) >= Config.COMPRESS_MIN_SIZE
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    compressed = client.get('/api/questions/opcion_multiple', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(compressed.data)) == plain.get_json()
+
+def test_hashed_assets_are_immutable_and_old_hashes_are_not(client):
+    from app import app
+    with app.test_request_context():
+        url = app.jinja_env.globals['asset_url']('js/tablero.js')
+    response = client.get(url)
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['Cache-Control']
+    assert client.get(url, headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+    stale = client.get('/assets/js/tablero.000000000000.js')
+    assert stale.status_code == 200
+    assert stale.headers['Cache-Control'] == 'no-cache'
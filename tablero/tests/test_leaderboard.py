@@ -0,0 +1,11 @@
+def test_leaderboard_limit_is_clamped(client):
+    teams = client.get('/api/leaderboard').get_json()
+    assert len(teams) == 2
+    assert len(client.get('/api/leaderboard?limit=-1').get_json()) == 1
+    assert len(client.get('/api/leaderboard?limit=0').get_json()) == 1
+    assert len(client.get('/api/leaderboard?limit=100000').get_json()) == 2
+
+def test_leaderboard_rejects_a_non_integer_limit(client):
+    response = client.get('/api/leaderboard?limit=diez')
+    assert response.status_code == 400
+    assert 'limit' in response.get_json()['error']
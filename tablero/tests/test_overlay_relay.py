@@ -0,0 +1,103 @@
+import time
+import pytest
+from alert_queue import AlertQueue
+from chat_pipeline import ChatPipeline
+from overlay_relay import LeaderRelay
+
+fakeredis = pytest.importorskip('fakeredis')
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+def relay(server, name='chat', handle=None, **options):
+    # Cada worker con su propio cliente contra el mismo servidor Redis
+    return LeaderRelay(fakeredis.FakeRedis(server=server), name, handle or (lambda item: None), **options)
+
+def test_only_one_worker_holds_the_lease(server):
+    first, second = relay(server), relay(server)
+    assert first.renew()
+    assert not second.renew()
+    assert first.renew()  # renovar el propio lease
+
+def test_forwarded_items_are_handled_only_by_the_leader(server):
+    handled = []
+    leader, follower = relay(server, handle=handled.append), relay(server, handle=handled.append)
+    leader.renew()
+    follower.renew()
+    follower.forward({'text': 'hola'})
+    leader.forward({'text': 'adiós'})
+    assert follower.drain() == 0
+    assert leader.drain() == 2
+    assert handled == [{'text': 'hola'}, {'text': 'adiós'}]
+
+def test_another_worker_takes_over_when_the_leader_leaves(server):
+    elected = []
+    leader, follower = relay(server), relay(server, on_elected=lambda: elected.append('follower'))
+    leader.renew()
+    follower.forward({'text': 'pendiente'})
+    leader.release()
+    assert follower.renew()
+    assert elected == ['follower']
+    assert follower.get_stats() == {'leader': True, 'forwarded_pending': 1}
+
+def test_state_is_shared_and_expires(server):
+    first, second = relay(server), relay(server)
+    first.set_state({'title': 'hola'}, ttl_ms=5000)
+    value, remaining = second.get_state()
+    assert value == {'title': 'hola'}
+    assert 0 < remaining <= 5000
+    first.set_state(['a', 'b'])
+    assert second.get_state() == (['a', 'b'], None)
+    first.set_state(None)
+    assert second.get_state() == (None, None)
+
+def test_chat_limits_and_history_span_every_worker(server):
+    # Dos workers: cada uno con su canal de chat, pero solo el líder filtra y publica
+    workers = []
+    for _ in range(2):
+        worker = {}
+        worker['pipeline'] = ChatPipeline(lambda messages, worker=worker: worker['relay'].set_state(
+            worker['pipeline'].recent()), author_burst=1, author_rate=0.001, max_rate=100)
+        worker['relay'] = relay(server, handle=worker['pipeline'].submit)
+        workers.append(worker)
+    leader, follower = workers
+    leader['relay'].renew()
+    follower['relay'].renew()
+    leader['relay'].forward({'user': 'ana', 'text': 'uno'})
+    follower['relay'].forward({'user': 'ana', 'text': 'dos'})
+    follower['relay'].forward({'user': 'bo', 'text': 'tres'})
+    leader['relay'].drain()
+    leader['pipeline'].flush()
+
+    # El límite por autor se aplica a la suma de los dos workers
+    assert leader['pipeline'].get_stats()['dropped_rate_limited'] == 1
+    history = follower['relay'].get_state()[0]
+    assert [message['text'] for message in history] == ['uno', 'tres']
+
+def test_alerts_are_paced_by_the_leader_for_every_worker(server):
+    shown = []
+    def publish(alert):
+        shown.append(alert)
+        leader.set_state(alert, alert['duration'])
+    queue = AlertQueue(publish, default_duration=5000)
+    leader = relay(server, 'alerts', handle=lambda item: queue.submit(item['alert']))
+    follower = relay(server, 'alerts')
+    leader.renew()
+    follower.renew()
+    follower.forward({'alert': {'title': 'uno', 'priority': 30}})
+    leader.forward({'alert': {'title': 'dos'}})
+    leader.drain()
+    queue.start()
+    try:
+        deadline = time.monotonic() + 1
+        while not shown and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Una sola alerta en pantalla; la otra espera a que termine
+        assert [alert['title'] for alert in shown] == ['uno']
+        assert queue.get_stats()['pending'] == 1
+        current, remaining = follower.get_state()
+        assert current['title'] == 'uno'
+        assert 0 < remaining <= 5000
+    finally:
+        queue.stop()
@@ -0,0 +1,62 @@
+import json
+import pytest
+from models import DEFAULT_GAME
+from overlays import OverlayConnection, OverlayHub, overlay_hub, overlay_state
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, text):
+        self.sent.append(json.loads(text))
+
+def drain(connection):
+    """Lo que el hilo de envío mandaría al overlay"""
+    messages = []
+    while not connection._outbox.empty():
+        text = connection._outbox.get_nowait()
+        if text is not None:
+            messages.append(json.loads(text))
+    return messages
+
+def test_publish_reaches_only_the_channel_subscribers():
+    hub = OverlayHub()
+    chat, alerts = OverlayConnection(FakeWebSocket()), OverlayConnection(FakeWebSocket())
+    hub.subscribe(chat, 'chat')
+    hub.subscribe(alerts, 'alerts')
+    hub.publish('chat', {'type': 'new_messages', 'messages': []})
+    assert drain(chat) == [{'type': 'new_messages', 'messages': []}]
+    assert drain(alerts) == []
+    assert hub.get_stats() == {'published': 1, 'delivered': 1, 'dropped_slow': 0, 'shared': False}
+
+def test_slow_overlay_is_closed_and_unsubscribed():
+    hub = OverlayHub()
+    slow = OverlayConnection(FakeWebSocket(), outbox_size=2)
+    fast = OverlayConnection(FakeWebSocket(), outbox_size=10)
+    hub.subscribe(slow, 'chat')
+    hub.subscribe(fast, 'chat')
+    for index in range(3):
+        hub.publish('chat', {'n': index})
+    assert slow.closed
+    assert hub.stats() == {'chat': 1}
+    assert [message['n'] for message in drain(fast)] == [0, 1, 2]
+    assert hub.get_stats()['dropped_slow'] == 1
+
+@pytest.fixture
+def scoreboard(client):
+    overlay_state.update_scoreboard(DEFAULT_GAME, round=1, timer=30)
+    yield
+    overlay_state.update_scoreboard(DEFAULT_GAME, round=None, timer=None)
+
+def test_invalid_timer_leaves_the_round_unchanged(client, scoreboard):
+    published = overlay_hub.get_stats()['published']
+    response = client.post('/api/overlay/scoreboard', json={'round': 2, 'timer': 'pronto'})
+    assert response.status_code == 400
+    state = client.get('/api/overlay/scoreboard').get_json()
+    assert (state['round'], state['timer']) == (1, 30)
+    assert overlay_hub.get_stats()['published'] == published
+
+def test_round_and_timer_are_applied_together(client, scoreboard):
+    response = client.post('/api/overlay/scoreboard', json={'round': 2, 'timer': '45'})
+    assert response.status_code == 200
+    assert (response.get_json()['round'], response.get_json()['timer']) == (2, 45)
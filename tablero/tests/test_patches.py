@@ -0,0 +1,50 @@
+import pytest
+from models import GameState, initial_game_state, question_store, update_team_score
+from state_backend import MemoryStateBackend
+
+@pytest.fixture
+def socket_game():
+    from app import app, socketio
+    from models import game_registry
+    game = game_registry.create('Parches', game_id='parches')
+    display, moderator = socketio.test_client(app), socketio.test_client(app)
+    display.emit('join', {'room': 'display', 'game': 'parches'})
+    moderator.emit('join', {'room': 'moderator', 'game': 'parches'})
+    display.get_received()
+    yield game, display, moderator
+    display.disconnect()
+    moderator.disconnect()
+    game_registry.remove('parches')
+
+def test_score_patch_carries_only_the_changed_team_fields():
+    game = GameState(MemoryStateBackend(), 'test', initial_game_state())
+    version = game.version
+    patch = update_team_score(game, 'team1', 10)
+    assert patch == {'version': version + 1,
+                     'changes': {'teams': {'team1': {'score': 10, 'correct_answers': 1}}}}
+    patch = update_team_score(game, 'team1', -5)
+    assert patch['version'] == version + 2
+    assert patch['changes'] == {'teams': {'team1': {'score': 5, 'wrong_answers': 1}}}
+
+def test_unknown_team_produces_no_patch_or_version():
+    game = GameState(MemoryStateBackend(), 'test', initial_game_state())
+    version = game.version
+    assert update_team_score(game, 'nadie', 10) is None
+    assert game.version == version
+
+def test_displays_receive_consecutive_versioned_patches(socket_game):
+    game, display, moderator = socket_game
+    version = game.version
+    question = question_store.all()[0]
+    moderator.emit('send_question', {'question_id': question['id']})
+    moderator.emit('show_answer')
+    received = display.get_received()
+    assert [message['name'] for message in received] == ['new_question', 'show_correct_answer']
+    new_question, shown = (message['args'][0] for message in received)
+    assert new_question['version'] == version + 1
+    assert new_question['changes']['current_question']['id'] == question['id']
+    assert 'teams' not in new_question['changes']
+    # El estado interno (arbitraje, instante de envío) no sale en los parches
+    assert 'answered_by' not in new_question['changes']
+    assert shown == {'version': version + 2, 'changes': {'show_answer': True},
+                     'correct_answer': question['correct_answer']}
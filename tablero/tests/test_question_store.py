@@ -0,0 +1,73 @@
+from models import QuestionStore, mock_questions
+
+def make_store():
+    store = QuestionStore()
+    store.load(mock_questions)
+    return store
+
+def test_lookups_and_misses_are_reported():
+    store = make_store()
+    assert store.get(1)['question'] == mock_questions[0]['question']
+    assert store.get(9999) is None
+    stats = store.get_stats()
+    assert (stats['lookups'], stats['misses']) == (2, 1)
+    assert stats['questions'] == len(mock_questions)
+    assert stats['full_loads'] == 1
+
+def test_incremental_changes_update_the_indexes():
+    store = make_store()
+    changed = dict(mock_questions[0], type='opcion_multiple')
+    store.apply_changes(upserts=[changed], removed_ids=[2])
+    assert store.get(2) is None
+    assert 1 in {question['id'] for question in store.by_type('opcion_multiple')}
+    assert 1 not in {question['id'] for question in store.by_type('cierto_falso')}
+    assert store.get_stats()['refreshed_rows'] == 2
+
+class FakeDatabase:
+    """Módulo database mínimo para el refresco incremental"""
+
+    def __init__(self, rows=(), deleted=()):
+        self.rows = list(rows)
+        self.deleted = list(deleted)
+        self.since = []
+
+    def get_questions_updated_since(self, since):
+        self.since.append(since)
+        return [row for row in self.rows if row['updated_at'] > since]
+
+    def get_questions_deleted_since(self, since):
+        return [row for row in self.deleted if row['deleted_at'] > since]
+
+def db_row(question, updated_at, is_active=True):
+    return {'id': question['id'], 'type': question['type'], 'question': question['question'],
+            'options': [{'text': text, 'order': order} for order, text in enumerate(question['options'])],
+            'correct_answer': question['correct_answer'], 'category_name': question['category'],
+            'difficulty': question['difficulty'], 'updated_at': updated_at, 'is_active': is_active}
+
+def test_refresh_rereads_the_overlap_and_applies_hard_deletes(monkeypatch):
+    import sys
+    from datetime import datetime, timedelta
+    from config import Config
+
+    monkeypatch.setattr(Config, 'QUESTION_STORE_SYNC_OVERLAP', 60)
+    synced = datetime(2024, 5, 1, 12, 0, 0)
+    store = QuestionStore()
+    store.load(mock_questions, last_sync=synced)
+    # Confirmada después de la última sincronización pero con un updated_at anterior
+    late = dict(mock_questions[0], question='¿París es la capital de Francia?')
+    database = FakeDatabase(rows=[db_row(late, synced - timedelta(seconds=30)),
+                                  db_row(mock_questions[2], synced - timedelta(seconds=10))],
+                            deleted=[{'question_id': 2, 'deleted_at': synced + timedelta(seconds=5)}])
+    monkeypatch.setitem(sys.modules, 'database', database)
+
+    version = store.version
+    store.refresh_from_database()
+    assert database.since == [synced - timedelta(seconds=60)]
+    assert store.get(1)['question'] == late['question']
+    assert store.get(2) is None
+    assert store.last_sync == synced + timedelta(seconds=5)
+    assert store.version == version + 1
+
+    # Releer lo mismo no cuenta como cambio (no invalida los ETags)
+    store.refresh_from_database()
+    assert store.version == version + 1
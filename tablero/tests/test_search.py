@@ -0,0 +1,43 @@
+from models import game_registry, question_store, set_current_question
+
+def search(client, **params):
+    response = client.get('/api/questions/search', query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+def test_keyset_pages_cover_every_question_once(client):
+    ids, after = [], None
+    while True:
+        page = search(client, limit=3, **({'after': after} if after is not None else {}))
+        assert len(page['items']) <= 3
+        ids += [item['id'] for item in page['items']]
+        after = page['next_after']
+        if after is None:
+            break
+        assert after == ids[-1]
+    assert ids == sorted(question['id'] for question in question_store.all())
+
+def test_last_full_page_has_no_next_page():
+    total = len(question_store)
+    items, next_after = question_store.search(limit=total)
+    assert len(items) == total
+    assert next_after is None
+
+def test_text_prefixes_ignore_case_and_accents_and_combine_with_filters(client):
+    assert [item['id'] for item in search(client, q='OCEANO')['items']] == [6]
+    assert [item['id'] for item in search(client, q='capi fran')['items']] == [1]
+    page = search(client, category='Geografía', difficulty=2)
+    assert [item['id'] for item in page['items']] == [6, 8]
+
+def test_unused_excludes_questions_already_sent_in_the_game(client):
+    game = game_registry.create(game_id='busqueda')
+    try:
+        set_current_question(game, question_store.get(6))
+        page = search(client, category='Geografía', unused=1, game='busqueda')
+        assert [item['id'] for item in page['items']] == [1, 8]
+    finally:
+        game_registry.remove('busqueda')
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.get('/api/questions/search?after=abc')
+    assert response.status_code == 400
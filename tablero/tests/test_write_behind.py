@@ -0,0 +1,57 @@
+from write_behind import WriteBehindQueue
+
+def test_revocation_undoes_the_displaced_winner_score():
+    queue = WriteBehindQueue()
+    queue.submit_answer(1, 5, 7, 'A', True, 10)
+    queue.submit_score(1, 7, 10)
+    queue.submit_answer(1, 5, 8, 'A', True, 10)
+    queue.submit_score(1, 8, 10)
+    queue.submit_revocation(1, 5, 7, 10)
+    responses, score_deltas, revocations = WriteBehindQueue._build_batch(queue._drain([]))
+    assert len(responses) == 2
+    assert sorted(score_deltas) == [(1, 7, 0, 0, 0), (1, 8, 10, 1, 0)]
+    assert revocations == [(1, 5, 7)]
+
+class FakeDatabase:
+    """persist_game_events que falla con los lotes que contienen un evento dado"""
+
+    def __init__(self, poison_team=None, error=ValueError):
+        self.poison_team = poison_team
+        self.error = error
+        self.committed = []
+
+    def __call__(self, responses, score_deltas, revocations):
+        if any(delta[1] == self.poison_team for delta in score_deltas):
+            raise self.error('fallo')
+        self.committed.extend(score_deltas)
+
+def test_poison_event_is_isolated_and_the_rest_is_committed():
+    database = FakeDatabase(poison_team=13)
+    queue = WriteBehindQueue(batch_size=100, max_retries=2, persist=database)
+    for team_id in range(10, 20):
+        queue.submit_score(1, team_id, 10)
+    queue.flush()
+    stats = queue.get_stats()
+    assert stats['dead_letters'] == 1
+    assert stats['flushed'] == 9
+    assert sorted(delta[1] for delta in database.committed) == [10, 11, 12, 14, 15, 16, 17, 18, 19]
+    # La cola sigue avanzando después del evento descartado
+    queue.submit_score(1, 20, 10)
+    queue.flush()
+    assert database.committed[-1][1] == 20
+
+def test_connection_errors_keep_the_batch_pending():
+    import psycopg2
+
+    database = FakeDatabase(poison_team=1, error=psycopg2.OperationalError)
+    queue = WriteBehindQueue(max_retries=1, persist=database)
+    queue.submit_score(1, 1, 10)
+    for _ in range(3):
+        queue.flush()
+    stats = queue.get_stats()
+    assert stats['dead_letters'] == 0
+    assert stats['failed_flushes'] == 3
+    # La base de datos vuelve: el lote se confirma
+    database.poison_team = None
+    queue.flush()
+    assert database.committed == [(1, 1, 10, 1, 0)]
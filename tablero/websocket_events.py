@@ -1,177 +1,437 @@
+import secrets
+import threading
+import time
+from flask import request
 from flask_socketio import emit, join_room, leave_room
-from models import game_state, get_question_by_id, update_team_score, reset_game
+from clock_sync import clock_sync
+from config import Config
+from metrics import game_response_times
+from scheduler import question_scheduler, CATEGORY_POLICIES, DIFFICULTY_POLICIES, TARGET_POLICIES
+from overlays import publish_game_patch
+from models import (game_registry, question_store, update_team_score, reset_game,
+                    set_current_question, reveal_answer, submit_team_answer, AnswerRejected,
+                    DEFAULT_GAME)
+from wire import JSON, emit_all_formats, format_room, format_rooms, negotiate
+from write_behind import answer_writer
+
+# Salas que reciben los parches de estado. Un solo emit con la lista de salas
+# serializa el paquete una vez y lo entrega una sola vez a cada cliente,
+# aunque esté unido a varias salas (p. ej. el marcador).
+BROADCAST_ROOMS = ['display', 'scoreboard']
+
+def game_room(room, game_id):
+    """Sala de una partida: 'display:<partida>', 'scoreboard:<partida>', ..."""
+    return f'{room}:{game_id}'
+
+# Eventos que no se agrupan: se envían al momento, después de vaciar lo
+# pendiente de la partida para que las pantallas los vean en orden
+CRITICAL_EVENTS = {'new_question', 'show_correct_answer', 'game_reset'}
+
+def merge_patch_changes(changes, newer):
+    """Cambios de dos parches consecutivos como uno solo (los equipos campo a campo)"""
+    merged = dict(changes)
+    for key, value in newer.items():
+        if key == 'teams':
+            teams = dict(merged.get('teams', {}))
+            for team_id, fields in value.items():
+                teams[team_id] = dict(teams.get(team_id, {}), **fields)
+            merged['teams'] = teams
+        else:
+            merged[key] = value
+    return merged
+
+class BroadcastScheduler:
+    """Agrupa las difusiones de cada partida en tramas de frame_ms
+
+    Los eventos no críticos (score_updated, team_answered) se acumulan
+    durante la trama y salen juntos en un solo evento 'batch'; los
+    score_updated consecutivos del mismo equipo se funden en un parche con
+    base_version. Los críticos vacían antes lo pendiente.
+
+    Contrapresión: las pantallas confirman cada trama con 'batch_ack'. Una
+    pantalla con max_pending tramas sin confirmar deja de recibirlas
+    (skip_sid) y, cuando se pone al día, recibe la instantánea completa.
+    Cada worker controla solo a sus clientes y las tramas que él emite.
+    """
+
+    def __init__(self, socketio, frame_ms=33, max_pending=8):
+        self.socketio = socketio
+        self.frame = frame_ms / 1000
+        self.max_pending = max_pending
+        # Identifica las tramas de este worker en las confirmaciones
+        self.origin = secrets.token_hex(4)
+        self._pending = {}
+        self._displays = {}
+        self._display_rooms = {}  # salas de visualización en las que está cada sid
+        self._in_flight = {}
+        self._lagging = set()
+        self._lock = threading.Lock()
+        # Serializa los envíos: una trama y el evento crítico que la sigue salen en orden
+        self._send_lock = threading.Lock()
+
+    def add_display(self, sid, game_id, room):
+        with self._lock:
+            self._displays[sid] = game_id
+            self._display_rooms.setdefault(sid, set()).add(room)
+            self._in_flight.setdefault(sid, 0)
+
+    def remove_display(self, sid, room=None):
+        """Sacar al sid de room (de todas si es None); deja de ser pantalla al salir de la última"""
+        with self._lock:
+            rooms = self._display_rooms.get(sid, set())
+            if room is not None:
+                rooms.discard(room)
+                if rooms:
+                    return
+            self._display_rooms.pop(sid, None)
+            self._displays.pop(sid, None)
+            self._in_flight.pop(sid, None)
+            self._lagging.discard(sid)
+
+    def emit(self, game_id, rooms, event, payload):
+        if self.frame <= 0:
+            emit_all_formats(self.socketio, event, payload, rooms)
+            return
+        if event in CRITICAL_EVENTS:
+            with self._send_lock:
+                self._flush(game_id)
+                emit_all_formats(self.socketio, event, payload, rooms)
+            return
+        with self._lock:
+            pending = self._pending.get(game_id)
+            if pending is None:
+                pending = self._pending[game_id] = {'rooms': rooms, 'events': []}
+                self.socketio.start_background_task(self._flush_later, game_id)
+            self._coalesce(pending['events'], event, payload)
+
+    @staticmethod
+    def _coalesce(events, event, payload):
+        if events and event == 'score_updated':
+            last_event, last = events[-1]
+            if (last_event == 'score_updated' and last['updated_team'] == payload['updated_team']
+                    and last['version'] + 1 == payload['version']):
+                last.setdefault('base_version', last['version'] - 1)
+                last['version'] = payload['version']
+                last['changes'] = merge_patch_changes(last['changes'], payload['changes'])
+                last['points_added'] += payload['points_added']
+                return
+        events.append([event, payload])
+
+    def _flush_later(self, game_id):
+        self.socketio.sleep(self.frame)
+        self.flush(game_id)
+
+    def flush(self, game_id):
+        with self._send_lock:
+            self._flush(game_id)
+
+    def _flush(self, game_id):
+        with self._lock:
+            pending = self._pending.pop(game_id, None)
+            if pending is None:
+                return
+            skip = []
+            for sid, display_game in self._displays.items():
+                if display_game != game_id:
+                    continue
+                if self._in_flight[sid] >= self.max_pending:
+                    self._lagging.add(sid)
+                    skip.append(sid)
+                else:
+                    self._in_flight[sid] += 1
+        emit_all_formats(self.socketio, 'batch', {'origin': self.origin, 'events': pending['events']},
+                         pending['rooms'], skip_sid=skip or None)
+
+    def ack(self, sid, origin):
+        """Registrar una trama confirmada; True si la pantalla se puso al día tras perder tramas"""
+        if origin != self.origin:
+            return False
+        with self._lock:
+            if sid not in self._in_flight:
+                return False
+            self._in_flight[sid] = max(self._in_flight[sid] - 1, 0)
+            if sid in self._lagging and self._in_flight[sid] == 0:
+                self._lagging.discard(sid)
+                return True
+        return False
 
 def register_websocket_events(socketio):
-    
+
+    # Partida a la que se unió cada cliente (sid) de este worker y formato negociado
+    client_games = {}
+    client_formats = {}
+    broadcaster = BroadcastScheduler(socketio, Config.BROADCAST_FRAME_MS,
+                                     Config.BROADCAST_MAX_PENDING_FRAMES)
+
+    def current_game():
+        """Partida del cliente que envió el evento (la principal si no indicó ninguna)"""
+        return game_registry.get(client_games.get(request.sid, DEFAULT_GAME))
+
+    def broadcast(game, event, payload):
+        """Enviar un parche versionado solo a las salas de visualización de la partida"""
+        broadcaster.emit(game.game_id, [game_room(room, game.game_id) for room in BROADCAST_ROOMS],
+                         event, payload)
+        # Marcador de OBS (overlaysOBS) por WebSocket simple; solo encola, no espera a los overlays
+        publish_game_patch(game, event, payload)
+
+    def persist_score(game, team_id, points, question_id=None, answer=None, is_correct=None,
+                      response_time=None):
+        """Encolar la persistencia sin bloquear el handler (si hay sesión en BD)"""
+        session_id = game.session_id
+        db_team_id = game.team_db_ids.get(team_id)
+        if session_id is None or db_team_id is None:
+            return
+        if question_id is not None:
+            answer_writer.submit_answer(session_id, question_id, db_team_id,
+                                        answer, is_correct, points, response_time)
+        answer_writer.submit_score(session_id, db_team_id, points)
+
+    def persist_revocation(game, team_id, points, question_id):
+        """Encolar la anulación de la respuesta de un ganador desbancado (si hay sesión en BD)"""
+        session_id = game.session_id
+        db_team_id = game.team_db_ids.get(team_id)
+        if session_id is None or db_team_id is None:
+            return
+        answer_writer.submit_revocation(session_id, question_id, db_team_id, points)
+
+    @socketio.on('disconnect')
+    def on_disconnect():
+        clock_sync.forget(request.sid)
+        client_games.pop(request.sid, None)
+        client_formats.pop(request.sid, None)
+        broadcaster.remove_display(request.sid)
+
+    @socketio.on('clock_sync')
+    def handle_clock_sync():
+        # Ronda de pings para estimar el desfase de reloj y el RTT de este cliente
+        clock_sync.start(request.sid)
+        emit('clock_ping')
+
+    @socketio.on('clock_pong')
+    def handle_clock_pong(data):
+        if clock_sync.record(request.sid, data.get('client_ts')) is not None:
+            emit('clock_ping')
+
     @socketio.on('join')
     def on_join(data):
-        room = data['room']
-        join_room(room)
-        emit('status', {'msg': f'Cliente conectado a {room}'}, room=room)
-    
+        game_id = data.get('game') or DEFAULT_GAME
+        if game_registry.get(game_id) is None:
+            emit('status', {'msg': f'La partida {game_id} no existe'})
+            return
+        client_games[request.sid] = game_id
+        # Formato de los eventos (JSON salvo que el cliente pida msgpack y sea posible)
+        client_formats[request.sid] = negotiate(data.get('format'), data.get('schema'))
+        room = game_room(data['room'], game_id)
+        join_room(format_room(room, client_formats[request.sid]))
+        if data['room'] in BROADCAST_ROOMS:
+            broadcaster.add_display(request.sid, game_id, room)
+        emit('status', {'msg': f'Cliente conectado a {room}'}, to=format_rooms(room))
+
     @socketio.on('leave')
     def on_leave(data):
-        room = data['room']
-        leave_room(room)
-        emit('status', {'msg': f'Cliente desconectado de {room}'}, room=room)
-    
+        game_id = data.get('game') or client_games.get(request.sid, DEFAULT_GAME)
+        room = game_room(data['room'], game_id)
+        leave_room(format_room(room, client_formats.get(request.sid, JSON)))
+        if data['room'] in BROADCAST_ROOMS:
+            broadcaster.remove_display(request.sid, room)
+        emit('status', {'msg': f'Cliente desconectado de {room}'}, to=format_rooms(room))
+
     @socketio.on('send_question')
     def handle_send_question(data):
         question_id = data.get('question_id')
         target_team = data.get('target_team', 'both')
-        question = get_question_by_id(question_id)
-        
-        if question:
-            game_state.current_question = question
-            game_state.target_team = target_team
-            game_state.game_active = True
-            game_state.show_answer = False
-            
-            # Enviar pregunta al tablero principal
-            socketio.emit('new_question', {
-                'question': question,
-                'target_team': target_team,
-                'game_active': True,
-                'show_answer': False
-            }, room='display')
-            
-            # Confirmar al moderador
+        question = question_store.get(question_id)
+        game = current_game()
+
+        if game is None:
             emit('question_sent', {
-                'status': 'success',
-                'question': question,
-                'target_team': target_team
+                'status': 'error',
+                'message': 'Partida no encontrada'
+            })
+        elif target_team != 'both' and target_team not in game.teams:
+            emit('question_sent', {
+                'status': 'error',
+                'message': 'Equipo no encontrado'
             })
+        elif question:
+            send_question(game, question, target_team)
         else:
             emit('question_sent', {
                 'status': 'error',
                 'message': 'Pregunta no encontrada'
             })
-    
+
+    def send_question(game, question, target_team):
+        patch = set_current_question(game, question, target_team)
+
+        # Enviar pregunta al tablero de la partida
+        broadcast(game, 'new_question', patch)
+
+        # Confirmar al moderador
+        emit('question_sent', {
+            'status': 'success',
+            'question': question,
+            'target_team': target_team
+        })
+
+    @socketio.on('next_question')
+    def handle_next_question(data=None):
+        """Enviar la pregunta que elige el planificador
+
+        data opcional: target_team y las políticas category_policy,
+        difficulty_policy y target_policy para esta pregunta.
+        """
+        data = data or {}
+        game = current_game()
+        target_team = data.get('target_team')
+        policies = {
+            'category_policy': (data.get('category_policy'), CATEGORY_POLICIES),
+            'difficulty_policy': (data.get('difficulty_policy'), DIFFICULTY_POLICIES),
+            'target_policy': (data.get('target_policy'), TARGET_POLICIES)
+        }
+        invalid = [name for name, (value, allowed) in policies.items()
+                   if value is not None and value not in allowed]
+
+        if game is None:
+            message = 'Partida no encontrada'
+        elif target_team not in (None, 'both') and target_team not in game.teams:
+            message = 'Equipo no encontrado'
+        elif invalid:
+            message = f"Política no válida: {', '.join(invalid)}"
+        else:
+            question, target_team = question_scheduler.next_question(
+                game, target_team, **{name: value for name, (value, _) in policies.items()})
+            if question is not None:
+                send_question(game, question, target_team)
+                return
+            message = 'No quedan preguntas sin usar en esta partida'
+        emit('question_sent', {
+            'status': 'error',
+            'message': message
+        })
+
     @socketio.on('show_answer')
     def handle_show_answer():
-        if game_state.current_question:
-            game_state.show_answer = True
-            
-            socketio.emit('show_correct_answer', {
-                'correct_answer': game_state.current_question['correct_answer'],
-                'show_answer': True
-            }, room='display')
-            
+        game = current_game()
+        patch = reveal_answer(game) if game else None
+        if patch:
+            broadcast(game, 'show_correct_answer', patch)
+
             emit('answer_shown', {'status': 'success'})
         else:
             emit('answer_shown', {
                 'status': 'error',
                 'message': 'No hay pregunta activa'
             })
-    
+
     @socketio.on('update_score')
     def handle_update_score(data):
         team_id = data.get('team_id')
         points = data.get('points', 0)
-        
-        if team_id in game_state.teams:
-            update_team_score(team_id, points)
-            
-            # Actualizar marcador en todas las pantallas
-            socketio.emit('score_updated', {
-                'teams': game_state.teams,
-                'updated_team': team_id,
-                'points_added': points
-            }, room='display')
-            
-            socketio.emit('score_updated', {
-                'teams': game_state.teams,
-                'updated_team': team_id,
-                'points_added': points
-            }, room='scoreboard')
-            
+
+        game = current_game()
+        patch = update_team_score(game, team_id, points) if game else None
+        if patch:
+            # Actualizar marcador en las pantallas de la partida
+            patch['updated_team'] = team_id
+            patch['points_added'] = points
+            broadcast(game, 'score_updated', patch)
+            persist_score(game, team_id, points)
+
             emit('score_update_confirmed', {
                 'status': 'success',
-                'teams': game_state.teams
+                'teams': game.teams
             })
         else:
             emit('score_update_confirmed', {
                 'status': 'error',
                 'message': 'Equipo no encontrado'
             })
-    
+
     @socketio.on('team_answer')
     def handle_team_answer(data):
+        # Instante de llegada para el arbitraje, antes de cualquier espera
+        received_at = time.monotonic()
         team_id = data.get('team_id')
         answer = data.get('answer')
-        
-        if not game_state.current_question or not game_state.game_active:
-            emit('answer_result', {
-                'status': 'error',
-                'message': 'No hay pregunta activa'
-            })
-            return
-        
-        # Verificar si el equipo puede responder a esta pregunta
-        if game_state.target_team != 'both' and game_state.target_team != team_id:
+        # Instante en que el equipo confirmó, en su reloj (ajustado con clock_sync)
+        timing = clock_sync.timing(request.sid, data.get('client_ts'))
+
+        # Validación y puntuación en una sola mutación: atómica aunque
+        # respondan varios equipos a la vez desde distintos workers
+        game = current_game()
+        try:
+            if game is None:
+                raise AnswerRejected('Partida no encontrada')
+            patch, result = submit_team_answer(game, team_id, answer, received_at, **timing)
+        except AnswerRejected as e:
             emit('answer_result', {
                 'status': 'error',
-                'message': 'Esta pregunta no está dirigida a tu equipo'
+                'message': str(e)
             })
             return
-        
-        correct_answer = game_state.current_question['correct_answer']
-        is_correct = answer == correct_answer
-        points = 10 if is_correct else -5
-        
-        update_team_score(team_id, points)
-        
-        # Notificar resultado a todas las pantallas
-        socketio.emit('team_answered', {
+
+        game_response_times(game.game_id).observe(team_id, result['response_time'])
+        response_time_ms = round(result['response_time'] * 1000)
+
+        # Notificar resultado a las pantallas de la partida (tablero y marcador)
+        patch.update({
             'team_id': team_id,
-            'team_name': game_state.teams[team_id]['name'],
+            'team_name': result['team_name'],
             'answer': answer,
-            'is_correct': is_correct,
-            'points': points,
-            'teams': game_state.teams,
-            'target_team': game_state.target_team
-        }, room='display')
-        
-        socketio.emit('score_updated', {
-            'teams': game_state.teams,
-            'updated_team': team_id,
-            'points_added': points
-        }, room='scoreboard')
-        
+            'is_correct': result['is_correct'],
+            'points': result['points'],
+            'target_team': result['target_team'],
+            'displaced_team': result['displaced_team'],
+            'response_time_ms': response_time_ms
+        })
+        broadcast(game, 'team_answered', patch)
+        persist_score(game, team_id, result['points'], result['question_id'], answer, result['is_correct'],
+                      result['response_time'])
+        if result['displaced_team'] is not None:
+            # La BD también tiene que perder los puntos y el acierto del desbancado
+            persist_revocation(game, result['displaced_team'], result['displaced_points'],
+                               result['question_id'])
+
         emit('answer_result', {
             'status': 'success',
-            'is_correct': is_correct,
-            'points': points,
-            'correct_answer': correct_answer
+            'is_correct': result['is_correct'],
+            'points': result['points'],
+            'correct_answer': result['correct_answer'],
+            'response_time_ms': response_time_ms
         })
-    
+
     @socketio.on('reset_game')
     def handle_reset_game():
-        reset_game()
-        
-        # Notificar reset a todas las pantallas
-        socketio.emit('game_reset', {
-            'teams': game_state.teams,
-            'current_question': None,
-            'game_active': False,
-            'show_answer': False
-        }, room='display')
-        
-        socketio.emit('game_reset', {
-            'teams': game_state.teams
-        }, room='scoreboard')
-        
+        game = current_game()
+        if game is None:
+            emit('reset_confirmed', {
+                'status': 'error',
+                'message': 'Partida no encontrada'
+            })
+            return
+        patch = reset_game(game)
+        game_response_times(game.game_id).clear()
+
+        # Notificar reset a las pantallas de la partida
+        broadcast(game, 'game_reset', patch)
+
         emit('reset_confirmed', {
             'status': 'success',
             'message': 'Juego reiniciado'
         })
-    
+
+    @socketio.on('batch_ack')
+    def handle_batch_ack(data):
+        # La pantalla procesó una trama; si había perdido tramas recibe el estado completo
+        if broadcaster.ack(request.sid, (data or {}).get('origin')):
+            game = current_game()
+            if game is not None:
+                emit('game_state', game.public_snapshot())
+
     @socketio.on('get_game_state')
     def handle_get_game_state():
-        emit('game_state', {
-            'current_question': game_state.current_question,
-            'target_team': game_state.target_team,
-            'teams': game_state.teams,
-            'game_active': game_state.game_active,
-            'show_answer': game_state.show_answer
-        })
\ No newline at end of file
+        # Instantánea completa: carga inicial o cliente que detectó un salto de versión
+        game = current_game()
+        if game is not None:
+            emit('game_state', game.public_snapshot())
@@ -0,0 +1,69 @@
+"""
+Formato de los eventos de Socket.IO: JSON (por defecto) o MessagePack.
+
+Un cliente pide 'msgpack' al unirse a una sala y, si el servidor lo tiene
+activo y el esquema coincide, entra en la variante '<sala>:msgpack'. Cada
+difusión se codifica una vez por formato: las salas JSON reciben el dict y
+las MessagePack un binario con las claves conocidas sustituidas por su
+número en WIRE_KEYS. base.html decodifica antes de llamar a los manejadores.
+"""
+
+import hashlib
+import json
+from config import Config
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = 'json'
+MSGPACK = 'msgpack'
+
+# Esquema compartido con los clientes: el índice de cada clave es su código.
+# Solo se añaden claves al final; cambiar el orden cambia WIRE_SCHEMA_VERSION
+# y los clientes con una página antigua vuelven a JSON.
+WIRE_KEYS = (
+    'version', 'changes', 'base_version',
+    'current_question', 'target_team', 'teams', 'game_active', 'show_answer', 'answered_by',
+    'name', 'score', 'color', 'correct_answers', 'wrong_answers',
+    'id', 'type', 'question', 'options', 'correct_answer', 'category', 'difficulty',
+    'team_id', 'team_name', 'answer', 'is_correct', 'points', 'displaced_team', 'response_time_ms',
+    'updated_team', 'points_added', 'origin', 'events'
+)
+WIRE_CODES = {key: code for code, key in enumerate(WIRE_KEYS)}
+WIRE_SCHEMA_VERSION = hashlib.sha256(json.dumps(WIRE_KEYS).encode()).hexdigest()[:8]
+
+def msgpack_enabled():
+    return msgpack is not None and Config.WIRE_MSGPACK
+
+def negotiate(requested, schema):
+    """Formato que usará el cliente: msgpack solo si está activo y el esquema coincide"""
+    if requested == MSGPACK and schema == WIRE_SCHEMA_VERSION and msgpack_enabled():
+        return MSGPACK
+    return JSON
+
+def format_room(room, wire_format):
+    return room if wire_format == JSON else f'{room}:{wire_format}'
+
+def format_rooms(room):
+    """La sala en todos los formatos activos (mensajes de texto que no se codifican)"""
+    return [room, format_room(room, MSGPACK)] if msgpack_enabled() else [room]
+
+def compact_keys(value):
+    """Sustituir las claves del esquema por su código (recursivo)"""
+    if isinstance(value, dict):
+        return {WIRE_CODES.get(key, key): compact_keys(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [compact_keys(item) for item in value]
+    return value
+
+def encode_msgpack(payload):
+    return msgpack.packb(compact_keys(payload), use_bin_type=True)
+
+def emit_all_formats(socketio, event, payload, rooms, **kwargs):
+    """Difundir a las salas de cada formato, codificando una sola vez por formato"""
+    socketio.emit(event, payload, to=rooms, **kwargs)
+    if msgpack_enabled():
+        socketio.emit(event, encode_msgpack(payload),
+                      to=[format_room(room, MSGPACK) for room in rooms], **kwargs)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark del formato de los eventos: JSON frente a MessagePack.
+
+Genera los parches reales de una ronda (new_question, team_answered,
+show_correct_answer, score_updated, una trama 'batch' y la instantánea
+game_state) con las funciones de models.py sobre un estado en memoria y,
+para cada evento, mide el tiempo de codificación y los bytes del paquete
+Socket.IO que sale por el socket en cada formato (en MessagePack, la
+cabecera de texto más el adjunto binario).
+
+Requiere: pip install msgpack
+
+Uso:
+    python wire_benchmark.py --teams 2
+    python wire_benchmark.py --teams 8 --batch 20 --json
+"""
+
+import argparse
+import json
+import sys
+import time
+from socketio import packet
+from models import (GameState, initial_game_state, question_store, set_current_question,
+                    submit_team_answer, reveal_answer, update_team_score)
+from state_backend import MemoryStateBackend
+from wire import compact_keys, msgpack
+
+def round_events(teams, batch_size):
+    """[(evento, payload)] de una ronda con el formato que difunde websocket_events.py"""
+    game = GameState(MemoryStateBackend(), 'bench', initial_game_state(
+        [{'name': f'Equipo {number}'} for number in range(1, teams + 1)]))
+    question = next(q for q in question_store.all() if q['type'] == 'opcion_multiple')
+    events = [('new_question', set_current_question(game, question))]
+
+    answered = []
+    for team_id in list(game.teams)[:batch_size]:
+        patch, result = submit_team_answer(game, team_id, question['correct_answer'])
+        patch.update({
+            'team_id': team_id,
+            'team_name': result['team_name'],
+            'answer': question['correct_answer'],
+            'is_correct': result['is_correct'],
+            'points': result['points'],
+            'target_team': result['target_team'],
+            'displaced_team': result['displaced_team'],
+            'response_time_ms': round(result['response_time'] * 1000)
+        })
+        answered.append(['team_answered', patch])
+    events.append(('team_answered', answered[0][1]))
+    events.append(('batch', {'origin': 'a1b2c3d4', 'events': answered}))
+    events.append(('show_correct_answer', reveal_answer(game)))
+
+    patch = update_team_score(game, 'team1', 5)
+    patch.update(updated_team='team1', points_added=5)
+    events.append(('score_updated', patch))
+    events.append(('game_state', game.public_snapshot()))
+    return events
+
+def packet_bytes(encoded):
+    """Bytes en el socket de un paquete codificado (texto o texto + adjuntos)"""
+    if isinstance(encoded, str):
+        return len(encoded.encode())
+    return sum(len(part.encode()) if isinstance(part, str) else len(part) for part in encoded)
+
+def encode_json(event, payload):
+    return packet.Packet(packet.EVENT, data=[event, payload]).encode()
+
+def encode_msgpack(event, payload):
+    data = msgpack.packb(compact_keys(payload), use_bin_type=True)
+    return packet.Packet(packet.EVENT, data=[event, data]).encode()
+
+def time_per_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+def run(args):
+    results = []
+    for event, payload in round_events(args.teams, args.batch):
+        row = {'event': event}
+        for name, encoder in (('json', encode_json), ('msgpack', encode_msgpack)):
+            row[f'{name}_bytes'] = packet_bytes(encoder(event, payload))
+            row[f'{name}_us'] = round(time_per_call(lambda: encoder(event, payload), args.repeat), 2)
+        row['saved_percent'] = round(100 * (1 - row['msgpack_bytes'] / row['json_bytes']), 1)
+        results.append(row)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Bytes y tiempo de codificación por evento en JSON y MessagePack')
+    parser.add_argument('--teams', type=int, default=2, help='equipos de la partida')
+    parser.add_argument('--batch', type=int, default=10, help="respuestas agrupadas en la trama 'batch'")
+    parser.add_argument('--repeat', type=int, default=2000, help='codificaciones por medida')
+    parser.add_argument('--json', action='store_true', help='imprimir los resultados en JSON')
+    args = parser.parse_args()
+
+    if msgpack is None:
+        print('❌ Falta msgpack: pip install msgpack')
+        return False
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return True
+
+    print(f"{args.teams} equipos, trama de {min(args.batch, args.teams)} respuestas\n")
+    print(f"{'evento':<20} {'json B':>8} {'msgpack B':>10} {'ahorro':>7} {'json µs':>9} {'msgpack µs':>11}")
+    for row in results:
+        print(f"{row['event']:<20} {row['json_bytes']:>8} {row['msgpack_bytes']:>10} "
+              f"{row['saved_percent']:>6}% {row['json_us']:>9} {row['msgpack_us']:>11}")
+    return True
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
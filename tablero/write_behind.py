@@ -0,0 +1,238 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+import psycopg2
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class WriteBehindQueue:
+    """Cola de escritura diferida para respuestas y puntuaciones
+
+    Los handlers encolan eventos sin bloquear; un hilo de fondo los agrupa y
+    los confirma en una sola transacción por lote.
+
+    Un lote que falla se reintenta tal cual. Si la base de datos no responde
+    (error de conexión) se reintenta sin límite: es una caída y la cola hace
+    de colchón. Cualquier otro error (datos, claves foráneas) se reintenta
+    max_retries veces y después el lote se parte por la mitad hasta aislar
+    los eventos que fallan solos, que se descartan en el log y se cuentan en
+    'dead_letters'; el resto se confirma y la cola sigue avanzando.
+    """
+
+    def __init__(self, max_events=10000, batch_size=500, flush_interval=0.5, max_retries=3,
+                 persist=None):
+        self._queue = queue.Queue(maxsize=max_events)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._persist = persist
+        self._pending = None  # lote que falló y se reintenta en el siguiente ciclo
+        self._attempts = 0
+        self._flush_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {
+            'enqueued': 0,
+            'flushed': 0,
+            'dropped': 0,
+            'failed_flushes': 0,
+            'dead_letters': 0,
+            'batches': 0,
+            'last_flush_lag': 0.0,
+            'max_flush_lag': 0.0
+        }
+
+    def start(self):
+        """Arrancar el hilo de escritura y registrar el vaciado al apagar"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        logger.info("Cola de escritura diferida iniciada")
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _put(self, kind, row):
+        try:
+            self._queue.put_nowait((time.monotonic(), kind, row))
+            self._count('enqueued')
+            return True
+        except queue.Full:
+            self._count('dropped')
+            logger.error(f"Cola de escritura llena, evento '{kind}' descartado")
+            return False
+
+    def submit_answer(self, session_id, question_id, team_id, given_answer, is_correct, points,
+                      response_time=None):
+        """Encolar una respuesta de equipo (no bloquea); response_time en segundos"""
+        interval = timedelta(seconds=response_time) if response_time is not None else None
+        return self._put('response', (session_id, question_id, team_id, given_answer,
+                                      is_correct, points, interval, datetime.now()))
+
+    def submit_score(self, session_id, team_id, points):
+        """Encolar un cambio de puntuación (no bloquea)"""
+        return self._put('score', (session_id, team_id, points))
+
+    def submit_revocation(self, session_id, question_id, team_id, points):
+        """Encolar la anulación de una respuesta correcta desbancada (no bloquea)
+
+        Resta points y un acierto al equipo y deja su respuesta a la pregunta
+        como incorrecta y sin puntos.
+        """
+        return self._put('revocation', (session_id, question_id, team_id, points))
+
+    def _drain(self, events):
+        """Completar el lote con eventos de la cola hasta batch_size"""
+        while len(events) < self.batch_size:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    @staticmethod
+    def _build_batch(events):
+        """Separar respuestas y anulaciones y agregar deltas de puntuación por (sesión, equipo)"""
+        responses = []
+        revocations = []
+        deltas = {}
+        for _, kind, row in events:
+            if kind == 'response':
+                responses.append(row)
+            elif kind == 'revocation':
+                session_id, question_id, team_id, points = row
+                revocations.append((session_id, question_id, team_id))
+                delta = deltas.setdefault((session_id, team_id), [0, 0, 0])
+                delta[0] -= points
+                delta[1] -= 1
+            else:
+                session_id, team_id, points = row
+                delta = deltas.setdefault((session_id, team_id), [0, 0, 0])
+                delta[0] += points
+                delta[1 if points > 0 else 2] += 1
+        score_deltas = [(s, t, d[0], d[1], d[2]) for (s, t), d in deltas.items()]
+        return responses, score_deltas, revocations
+
+    def _flush(self, events):
+        """Confirmar events en una transacción; devuelve None o la excepción"""
+        persist = self._persist
+        if persist is None:
+            from database import persist_game_events as persist
+
+        if not events:
+            return None
+        responses, score_deltas, revocations = self._build_batch(events)
+        try:
+            persist(responses, score_deltas, revocations)
+        except Exception as e:
+            self._count('failed_flushes')
+            logger.error(f"Error confirmando lote de {len(events)} eventos: {e}")
+            return e
+
+        lag = round(time.monotonic() - events[0][0], 4)
+        with self._stats_lock:
+            self.stats['flushed'] += len(events)
+            self.stats['batches'] += 1
+            self.stats['last_flush_lag'] = lag
+            self.stats['max_flush_lag'] = max(self.stats['max_flush_lag'], lag)
+        return None
+
+    @staticmethod
+    def _is_transient(error):
+        """Error de conexión con la base de datos: el lote no tiene la culpa"""
+        return isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError))
+
+    def _isolate(self, events):
+        """Partir un lote que falla por sus datos y confirmar todo lo que se pueda
+
+        Devuelve los eventos que quedan pendientes ([] salvo que la base de
+        datos se caiga a mitad).
+        """
+        if len(events) == 1:
+            _, kind, row = events[0]
+            self._count('dead_letters')
+            logger.error(f"Evento '{kind}' descartado tras fallar solo: {row!r}")
+            return []
+        middle = len(events) // 2
+        halves = [events[:middle], events[middle:]]
+        for index, half in enumerate(halves):
+            error = self._flush(half)
+            if error is None:
+                continue
+            if self._is_transient(error):
+                return [event for rest in halves[index:] for event in rest]
+            remaining = self._isolate(half)
+            if remaining:
+                return remaining + [event for rest in halves[index + 1:] for event in rest]
+        return []
+
+    def _flush_once(self, timeout):
+        """Confirmar un lote; devuelve False si el lote falló y quedó pendiente"""
+        with self._flush_lock:
+            if self._pending:
+                # Reintento del mismo lote, sin mezclar eventos nuevos
+                events = self._pending
+            else:
+                try:
+                    first = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    return True
+                events = self._drain([first])
+            error = self._flush(events)
+            if error is None:
+                self._pending, self._attempts = None, 0
+                return True
+            if not self._is_transient(error):
+                self._attempts += 1
+                if self._attempts >= self.max_retries:
+                    events = self._isolate(events)
+                    self._attempts = 0
+            self._pending = events or None
+            return self._pending is None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._flush_once(self.flush_interval)
+            if self._pending:
+                # Esperar antes de reintentar un lote fallido
+                self._stop.wait(self.flush_interval)
+
+    def flush(self):
+        """Vaciar sincrónicamente todo lo pendiente"""
+        while self._pending or not self._queue.empty():
+            # Un error de datos se reintenta hasta aislarlo; una caída corta el vaciado
+            if not self._flush_once(0) and self._attempts == 0:
+                break
+
+    def stop(self):
+        """Detener el hilo y vaciar la cola (hook de apagado)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+        if self._pending or not self._queue.empty():
+            logger.error("Quedaron eventos sin persistir al apagar el servidor")
+
+    def get_stats(self):
+        """Métricas de la cola, incluido el retraso de vaciado"""
+        oldest_pending_age = 0.0
+        if self._pending:
+            oldest_pending_age = time.monotonic() - self._pending[0][0]
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return dict(stats, queued=self._queue.qsize(), oldest_pending_age=round(oldest_pending_age, 4))
+
+answer_writer = WriteBehindQueue(
+    max_events=Config.WRITE_BEHIND_MAX_EVENTS,
+    batch_size=Config.WRITE_BEHIND_BATCH_SIZE,
+    flush_interval=Config.WRITE_BEHIND_FLUSH_INTERVAL,
+    max_retries=Config.WRITE_BEHIND_MAX_RETRIES
+)